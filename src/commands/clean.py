@@ -7,6 +7,7 @@ import sys
 import shutil
 from pathlib import Path
 from src.projects.loader import get_project
+from src.metadata_store import MetadataStore
 from .utils import detect_volume_path
 
 
@@ -17,6 +18,7 @@ def handle_clean(args):
         sys.exit(1)
     
     volume_path = detect_volume_path()
+    store = MetadataStore(volume_path)
     
     # 获取项目配置（用于获取 Python 版本）
     try:
@@ -41,11 +43,19 @@ def handle_clean(args):
         items_to_clean.append("元数据")
     
     print(f"⚠️  将清理: {', '.join(items_to_clean)}")
-    response = input("\n确认删除？(yes/N): ")
-    
-    if response.lower() != 'yes':
-        print("已取消")
-        return
+    if getattr(args, 'yes', False):
+        print("✅ 已通过 --yes 确认")
+    else:
+        try:
+            response = input("\n确认删除？(yes/N): ")
+        except EOFError:
+            # 后台任务/队列中没有终端输入
+            print("\n❌ 无法读取确认输入，非交互运行请加 --yes")
+            sys.exit(1)
+        
+        if response.lower() != 'yes':
+            print("已取消")
+            return
     
     # 清理依赖
     if args.all or args.deps:
@@ -60,32 +70,17 @@ def handle_clean(args):
     # 清理模型（只清理元数据记录，不删除实际模型文件）
     if args.all or args.models:
         print(f"\n⚠️  注意: 模型文件被多项目共享，只清理元数据记录")
-        metadata_file = Path(volume_path) / '.metadata' / f'{args.project}.json'
-        if metadata_file.exists():
-            # 读取元数据，只清空模型部分
-            import json
-            with open(metadata_file, 'r') as f:
-                metadata = json.load(f)
-            
-            model_count = len(metadata.get('models', {}))
-            metadata['models'] = {}
-            
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
-            
+        model_count = store.clear_models(args.project)
+        if model_count:
             print(f"  ✅ 已清理 {model_count} 个模型记录")
         else:
-            print(f"  ⏭️  元数据不存在，跳过")
+            print(f"  ⏭️  没有模型记录，跳过")
     
     # 清理元数据
     if args.all:
-        metadata_file = Path(volume_path) / '.metadata' / f'{args.project}.json'
-        if metadata_file.exists():
-            print(f"\n🗑️  删除元数据: {metadata_file}")
-            metadata_file.unlink()
-            print("  ✅ 已删除")
-        else:
-            print(f"\n⏭️  元数据文件不存在，跳过")
+        print(f"\n🗑️  删除元数据: {args.project}")
+        store.delete_project(args.project)
+        print("  ✅ 已删除")
     
     # 完成
     print("\n" + "=" * 60)
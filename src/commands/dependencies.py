@@ -5,8 +5,15 @@
 """
 import sys
 import os
+import json
+import time
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+from src.fs_utils import format_size
 from src.projects.loader import get_project
-from src.volume_manager import VolumeManager
 from .utils import detect_volume_path
 
 
@@ -22,6 +29,26 @@ def handle_deps(args):
         check_task_status(args)
     elif args.deps_command == 'stop':
         stop_task(args)
+    elif args.deps_command == 'clean-tasks':
+        clean_tasks(args)
+    elif args.deps_command == 'clone':
+        clone_venv(args)
+    elif args.deps_command == 'compile':
+        compile_bytecode(args)
+    elif args.deps_command == 'profile-imports':
+        profile_imports(args)
+    elif args.deps_command == 'verify':
+        verify_venv(args)
+    elif args.deps_command == 'prune':
+        prune_venv(args)
+    elif args.deps_command == 'pack':
+        pack_venv(args)
+    elif args.deps_command == 'unpack':
+        unpack_venv(args)
+    elif args.deps_command == 'relocate':
+        relocate_venv(args)
+    elif args.deps_command == 'pythons':
+        manage_pythons(args)
     else:
         print("❌ 未知的 deps 子命令")
         sys.exit(1)
@@ -34,6 +61,14 @@ def install_dependencies(args):
         # 异步模式：启动后台任务
         from src.task_manager import TaskManager
         
+        from src.task_priority import build_scheduling, describe_scheduling
+        
+        try:
+            scheduling = build_scheduling(args)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        
         volume_path = detect_volume_path()
         task_manager = TaskManager(volume_path)
         
@@ -41,19 +76,27 @@ def install_dependencies(args):
         command_args = sys.argv.copy()
         
         # 启动后台任务
-        task_info = task_manager.start_background_task(command_args)
+        task_info = task_manager.start_background_task(command_args, scheduling=scheduling)
         
         print("=" * 60)
         print("🚀 后台任务已启动")
         print("=" * 60)
         print(f"📋 任务ID: {task_info['task_id']}")
         print(f"📝 日志文件: {task_info['log_file']}")
+        if scheduling:
+            print(f"🐢 调度: {describe_scheduling(scheduling)}")
         print(f"\n查看进度:")
         print(f"  python3 volume_cli.py deps status {task_info['task_id']}")
         print(f"\n实时跟踪日志:")
         print(f"  tail -f {task_info['log_file']}")
         return
     
+    # 多个 Python 版本：每个版本一个子进程并发构建
+    versions = _parse_python_versions(getattr(args, 'python', None))
+    if len(versions) > 1:
+        install_matrix(args, versions)
+        return
+    
     # 同步模式：正常执行
     print("=" * 60)
     print("🔧 依赖管理（增量）")
@@ -73,179 +116,18 @@ def install_dependencies(args):
     
     # 检测 Volume 路径
     volume_path = detect_volume_path()
-    manager = VolumeManager(volume_path)
-    
-    # 检查 Python 版本匹配
-    import platform
-    current_version = f"{sys.version_info.major}.{sys.version_info.minor}"
-    required_version = project.python_version
+    required_version = versions[0] if versions else project.python_version
     
     print(f"\n📦 项目: {args.project}")
     print(f"📂 Volume: {volume_path}")
-    print(f"🐍 需要 Python: {required_version}")
-    print(f"🐍 当前 Python: {current_version}")
+    print(f"🐍 需要 Python: {required_version}（使用 Volume 上的托管解释器，与当前 CLI 的 Python 无关）")
     print(f"📝 配置文件: {project.dependencies_config}")
     
-    from pathlib import Path
     if not Path(project.dependencies_config).exists():
         print(f"❌ 配置文件不存在: {project.dependencies_config}")
         sys.exit(1)
     print(f"✅ 配置文件存在")
     
-    # 版本检查
-    if current_version != required_version:
-        print(f"\n⚠️  Python 版本不匹配！")
-        print(f"   需要: {required_version}")
-        print(f"   当前: {current_version}")
-        
-        import subprocess
-        import shutil
-        
-        # 检查需要的版本是否已安装
-        python_cmd = f"python{required_version}"
-        if shutil.which(python_cmd):
-            print(f"\n✅ 检测到系统已安装 Python {required_version}")
-            print(f"   自动切换到 {python_cmd} 继续运行...")
-            
-            # 检查新版本是否有管理工具依赖
-            print(f"\n📦 检查 {python_cmd} 的管理工具依赖...")
-            check_cmd = [python_cmd, "-c", "import yaml, modelscope, huggingface_hub"]
-            check_result = subprocess.run(check_cmd, capture_output=True, text=True)
-            
-            if check_result.returncode != 0:
-                print(f"⚠️  {python_cmd} 缺少管理工具依赖")
-                print(f"🔧 自动安装根目录依赖到 {python_cmd}...")
-                print()
-                
-                # 自动安装根目录依赖
-                root_requirements = os.path.join(os.getcwd(), "requirements.txt")
-                install_cmd = [python_cmd, "-m", "pip", "install", "-r", root_requirements]
-                
-                print(f"💻 命令: {' '.join(install_cmd)}")
-                install_result = subprocess.run(install_cmd)
-                
-                if install_result.returncode != 0:
-                    print(f"\n❌ 管理工具依赖安装失败")
-                    print(f"\n请手动安装后重试:")
-                    print(f"   {python_cmd} -m pip install -r requirements.txt")
-                    print(f"\n或切换到已安装依赖的 Python 版本")
-                    sys.exit(1)
-                
-                print(f"\n✅ 管理工具依赖安装完成")
-            else:
-                print(f"✅ 管理工具依赖已安装")
-            
-            print()
-            
-            # 使用正确的 Python 版本重新运行
-            new_cmd = [python_cmd, "volume_cli.py", "deps", "install", "--project", args.project]
-            if args.mirror:
-                new_cmd.extend(["--mirror", args.mirror])
-            if args.force:
-                new_cmd.append("--force")
-            
-            result = subprocess.run(new_cmd, cwd=os.getcwd())
-            sys.exit(result.returncode)
-        
-        # 系统未安装，自动安装
-        print(f"\n🔧 系统未安装 Python {required_version}")
-        print(f"📥 开始自动安装...")
-        print()
-        
-        try:
-            # 更新包列表
-            print(f"[1/3] 更新包列表...")
-            result = subprocess.run(['apt-get', 'update'], 
-                                   capture_output=True, 
-                                   text=True,
-                                   check=True)
-            print(f"      ✓ 完成")
-            
-            # 安装 Python
-            print(f"[2/3] 安装 Python {required_version}...")
-            packages = [
-                f'python{required_version}',
-                f'python{required_version}-pip',
-                f'python{required_version}-venv',
-                f'python{required_version}-dev'
-            ]
-            result = subprocess.run(
-                ['apt-get', 'install', '-y'] + packages,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            print(f"      ✓ 安装完成")
-            
-            # 验证安装
-            print(f"[3/3] 验证安装...")
-            result = subprocess.run(
-                [f'python{required_version}', '--version'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            version_output = result.stdout.strip()
-            print(f"      ✓ {version_output}")
-            
-            print(f"\n✅ Python {required_version} 安装成功！")
-            
-            # 自动安装管理工具依赖
-            print(f"\n📦 安装管理工具依赖到新的 Python 版本...")
-            root_requirements = os.path.join(os.getcwd(), "requirements.txt")
-            install_cmd = [f"python{required_version}", "-m", "pip", "install", "-r", root_requirements]
-            
-            print(f"💻 命令: {' '.join(install_cmd)}")
-            install_result = subprocess.run(install_cmd)
-            
-            if install_result.returncode != 0:
-                print(f"\n❌ 管理工具依赖安装失败")
-                print(f"\n请手动安装后重试:")
-                print(f"   python{required_version} -m pip install -r requirements.txt")
-                print(f"\n或切换到已安装依赖的 Python 版本")
-                sys.exit(1)
-            
-            print(f"✅ 管理工具依赖安装完成")
-            
-            print(f"\n   使用 python{required_version} 重新运行...")
-            print()
-            
-            # 使用新安装的 Python 重新运行
-            new_cmd = [f"python{required_version}", "volume_cli.py", "deps", "install", "--project", args.project]
-            if args.mirror:
-                new_cmd.extend(["--mirror", args.mirror])
-            if args.force:
-                new_cmd.append("--force")
-            
-            result = subprocess.run(new_cmd, cwd=os.getcwd())
-            sys.exit(result.returncode)
-            
-        except subprocess.CalledProcessError as e:
-            print(f"\n❌ 安装失败！")
-            print(f"   错误信息: {e.stderr if e.stderr else str(e)}")
-            print(f"\n可能原因:")
-            print(f"   1. 权限不足（需要 root 权限）")
-            print(f"   2. 网络问题")
-            print(f"   3. 软件源中没有 Python {required_version}")
-            print(f"\n手动解决:")
-            print(f"   # 方案1: 使用 sudo")
-            print(f"   sudo apt-get update")
-            print(f"   sudo apt-get install -y python{required_version} python{required_version}-pip")
-            print(f"\n   # 方案2: 使用当前版本")
-            print(f"   修改项目配置: projects/{args.project.replace('-', '_')}/config.py")
-            print(f"   python_version = '{current_version}'")
-            sys.exit(1)
-        except PermissionError:
-            print(f"\n❌ 权限不足！")
-            print(f"   需要 root 权限才能安装系统包")
-            print(f"\n解决方案:")
-            print(f"   # 使用 sudo 运行")
-            print(f"   sudo python3 volume_cli.py deps install --project {args.project}")
-            print(f"\n   # 或者在 RunPod Pod 终端中直接运行（通常已有 root 权限）")
-            sys.exit(1)
-    else:
-        print(f"✅ Python 版本匹配")
-    
     # 安装依赖（使用 venv + uv）
     try:
         from src.venv_manager import VenvManager
@@ -253,21 +135,29 @@ def install_dependencies(args):
         if args.force:
             print(f"\n⚠️  使用 --force 参数，将强制重新安装所有依赖")
         
-        # 创建/检测 venv
+        from src.setup_journal import SetupJournal
+        
+        # 在新一代 venv 中安装，成功后原子激活（不影响正在使用的 venv）
         venv_mgr = VenvManager(volume_path)
-        venv_path = venv_mgr.ensure_venv(args.project, required_version)
         
         print(f"\n📦 使用 uv 安装依赖到 venv...")
-        result = venv_mgr.install_from_yaml(
-            venv_path,
+        result = venv_mgr.build_venv(
+            args.project,
+            required_version,
             project.dependencies_config,
             mirror=args.mirror,
-            force=args.force
+            force=args.force,
+            template=project.venv_template,
+            compile_bytecode=not getattr(args, 'no_compile', False),
+            journal=SetupJournal.from_env()
         )
         
         # 显示结果
         print("\n" + "=" * 60)
-        print("✅ 安装完成！")
+        if result['activated']:
+            print("✅ 安装完成！")
+        else:
+            print("❌ 安装失败，当前 venv 未改动")
         print("=" * 60)
         print(f"📊 统计: 总计 {result['total']}, 安装 {result['installed']}, 失败 {result['failed']}")
         if result.get('groups'):
@@ -276,8 +166,17 @@ def install_dependencies(args):
                 status = "✅" if success else "❌"
                 print(f"  {status} {group}")
         
+        result_file = getattr(args, 'result_file', None)
+        if result_file:
+            with open(result_file, 'w') as f:
+                json.dump({k: result.get(k) for k in ('total', 'installed', 'failed', 'activated', 'generation')}, f)
+        
+        if not result['activated']:
+            sys.exit(1)
+        
         print(f"\n📝 使用说明（业务侧 Dockerfile）:")
-        print(f"  FROM python:{required_version}")
+        print(f"  # venv 的解释器在 Volume 的 pythons/ 下，基础镜像无需安装 Python {required_version}")
+        print(f"  # venv 通过 /runpod-volume/pythons/ 引用解释器，在 Pod 和 Serverless 上都无需改写")
         print(f"  # 方式 1: 激活 venv（推荐）")
         print(f"  ENV VIRTUAL_ENV=/runpod-volume/venvs/py{required_version}-{args.project}")
         print(f"  ENV PATH=\"$VIRTUAL_ENV/bin:$PATH\"")
@@ -292,6 +191,623 @@ def install_dependencies(args):
         sys.exit(1)
 
 
+def _parse_python_versions(value: Optional[str]) -> List[str]:
+    """解析 --python 3.10,3.11（去重并保持顺序）"""
+    if not value:
+        return []
+    versions = []
+    for version in value.split(','):
+        version = version.strip()
+        if version and version not in versions:
+            versions.append(version)
+    return versions
+
+
+def _stream_prefixed(proc, prefix: str, lock: threading.Lock, on_line=None):
+    """逐行转发子进程输出并加上前缀（on_line 在持有锁时对每行调用，可用于追加进度输出）"""
+    for line in proc.stdout:
+        with lock:
+            sys.stdout.write(f"{prefix} {line}" if line.strip() else line)
+            if on_line:
+                on_line(line)
+            sys.stdout.flush()
+
+
+def install_matrix(args, versions: List[str]):
+    """
+    并发为多个 Python 版本构建 venv
+    
+    每个版本一个 CLI 子进程（输出加 [pyX.Y] 前缀），共用 Volume 上的 uv 缓存：
+    与 Python 版本无关的 wheel（py3-none-any）只下载一次
+    """
+    import tempfile
+    
+    volume_path = detect_volume_path()
+    cli_path = os.path.abspath(sys.argv[0])
+    env = os.environ.copy()
+    env['PYTHONUNBUFFERED'] = '1'
+    env.setdefault('UV_CACHE_DIR', str(Path(volume_path) / '.uv-cache'))
+    
+    print("=" * 60)
+    print(f"🔧 多版本依赖安装: {args.project}")
+    print("=" * 60)
+    print(f"🐍 Python: {', '.join(versions)}（并发构建）")
+    print(f"📦 共享 uv 缓存: {env['UV_CACHE_DIR']}\n")
+    
+    lock = threading.Lock()
+    runs = {}
+    result_dir = tempfile.mkdtemp(prefix='deps-matrix-')
+    try:
+        for version in versions:
+            result_file = os.path.join(result_dir, f'{version}.json')
+            cmd = [sys.executable, cli_path, 'deps', 'install', '--project', args.project,
+                   '--python', version, '--result-file', result_file]
+            if args.mirror:
+                cmd.extend(['--mirror', args.mirror])
+            if args.force:
+                cmd.append('--force')
+            if getattr(args, 'no_compile', False):
+                cmd.append('--no-compile')
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, env=env, bufsize=1)
+            reader = threading.Thread(target=_stream_prefixed, args=(proc, f'[py{version}]', lock), daemon=True)
+            reader.start()
+            runs[version] = {'proc': proc, 'reader': reader, 'start': time.time(), 'result_file': result_file}
+        
+        for version, run in runs.items():
+            run['returncode'] = run['proc'].wait()
+            run['seconds'] = time.time() - run['start']
+            run['reader'].join()
+            run['result'] = {}
+            if os.path.exists(run['result_file']):
+                with open(run['result_file'], 'r') as f:
+                    run['result'] = json.load(f)
+    finally:
+        shutil.rmtree(result_dir, ignore_errors=True)
+    
+    from src.venv_manager import VenvManager
+    venv_mgr = VenvManager(volume_path)
+    
+    print("\n" + "=" * 60)
+    print("📊 多版本安装结果")
+    print("=" * 60)
+    print(f"{'Python':<8} {'状态':<6} {'耗时':>8}  {'安装/总计':<10} venv")
+    for version, run in runs.items():
+        result = run['result']
+        ok = run['returncode'] == 0
+        counts = f"{result['installed']}/{result['total']}" if result else '-'
+        print(f"{version:<8} {'✅' if ok else '❌':<6} {run['seconds']:>7.1f}s  {counts:<10} "
+              f"{venv_mgr.get_venv_path(args.project, version)}")
+    
+    failed = [v for v, run in runs.items() if run['returncode'] != 0]
+    if failed:
+        print(f"\n❌ 失败的版本: {', '.join(failed)}（这些版本当前的 venv 未改动）")
+        sys.exit(1)
+    print("\n✅ 所有版本安装完成")
+
+
+def clone_venv(args):
+    """从已有项目的 venv 克隆新 venv，然后增量安装差异部分"""
+    from src.venv_manager import VenvManager
+    
+    volume_path = detect_volume_path()
+    
+    # 目标项目未注册时只能克隆，不能增量安装
+    try:
+        target_project = get_project(args.to_project)
+    except ValueError:
+        target_project = None
+        if not args.no_install:
+            print(f"❌ 项目不存在: {args.to_project}")
+            print(f"💡 仅克隆 venv 请加 --no-install")
+            sys.exit(1)
+    
+    if args.python:
+        python_version = args.python
+    elif target_project:
+        python_version = target_project.python_version
+    else:
+        try:
+            python_version = get_project(args.from_project).python_version
+        except ValueError as e:
+            print(f"❌ {e}")
+            print(f"💡 使用 --python 指定 Python 版本")
+            sys.exit(1)
+    
+    venv_mgr = VenvManager(volume_path)
+    source_path = venv_mgr.get_venv_path(args.from_project, python_version)
+    target_path = venv_mgr.get_venv_path(args.to_project, python_version)
+    
+    print("=" * 60)
+    print("📋 克隆虚拟环境")
+    print("=" * 60)
+    print(f"📂 源: {source_path}")
+    print(f"📂 目标: {target_path}")
+    print(f"🔗 方式: {args.mode}\n")
+    
+    if not venv_mgr.venv_exists(source_path):
+        print(f"❌ 源 venv 不存在: {source_path}")
+        sys.exit(1)
+    
+    config_file = None
+    if not args.no_install:
+        config_file = target_project.dependencies_config
+        if not config_file:
+            print(f"⚠️  项目 {args.to_project} 未定义依赖配置文件，只克隆不安装")
+    
+    if venv_mgr.venv_exists(target_path) and not args.force:
+        print(f"❌ 目标 venv 已存在: {target_path}（使用 --force 覆盖）")
+        sys.exit(1)
+    
+    # 克隆到目标的新一代目录，增量安装成功后原子激活
+    try:
+        result = venv_mgr.build_venv(
+            args.to_project,
+            python_version,
+            config_file,
+            mirror=args.mirror,
+            base=source_path,
+            clone_mode=args.mode
+        )
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"❌ 克隆失败: {e}")
+        sys.exit(1)
+    
+    if not result['activated']:
+        print(f"\n❌ {result['failed']} 组安装失败")
+        sys.exit(1)
+
+
+def compile_bytecode(args):
+    """为已有 venv 并行预编译字节码"""
+    from src.venv_manager import VenvManager
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        print(f"\n💡 使用以下命令安装:")
+        print(f"   python3 volume_cli.py deps install --project {args.project}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"⚙️  预编译字节码: {args.project}")
+    print("=" * 60)
+    
+    try:
+        venv_mgr.compile_bytecode(venv_path, workers=args.workers, invalidation_mode=args.invalidation_mode)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"❌ 预编译失败: {e}")
+        sys.exit(1)
+
+
+def _print_import_tree(nodes, total_us, depth=0, max_depth=2):
+    """打印 import 树（只显示占比 ≥1% 的节点）"""
+    for node in sorted(nodes, key=lambda n: n['cumulative_us'], reverse=True):
+        if node['cumulative_us'] < total_us * 0.01:
+            continue
+        print(f"  {'  ' * depth}{node['name']:<{40 - 2 * depth}} {node['cumulative_us'] / 1000:>9.1f} ms")
+        if depth + 1 < max_depth:
+            _print_import_tree(node['children'], total_us, depth + 1, max_depth)
+
+
+def profile_imports(args):
+    """分析项目 venv 中模块的 import 耗时"""
+    from src.venv_manager import VenvManager
+    from src.import_profiler import ImportProfiler
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"⏱️  Import 耗时分析: {args.project} / {args.module}")
+    print("=" * 60)
+    print(f"🐍 解释器: {venv_path / 'bin' / 'python'}")
+    print(f"🔁 重复次数: {args.repeat}（取最快一次）\n")
+    
+    profiler = ImportProfiler(volume_path)
+    previous = profiler.latest(args.project, args.module)
+    try:
+        profile = profiler.run(venv_path, args.module, repeat=args.repeat, extra_paths=args.path)
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    total_us = profile['total_us']
+    print(f"📊 总耗时: {total_us / 1000:.1f} ms\n")
+    
+    ranked = sorted(profile['packages'].items(), key=lambda kv: kv[1]['cumulative_us'], reverse=True)
+    print(f"  {'顶层包':<30} {'累计(ms)':>10} {'自身(ms)':>10} {'模块数':>6}")
+    print(f"  {'─'*60}")
+    for name, stats in ranked[:args.top]:
+        print(f"  {name:<30} {stats['cumulative_us'] / 1000:>10.1f} "
+              f"{stats['self_us'] / 1000:>10.1f} {stats['modules']:>6}")
+    
+    print(f"\n🌳 Import 树（占比 ≥1%）:")
+    _print_import_tree(profile['tree'], total_us)
+    
+    profile_file = profiler.save(args.project, profile)
+    print(f"\n💾 已保存: {profile_file}")
+    
+    if not previous:
+        print("ℹ️  首次分析，无历史结果可对比")
+        return
+    
+    diff = ImportProfiler.compare(previous, profile, threshold=args.threshold)
+    print(f"\n📈 与上次对比 ({previous['created_at']}): 总耗时 {diff['total_delta_us'] / 1000:+.1f} ms")
+    if diff['added'] or diff['removed']:
+        print(f"   依赖变化: +{len(diff['added'])} / -{len(diff['removed'])}")
+        for dist in diff['added'][:10]:
+            print(f"     + {dist}")
+        for dist in diff['removed'][:10]:
+            print(f"     - {dist}")
+    
+    if diff['regressions']:
+        print(f"\n⚠️  检测到 {len(diff['regressions'])} 个包变慢:")
+        for r in diff['regressions']:
+            print(f"   ❌ {r['package']}: {r['before_us'] / 1000:.1f} ms → {r['after_us'] / 1000:.1f} ms "
+                  f"({r['delta_us'] / 1000:+.1f} ms)")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("✅ 未发现 import 耗时回归")
+
+
+def verify_venv(args):
+    """按 RECORD 校验 venv 中每个文件的 sha256 和大小"""
+    import time
+    from src.venv_manager import VenvManager
+    from src.venv_verify import VenvVerifier
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"🔍 校验 venv 完整性: {args.project}")
+    print("=" * 60)
+    print(f"📂 Venv: {venv_path}")
+    print(f"⚡ 并发: {args.jobs}{'（不使用缓存）' if args.no_cache else ''}\n")
+    
+    start = time.time()
+    from src.venv_prune import pruned_paths
+    
+    verifier = VenvVerifier(volume_path, jobs=args.jobs, use_cache=not args.no_cache)
+    try:
+        report = verifier.verify(venv_path, ignore=pruned_paths(venv_path))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    print(f"📦 分发包: {report['distributions']}")
+    print(f"📄 文件: {report['files']}（哈希 {report['hashed']}，缓存命中 {report['cached']}）")
+    print(f"⏱️  耗时: {time.time() - start:.1f}s")
+    
+    broken = report['broken']
+    if not broken:
+        print("\n✅ 所有文件与 RECORD 一致")
+        return
+    
+    reasons = {'missing': '缺失', 'size': '大小不符', 'hash': '哈希不符'}
+    print(f"\n❌ 损坏的分发包: {len(broken)}")
+    for (name, version), files in sorted(broken.items()):
+        print(f"\n  📦 {name} {version}: {len(files)} 个文件")
+        for path, reason in files[:5]:
+            print(f"     - [{reasons.get(reason, reason)}] {path}")
+        if len(files) > 5:
+            print(f"     ... 另有 {len(files) - 5} 个")
+    
+    python_bin = venv_path / 'bin' / 'python'
+    reinstall = ' '.join(f"--reinstall-package {name}" for name, _ in sorted(broken))
+    pins = ' '.join(f"'{name}=={version}'" for name, version in sorted(broken))
+    print(f"\n💡 选择性重装:")
+    print(f"   uv pip install --python {python_bin} {reinstall} {pins}")
+    sys.exit(1)
+
+
+def prune_venv(args):
+    """按 dependencies.yaml 的 prune 配置裁剪已有 venv"""
+    from src.venv_manager import VenvManager
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if not project.dependencies_config:
+        print(f"⚠️  项目 {args.project} 未定义依赖配置文件")
+        return
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"✂️  Venv 瘦身: {args.project}")
+    print("=" * 60)
+    
+    import yaml
+    from src.venv_prune import load_prune_profile
+    
+    try:
+        with open(project.dependencies_config, 'r', encoding='utf-8') as f:
+            profile = load_prune_profile(yaml.safe_load(f) or {})
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not profile:
+        print(f"⚠️  {project.dependencies_config} 未启用 prune（prune.enabled: true）")
+        return
+    
+    if args.dry_run:
+        venv_mgr.prune_from_yaml(venv_path, project.dependencies_config, dry_run=True)
+        return
+    
+    # 在克隆出的新一代上裁剪再原子激活，正在使用当前代的进程不受影响
+    try:
+        result = venv_mgr.build_venv(
+            args.project, project.python_version, compile_bytecode=False,
+            modify=lambda generation: venv_mgr.prune_from_yaml(generation, project.dependencies_config))
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"❌ 裁剪失败，当前 venv 未改动: {e}")
+        sys.exit(1)
+    if not result.get('activated'):
+        sys.exit(1)
+
+
+def _scan_metadata(root: Path) -> int:
+    """单线程逐个 lstat（模拟解释器冷启动时逐个查找文件的元数据开销）"""
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            os.lstat(os.path.join(dirpath, name))
+            count += 1
+    return count
+
+
+def _time_import(python_bin: Path, module: str) -> Optional[float]:
+    start = time.time()
+    result = subprocess.run([str(python_bin), '-c', f'import {module}'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.time() - start if result.returncode == 0 else None
+
+
+def _bench_image(venv_path: Path, index: dict, module: Optional[str], bench_dir: Optional[str]):
+    """对比直接从 Volume 运行与解压到本地盘后运行的耗时"""
+    import tempfile
+    from src import venv_pack
+    
+    print(f"\n⏱️  性能对比（本地目录: {bench_dir or tempfile.gettempdir()}）")
+    rows = []
+    
+    start = time.time()
+    entries = _scan_metadata(Path(os.path.realpath(venv_path)))
+    rows.append((f'Volume 逐个 stat {entries} 个条目', time.time() - start))
+    
+    local_root = Path(tempfile.mkdtemp(prefix='venv-bench-', dir=bench_dir))
+    try:
+        local_venv = local_root / venv_path.name
+        start = time.time()
+        venv_pack.unpack_venv(index, local_venv, force=True)
+        rows.append(('读取镜像并解压到本地', time.time() - start))
+        
+        if module:
+            for label, root in (('Volume ', venv_path), ('本地盘', local_venv)):
+                elapsed = _time_import(root / 'bin' / 'python', module)
+                rows.append((f'{label}上 import {module}', elapsed))
+    finally:
+        shutil.rmtree(local_root, ignore_errors=True)
+    
+    for label, elapsed in rows:
+        value = f"{elapsed:.2f}s" if elapsed is not None else "失败"
+        print(f"  {label:<36} {value:>10}")
+
+
+def pack_venv(args):
+    """把 venv 打包成单个镜像文件"""
+    from src.venv_manager import VenvManager
+    from src import venv_pack
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"📦 打包 venv 镜像: {args.project}")
+    print("=" * 60)
+    
+    images_dir = venv_mgr.venvs_dir / venv_pack.IMAGES_DIRNAME
+    start = time.time()
+    try:
+        index = venv_pack.pack_venv(venv_path, images_dir, compression=args.compression)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ 打包失败: {e}")
+        sys.exit(1)
+    elapsed = time.time() - start
+    
+    print(f"✅ 镜像: {index['image_file']}")
+    print(f"   代际: {index['generation']}，压缩: {index['compression']}")
+    print(f"   {index['entries']} 个条目 / {format_size(index['bytes'])} → {format_size(index['image_bytes'])} ({elapsed:.1f}s)")
+    
+    if args.bench:
+        _bench_image(venv_path, index, args.module, args.bench_dir)
+    
+    print(f"\n💡 Serverless 入口中解压到本地盘:")
+    print(f"   python3 volume_cli.py deps unpack --project {args.project} --dest /tmp/venvs")
+
+
+def unpack_venv(args):
+    """把 venv 镜像解压到本地盘（Serverless 冷启动用）"""
+    from src.venv_manager import VenvManager
+    from src import venv_pack
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    
+    index = venv_pack.load_image_index(venv_mgr.venvs_dir / venv_pack.IMAGES_DIRNAME, venv_path.name)
+    if index is None:
+        print(f"❌ 镜像不存在，请先运行: python3 volume_cli.py deps pack --project {args.project}")
+        sys.exit(1)
+    
+    current = venv_mgr.generations.current(venv_path.name)
+    if current and current.name != index['generation']:
+        print(f"⚠️  镜像基于代际 {index['generation']}，当前 venv 为 {current.name}，建议重新 deps pack")
+    
+    dest = Path(args.dest) / venv_path.name
+    start = time.time()
+    try:
+        result = venv_pack.unpack_venv(index, dest, force=args.force)
+    except (RuntimeError, OSError, subprocess.CalledProcessError) as e:
+        print(f"❌ 解压失败: {e}")
+        sys.exit(1)
+    
+    if result['skipped']:
+        print(f"✅ 本地 venv 已是最新: {dest}")
+    else:
+        print(f"✅ 已解压到 {dest} ({time.time() - start:.1f}s，改写 {result['rewritten']} 个文件)")
+    print(f"export VIRTUAL_ENV={dest}")
+    print(f"export PATH={dest}/bin:$PATH")
+
+
+def relocate_venv(args):
+    """把已有 venv 转换为与挂载点无关的形式，或改写到指定路径"""
+    from src.venv_manager import VenvManager
+    from src.venv_paths import detect_venv_prefix, rewrite_venv_prefix, retarget_interpreter, make_relocatable
+    
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"❌ Venv 不存在: {venv_path}")
+        sys.exit(1)
+    
+    print("=" * 60)
+    print(f"📌 重定位 venv: {args.project}")
+    print("=" * 60)
+    
+    current = venv_mgr.generations.current(venv_path.name)
+    old_prefix = detect_venv_prefix(current)
+    print(f"📂 当前代: {current}")
+    print(f"📍 原始绝对路径: {old_prefix or '无（已可重定位）'}")
+    prefix = args.prefix
+    if prefix and not old_prefix:
+        print("✅ venv 已可重定位，忽略 --prefix")
+        prefix = None
+    
+    def relocate(generation: Path) -> dict:
+        start = time.time()
+        # 旧 venv 的解释器绑定构建时的挂载点，改为与挂载点无关的 /runpod-volume/pythons/
+        pythons_dir = venv_mgr.pythons.canonical_pythons_dir()
+        retargeted = retarget_interpreter(generation, pythons_dir) if pythons_dir else 0
+        if retargeted:
+            print(f"🐍 解释器已指向 {pythons_dir}/: 改写 {retargeted} 处")
+        if prefix:
+            # 克隆时绝对路径已改写为新一代的路径
+            count = rewrite_venv_prefix(generation, str(generation), prefix, workers=args.workers)
+            print(f"✅ 已改写到 {prefix}: {count} 个文件 ({time.time() - start:.2f}s)")
+        else:
+            count = make_relocatable(generation, workers=args.workers)
+            print(f"✅ 已转换为可重定位 venv: 改写 {count} 个文件 ({time.time() - start:.2f}s)")
+        return {'retargeted': retargeted, 'rewritten': count}
+    
+    # 在克隆出的新一代上改写再原子激活，正在使用当前代的进程不受影响
+    try:
+        result = venv_mgr.build_venv(args.project, project.python_version, compile_bytecode=False,
+                                     modify=relocate, relocatable=not prefix)
+    except (RuntimeError, OSError) as e:
+        print(f"❌ 重定位失败，当前 venv 未改动: {e}")
+        sys.exit(1)
+    if not result.get('activated'):
+        sys.exit(1)
+
+
+def manage_pythons(args):
+    """查看/预先下载 Volume 上的托管 Python 解释器（同时确保 /runpod-volume 指向当前 Volume）"""
+    from src.python_manager import PythonManager, CANONICAL_VOLUME_PATH
+    
+    volume_path = detect_volume_path()
+    python_mgr = PythonManager(volume_path)
+    
+    print("=" * 60)
+    print(f"🐍 托管 Python 解释器: {python_mgr.pythons_dir}")
+    print("=" * 60)
+    
+    canonical = python_mgr.canonical_pythons_dir()
+    if canonical:
+        print(f"🔗 venv 引用路径: {canonical}")
+    else:
+        print(f"⚠️  {CANONICAL_VOLUME_PATH} 不可用（已被占用或无权限创建），venv 只能在构建时的挂载点下使用")
+    
+    for version in args.install or []:
+        try:
+            interpreter = python_mgr.ensure(version)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Python {version}: {interpreter}")
+    
+    installed = python_mgr.list_installed()
+    if not installed:
+        print("\n(尚未安装任何解释器)")
+        return
+    print(f"\n已安装 {len(installed)} 个:")
+    for name in installed:
+        print(f"  - {name}")
+
+
 def list_dependencies(args):
     """列出项目依赖"""
     try:
@@ -321,14 +837,17 @@ def list_dependencies(args):
     print(f"🐍 Python 版本: {project.python_version}")
     print(f"📝 配置文件: {project.dependencies_config}\n")
     
+    from src.dependency_graph import build_group_graph
+    
     groups = config.get('groups', {})
-    install_order = config.get('install_order', list(groups.keys()))
+    try:
+        install_order, after = build_group_graph(config)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
     total_packages = 0
     for group_name in install_order:
-        if group_name not in groups:
-            continue
-        
         group_config = groups[group_name]
         packages = group_config.get('packages', [])
         index_url = group_config.get('index_url')
@@ -340,6 +859,8 @@ def list_dependencies(args):
             print(f"   {description}")
         if index_url:
             print(f"   索引: {index_url}")
+        if after[group_name]:
+            print(f"   依赖组: {', '.join(after[group_name])}")
         print(f"   包数量: {len(packages)}")
         print(f"{'─'*60}")
         
@@ -355,7 +876,10 @@ def list_dependencies(args):
 
 
 def check_dependencies(args):
-    """检查依赖完整性"""
+    """检查依赖完整性（在项目 venv 中基于已安装分发包元数据检查，可选隔离导入测试）"""
+    from src.venv_manager import VenvManager
+    from src.venv_inspect import probe_requirements, check_imports
+    
     volume_path = detect_volume_path()
     
     try:
@@ -383,11 +907,12 @@ def check_dependencies(args):
     print(f"🔍 检查依赖完整性: {args.project}")
     print("=" * 60)
     
-    # 依赖路径
-    deps_path = Path(volume_path) / 'python-deps' / f'py{project.python_version}' / args.project
+    venv_mgr = VenvManager(volume_path)
+    venv_path = venv_mgr.get_venv_path(args.project, project.python_version)
+    python_bin = venv_path / 'bin' / 'python'
     
-    if not deps_path.exists():
-        print(f"\n❌ 依赖目录不存在: {deps_path}")
+    if not venv_mgr.venv_exists(venv_path):
+        print(f"\n❌ Venv 不存在: {venv_path}")
         print(f"\n💡 使用以下命令安装:")
         print(f"   python3 volume_cli.py deps install --project {args.project}")
         sys.exit(1)
@@ -403,40 +928,67 @@ def check_dependencies(args):
         print(f"\n⚠️  配置文件中没有定义依赖包")
         return
     
-    # 尝试导入依赖
-    import sys
-    sys.path.insert(0, str(deps_path))
+    print(f"🐍 解释器: {python_bin}\n")
+    try:
+        probe = probe_requirements(python_bin, all_packages)
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
     failed = []
     success = 0
+    skipped = 0
+    for entry in probe['requirements']:
+        status = entry['status']
+        if status == 'ok':
+            print(f"✅ {entry['name']} {entry['installed_version']}")
+            success += 1
+        elif status == 'skipped':
+            print(f"⏭️  {entry['requirement']}（环境标记不适用）")
+            skipped += 1
+        elif status == 'mismatch':
+            print(f"❌ {entry['requirement']}: 已安装 {entry['installed_version']}")
+            failed.append(entry['name'])
+        elif status == 'invalid':
+            print(f"❌ {entry['requirement']}: 无法解析 ({entry.get('error')})")
+            failed.append(entry['name'])
+        else:
+            print(f"❌ {entry['requirement']}: 未安装")
+            failed.append(entry['name'])
     
-    print()
-    for dep in all_packages:
-        # 提取包名（去掉版本号）
-        pkg_name = dep.split('==')[0].split('>=')[0].split('<=')[0].strip()
-        
-        # 特殊处理包名映射
-        import_name = pkg_name.replace('-', '_')
+    # 可选：在隔离子进程中导入顶层模块
+    import_failed = []
+    if args.imports or args.all:
+        if args.all:
+            modules = {m for dist in probe['installed'].values() for m in dist['top_level']}
+        else:
+            modules = {m for e in probe['requirements'] if e['status'] == 'ok' for m in e.get('top_level', [])}
+        modules = sorted(m for m in modules if m.isidentifier() and not m.startswith('_'))
         
-        try:
-            __import__(import_name)
-            print(f"✅ {pkg_name}")
-            success += 1
-        except ImportError as e:
-            print(f"❌ {pkg_name}: {e}")
-            failed.append(pkg_name)
+        print(f"\n🧪 导入测试: {len(modules)} 个模块（并发 {args.jobs}，超时 {args.timeout}s）")
+        outcomes = check_imports(python_bin, modules, jobs=args.jobs, timeout=args.timeout)
+        for module, (ok, error) in outcomes.items():
+            if not ok:
+                print(f"❌ import {module}: {error}")
+                import_failed.append(module)
+        print(f"✅ 导入成功: {len(modules) - len(import_failed)}/{len(modules)}")
     
     # 总结
     print("\n" + "=" * 60)
     print("📊 检查结果")
     print("=" * 60)
     print(f"✅ 成功: {success}")
+    if skipped:
+        print(f"⏭️  跳过: {skipped}")
     print(f"❌ 失败: {len(failed)}")
+    if import_failed:
+        print(f"❌ 导入失败: {len(import_failed)}")
     
-    if failed:
-        print(f"\n缺失的包:")
-        for pkg in failed:
-            print(f"  - {pkg}")
+    if failed or import_failed:
+        if failed:
+            print(f"\n缺失或版本不符的包:")
+            for pkg in failed:
+                print(f"  - {pkg}")
         print(f"\n💡 重新安装:")
         print(f"   python3 volume_cli.py deps install --project {args.project}")
         sys.exit(1)
@@ -444,6 +996,95 @@ def check_dependencies(args):
         print("\n✅ 所有依赖完整可用")
 
 
+def _progress_line(progress: dict, elapsed: float) -> str:
+    """跟踪模式下的单行进度"""
+    parts = []
+    total = progress.get('total_groups', 0)
+    if total:
+        current = progress.get('current_group') or '-'
+        parts.append(f"组 {progress.get('completed_groups', 0)}/{total} (当前 {current})")
+        parts.append(f"✅ {progress.get('success_count', 0)} ❌ {progress.get('failed_count', 0)}")
+    if progress.get('models'):
+        done = sum(1 for m in progress['models'].values() if m.get('status') != 'running')
+        parts.append(f"模型 {done}/{progress.get('total_models') or len(progress['models'])}")
+    parts.append(f"{elapsed:.0f}s")
+    return f"── 📊 {' | '.join(parts)} ──"
+
+
+def follow_task_status(task_manager, task_id: str, interval: float):
+    """跟踪任务：输出新增日志和进度变化，以任务的退出码退出"""
+    start = time.time()
+    last_line = None
+    try:
+        for kind, payload in task_manager.follow(task_id, poll_interval=interval):
+            if kind == 'log':
+                sys.stdout.write(payload)
+            elif kind == 'progress':
+                line = _progress_line(payload, time.time() - start)
+                # 只有进度本身变化时才输出（忽略耗时变化）
+                if line.rsplit('|', 1)[0] != (last_line or '').rsplit('|', 1)[0]:
+                    print(line)
+                    last_line = line
+            else:
+                task_info = payload
+            sys.stdout.flush()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"\n⚠️  停止跟踪（任务继续在后台运行）")
+        sys.exit(130)
+    
+    exit_code = task_info.get('progress', {}).get('exit_code')
+    if exit_code is None:
+        exit_code = 0 if task_info['status'] == 'completed' else 1
+    elif exit_code < 0:
+        # 被信号终止
+        exit_code = 128 - exit_code
+    icon = '✅' if exit_code == 0 else '❌'
+    print(f"\n{icon} 任务 {task_id} 结束: {task_info['status']}（退出码 {exit_code}）")
+    sys.exit(exit_code)
+
+
+def _format_rate(total, seconds) -> str:
+    """总量与平均速率，如 '1.2 GB (35.0 MB/s)'"""
+    if total is None:
+        return '-'
+    rate = f" ({format_size(total / seconds)}/s)" if seconds else ''
+    return f"{format_size(total)}{rate}"
+
+
+def _print_resources(progress: dict):
+    """资源占用：运行中显示最近一次采样，结束后显示峰值报告"""
+    summary = progress.get('resource_summary')
+    if summary:
+        seconds = summary.get('seconds') or 0
+        print(f"\n📈 资源占用（{seconds:.0f}s，{summary.get('cpus')} 核）:")
+        print(f"  CPU: {summary.get('cpu_seconds', 0):.1f}s CPU 时间，平均 {summary.get('avg_cpu_pct', 0):.0f}%，"
+              f"峰值 {summary.get('peak_cpu_pct', 0):.0f}%（100% = 1 核）")
+        peak_rss = format_size(summary['peak_rss']) if summary.get('peak_rss') else '-'
+        print(f"  内存: 进程树峰值 {peak_rss}，单进程峰值 {format_size(summary.get('max_process_rss') or 0)}，"
+              f"最多 {summary.get('peak_procs', 0)} 个进程")
+        print(f"  磁盘: 读 {_format_rate(summary.get('read_bytes'), seconds)}，"
+              f"写 {_format_rate(summary.get('write_bytes'), seconds)}")
+        print(f"  文件/套接字读写: 读 {_format_rate(summary.get('rchar'), seconds)}，"
+              f"写 {_format_rate(summary.get('wchar'), seconds)}")
+        if summary.get('net_rx') is not None:
+            print(f"  网络（所在网络命名空间）: 收 {_format_rate(summary['net_rx'], seconds)}，"
+                  f"发 {_format_rate(summary['net_tx'], seconds)}")
+        return
+    
+    sample = progress.get('resources')
+    if sample:
+        net = ''
+        if sample.get('net_rx') is not None:
+            net = f" | 网络 ↓{format_size(sample['net_rx'])} ↑{format_size(sample['net_tx'])}"
+        print(f"\n📈 资源（{sample.get('elapsed', 0):.0f}s）: CPU {sample.get('cpu_pct', 0):.0f}% "
+              f"(峰值 {sample.get('peak_cpu_pct', 0):.0f}%) | 内存 {format_size(sample.get('rss') or 0)} "
+              f"(峰值 {format_size(sample.get('peak_rss') or 0)}) | {sample.get('procs', 0)} 个进程 | "
+              f"磁盘 读 {format_size(sample.get('read_bytes') or 0)} 写 {format_size(sample.get('write_bytes') or 0)}{net}")
+
+
 def check_task_status(args):
     """检查任务状态"""
     from src.task_manager import TaskManager
@@ -451,9 +1092,13 @@ def check_task_status(args):
     volume_path = detect_volume_path()
     task_manager = TaskManager(volume_path)
     
+    if getattr(args, 'follow', False) and args.task_id:
+        follow_task_status(task_manager, args.task_id, args.interval)
+        return
+    
     # 如果没有提供任务ID，列出所有任务
     if not hasattr(args, 'task_id') or not args.task_id:
-        tasks = task_manager.list_tasks()
+        tasks = task_manager.list_tasks(limit=10)  # 只显示最近10个
         if not tasks:
             print("📋 没有找到任何任务")
             return
@@ -461,11 +1106,12 @@ def check_task_status(args):
         print("=" * 60)
         print("📋 任务列表")
         print("=" * 60)
-        for task in tasks[:10]:  # 只显示最近10个
+        for task in tasks:
             status_icon = {
                 'running': '🔄',
                 'completed': '✅',
                 'failed': '❌',
+                'stopped': '⏹️',
                 'unknown': '❓'
             }.get(task.get('status', 'unknown'), '❓')
             
@@ -496,6 +1142,7 @@ def check_task_status(args):
         'running': '🔄 运行中',
         'completed': '✅ 已完成',
         'failed': '❌ 失败',
+        'stopped': '⏹️  已停止',
         'unknown': '❓ 未知'
     }.get(task_info['status'], '❓ 未知')
     print(f"🔄 状态: {status_icon}")
@@ -529,6 +1176,35 @@ def check_task_status(args):
         if progress.get('retry_count', 0) > 0:
             print(f"  🔄 重试: {progress.get('retry_count', 0)} 次")
     
+    # 事件流中的每组耗时/大小/退出码
+    if progress.get('groups'):
+        print(f"\n  {'组':<20} {'状态':<8} {'预取':>8} {'安装':>8} {'大小':>10} 退出码")
+        for name, group in progress['groups'].items():
+            icon = {'success': '✅', 'failed': '❌', 'skipped': '⏭️', 'running': '🔄'}.get(group.get('status'), '❓')
+            prefetch = f"{group['prefetch_seconds']:.1f}s" if group.get('prefetch_seconds') is not None else '-'
+            seconds = f"{group['seconds']:.1f}s" if group.get('seconds') is not None else '-'
+            size = format_size(group['bytes']) if group.get('bytes') else '-'
+            exit_code = group.get('exit_code') if group.get('exit_code') is not None else '-'
+            print(f"  {icon} {name:<18} {group.get('status', ''):<8} {prefetch:>8} {seconds:>8} {size:>10} {exit_code}")
+    if progress.get('models'):
+        print(f"\n🤖 模型: {len(progress['models'])}/{progress.get('total_models') or len(progress['models'])}")
+        for model_id, model in progress['models'].items():
+            icon = {'success': '✅', 'failed': '❌', 'running': '🔄'}.get(model.get('status'), '❓')
+            size = f" {format_size(model['bytes'])}" if model.get('bytes') else ''
+            seconds = f" {model['seconds']:.1f}s" if model.get('seconds') is not None else ''
+            print(f"  {icon} {model_id}{size}{seconds}")
+    if task_info.get('scheduling'):
+        from src.task_priority import describe_scheduling
+        print(f"\n🐢 调度: {describe_scheduling(task_info['scheduling'])}")
+        applied = progress.get('scheduling')
+        if applied:
+            for key, reason in applied.get('errors', {}).items():
+                print(f"  ⚠️  {key} 未生效: {reason}")
+    _print_resources(progress)
+    if progress.get('exit_code') is not None:
+        duration = f"（耗时 {progress['seconds']:.1f}s）" if progress.get('seconds') is not None else ''
+        print(f"\n🏁 退出码: {progress['exit_code']}{duration}")
+    
     # 日志文件
     print(f"\n💡 实时日志:")
     print(f"  tail -f {task_info['log_file']}")
@@ -577,3 +1253,23 @@ def stop_task(args):
         print(f"❌ 停止任务失败: {e}")
         sys.exit(1)
 
+
+def clean_tasks(args):
+    """按保留策略归档旧的后台任务"""
+    from src.task_manager import TaskManager
+    
+    volume_path = detect_volume_path()
+    task_manager = TaskManager(volume_path)
+    
+    stats = task_manager.prune_tasks(max_age_days=args.days, keep=args.keep, dry_run=args.dry_run)
+    if not stats['tasks']:
+        print(f"✅ 没有需要清理的任务（保留 {args.days:g} 天内、最近 {args.keep} 个已结束任务）")
+        return
+    
+    if args.dry_run:
+        print(f"🔍 将归档 {len(stats['tasks'])} 个任务（日志 {format_size(stats['bytes'])}）:")
+        for task_id in stats['tasks']:
+            print(f"  - {task_id}")
+    else:
+        print(f"🗜️  已归档 {len(stats['tasks'])} 个任务: {format_size(stats['bytes'])} → "
+              f"{format_size(stats['archived_bytes'])}（{task_manager.archive_dir}）")
@@ -4,9 +4,13 @@
 模型管理命令
 """
 import sys
+import time
 from src.projects.loader import get_project
 from src.volume_manager import VolumeManager
 from src.downloaders.factory import DownloaderFactory
+from src.task_events import emit
+from src.setup_journal import SetupJournal
+from src.leases import Lease, describe_holder
 from .utils import detect_volume_path
 
 
@@ -105,10 +109,20 @@ def download_models(args):
     success = 0
     skipped = 0
     failed = []
+    # 已存在的模型最后一次性注册（一个事务），新下载的模型下载完立即注册
+    existing = []
+    # 在 setup 中运行时，上次 setup 已完成的模型直接跳过（不再检查和注册）
+    journal = SetupJournal.from_env()
     
     for i, (model_id, source) in enumerate(all_models, 1):
         print(f"[{i}/{len(all_models)}] {model_id} ({source})")
         
+        if journal and not args.force and journal.is_done(f'model:{model_id}'):
+            print(f"  ⏭️  上次 setup 已完成，跳过")
+            skipped += 1
+            continue
+        step_start = time.time()
+        
         # 获取下载器
         try:
             downloader = DownloaderFactory.get_downloader(source, model_cache)
@@ -121,18 +135,52 @@ def download_models(args):
         if not args.force and manager.check_model_exists(model_id, source):
             print(f"  ⏭️  已存在，跳过")
             skipped += 1
-            # 注册到元数据
-            manager.register_model(args.project, model_id, source)
+            existing.append((model_id, source, None))
+            if journal:
+                journal.record(f'model:{model_id}', 'done', seconds=round(time.time() - step_start, 3), existed=True)
             continue
         
-        # 下载
-        if downloader.download(model_id):
-            print(f"  ✅ 下载完成")
-            success += 1
-            # 注册到元数据
-            manager.register_model(args.project, model_id, source)
-        else:
-            failed.append(model_id)
+        # 同一模型同一时刻只有一个进程（可能在其他 Pod 上）下载，其余等待并复用结果
+        lease = Lease(volume_path, f'model:{source}:{model_id}')
+        lease.acquire(on_wait=lambda holder: print(f"  ⏳ 正在由 {describe_holder(holder)} 下载，等待其完成..."))
+        for stale in lease.recovered:
+            print(f"  ♻️  已回收失效的下载租约: {stale.get('holder') or '未知'}")
+        ok, size = False, None
+        try:
+            previous = lease.last_result(since=step_start)
+            if manager.check_model_exists(model_id, source) and (
+                    not args.force or (previous and previous.get('ok'))):
+                print(f"  ✅ {previous['holder'] if previous else '其他进程'} 已完成下载，复用")
+                skipped += 1
+                ok = True
+                existing.append((model_id, source, previous.get('bytes') if previous else None))
+                if journal:
+                    journal.record(f'model:{model_id}', 'done', seconds=round(time.time() - step_start, 3), existed=True)
+                continue
+            
+            # 下载
+            emit('model_started', model=model_id, source=source, current=i, total=len(all_models))
+            download_start = time.time()
+            if downloader.download(model_id):
+                print(f"  ✅ 下载完成")
+                success += 1
+                ok = True
+                size = _record_model_throughput(volume_path, model_cache, model_id, source, time.time() - download_start)
+                emit('model_finished', model=model_id, ok=True, bytes=size,
+                     seconds=round(time.time() - download_start, 3))
+                # 注册到元数据
+                manager.register_model(args.project, model_id, source, size)
+                if journal:
+                    journal.record(f'model:{model_id}', 'done', seconds=round(time.time() - step_start, 3), bytes=size)
+            else:
+                failed.append(model_id)
+                emit('model_finished', model=model_id, ok=False, seconds=round(time.time() - download_start, 3))
+                if journal:
+                    journal.record(f'model:{model_id}', 'failed', seconds=round(time.time() - step_start, 3))
+        finally:
+            lease.release({'ok': ok, 'bytes': size})
+    
+    manager.register_models(args.project, existing)
     
     # 统计
     print("\n" + "=" * 60)
@@ -149,6 +197,26 @@ def download_models(args):
         print("\n✅ 所有模型下载完成")
 
 
+def _record_model_throughput(volume_path: str, model_cache: str, model_id: str, source: str, seconds: float):
+    """记录模型下载吞吐量（供 plan 估算时间）和磁盘占用（供 status 显示），返回模型目录大小"""
+    from src.disk_usage import UsageCache, measure
+    from src.local_cache import model_dir
+    from src.metadata_store import MetadataStore
+    from src.throughput import ThroughputHistory
+    
+    target = model_dir(model_cache, model_id, source)
+    if not target.exists():
+        return None
+    usage = measure(target)
+    try:
+        store = MetadataStore(volume_path)
+        ThroughputHistory(volume_path, store).record('models', usage['bytes'], seconds)
+        UsageCache(volume_path, store).record_model(model_id, source, usage)
+    except OSError:
+        pass
+    return usage['bytes']
+
+
 def list_models(args):
     """列出项目模型"""
     try:
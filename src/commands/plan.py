@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安装计划命令
+"""
+import sys
+import shutil
+from pathlib import Path
+from src.projects.loader import get_project
+from src.volume_manager import VolumeManager
+from src.venv_manager import VenvManager
+from src.throughput import ThroughputHistory
+from src.install_plan import INSTALL_EXPANSION, plan_dependencies, plan_models
+from src.fs_utils import format_size
+from .utils import detect_volume_path
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} 分钟"
+    return f"{seconds / 3600:.1f} 小时"
+
+
+def _format_rate(history: ThroughputHistory, kind: str) -> str:
+    rate, samples = history.rate(kind)
+    source = f"{samples} 次历史记录" if samples else "默认值，尚无历史记录"
+    return f"{format_size(int(rate))}/s（{source}）"
+
+
+def handle_plan(args):
+    """处理 plan 命令：预估 setup 的下载量、磁盘增量和耗时"""
+    print("=" * 60)
+    print(f"🧮 安装计划: {args.project}")
+    print("=" * 60)
+
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    volume_path = detect_volume_path()
+    history = ThroughputHistory(volume_path)
+    python_version = args.python or project.python_version
+    print(f"📂 Volume: {volume_path}")
+    print(f"🐍 Python: {python_version}")
+
+    deps_bytes = deps_unknown = 0
+    models_bytes = models_unknown = 0
+
+    # ==================== 依赖 ====================
+    if not args.skip_deps and project.dependencies_config and Path(project.dependencies_config).exists():
+        venv_mgr = VenvManager(volume_path)
+        venv_path = venv_mgr.get_venv_path(args.project, python_version)
+        print(f"\n📦 解析依赖（uv pip compile，不安装）...")
+
+        try:
+            plan = plan_dependencies(project.dependencies_config, python_version, venv_path=venv_path,
+                                     mirror=args.mirror, jobs=args.jobs)
+        except (OSError, ValueError) as e:
+            print(f"❌ 解析失败: {e}")
+            sys.exit(1)
+
+        packages = plan['packages']
+        present = [p for p in packages if p['present']]
+        missing = [p for p in packages if not p['present']]
+        deps_bytes = sum(p['size'] for p in missing if p['size'])
+        deps_unknown = sum(1 for p in missing if not p['size'])
+
+        print(f"  共 {len(packages)} 个包: 已安装 {len(present)} 个，需下载 {len(missing)} 个")
+        for group_name, error in plan['errors'].items():
+            print(f"  ❌ 组 {group_name} 解析失败: {error}")
+
+        if args.verbose:
+            for p in sorted(missing, key=lambda p: -(p['size'] or 0)):
+                size = format_size(p['size']) if p['size'] else '大小未知'
+                print(f"    - {p['name']}=={p['version']} [{p['group']}] {size}"
+                      f"{'  ⚠️  ' + p['error'] if p.get('error') else ''}")
+        else:
+            for p in sorted(missing, key=lambda p: -(p['size'] or 0))[:10]:
+                if p['size']:
+                    print(f"    - {p['name']}=={p['version']} {format_size(p['size'])}")
+
+        print(f"  📥 下载: {format_size(deps_bytes)}"
+              f"{f'（另有 {deps_unknown} 个包大小未知）' if deps_unknown else ''}")
+        if missing and deps_bytes:
+            # 从零创建 venv 时全量安装，已有 venv 则只新增差异部分
+            print(f"  💽 venv 增量: ~{format_size(int(deps_bytes * INSTALL_EXPANSION))}（按 wheel 解压约 {INSTALL_EXPANSION:g} 倍估算）")
+    elif not args.skip_deps:
+        print(f"\n📦 项目未定义依赖配置，跳过依赖")
+
+    # ==================== 模型 ====================
+    all_models = project.get_all_models()
+    if not args.skip_models and all_models:
+        manager = VolumeManager(volume_path)
+        print(f"\n🤖 查询模型文件列表...")
+        entries = plan_models(all_models, manager.check_model_exists, jobs=min(args.jobs, 8))
+        for entry in entries:
+            label = f"{entry['model_id']} ({entry['source']})"
+            if entry['present']:
+                print(f"  ⏭️  {label}: 已存在")
+                continue
+            if entry['error']:
+                models_unknown += 1
+                print(f"  ⚠️  {label}: 大小未知（{entry['error']}）")
+                continue
+            models_bytes += entry['size']
+            print(f"  📥 {label}: {entry['files']} 个文件, {format_size(entry['size'])}")
+
+    # ==================== 汇总 ====================
+    venv_growth = int(deps_bytes * INSTALL_EXPANSION)
+    disk_delta = venv_growth + models_bytes
+
+    print("\n" + "=" * 60)
+    print("📊 汇总")
+    print("=" * 60)
+    print(f"📥 下载量: {format_size(deps_bytes + models_bytes)}"
+          f"（依赖 {format_size(deps_bytes)}，模型 {format_size(models_bytes)}）")
+    print(f"💽 磁盘增量: ~{format_size(disk_delta)}")
+
+    free = shutil.disk_usage(volume_path).free
+    print(f"📂 Volume 可用空间: {format_size(free)}")
+    if disk_delta > free:
+        print(f"❌ 可用空间不足，还差 {format_size(disk_delta - free)}")
+
+    seconds = 0.0
+    if deps_bytes:
+        seconds += history.estimate('deps', venv_growth) or 0
+        print(f"⏱️  依赖安装速度: {_format_rate(history, 'deps')}")
+    if models_bytes:
+        seconds += history.estimate('models', models_bytes) or 0
+        print(f"⏱️  模型下载速度: {_format_rate(history, 'models')}")
+    print(f"⏱️  预计耗时: {_format_seconds(seconds)}")
+
+    if deps_unknown or models_unknown:
+        print(f"\n⚠️  {deps_unknown + models_unknown} 项大小未知（网络/索引不可用），以上为下限")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务队列命令
+"""
+import sys
+from src.job_queue import JobQueue, QueueWorker
+from src.task_priority import build_scheduling, describe_scheduling
+from .utils import detect_volume_path
+
+
+def handle_queue(args):
+    """处理 queue 命令"""
+    if args.queue_command == 'submit':
+        submit_job(args)
+    elif args.queue_command == 'list':
+        list_jobs(args)
+    elif args.queue_command == 'worker':
+        run_worker(args)
+    elif args.queue_command == 'cancel':
+        cancel_job(args)
+    else:
+        print("❌ 未知的 queue 子命令")
+        sys.exit(1)
+
+
+def submit_job(args):
+    """提交任务到队列"""
+    argv = args.job[1:] if args.job and args.job[0] == '--' else args.job
+    if not argv:
+        print("❌ 请在 -- 之后给出要运行的命令，如: queue submit -- deps install --project tts")
+        sys.exit(1)
+
+    try:
+        scheduling = build_scheduling(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    queue = JobQueue(detect_volume_path())
+    job = queue.submit(argv, priority=args.priority, conflict_keys=args.key, scheduling=scheduling)
+
+    print("=" * 60)
+    print("📥 任务已入队")
+    print("=" * 60)
+    print(f"📋 任务ID: {job['job_id']}")
+    print(f"📦 命令: {' '.join(argv)}")
+    print(f"⬆️  优先级: {job['priority']}")
+    if job['conflict_keys']:
+        print(f"🔒 冲突键: {', '.join(job['conflict_keys'])}")
+    if scheduling:
+        print(f"🐢 调度: {describe_scheduling(scheduling)}")
+    print(f"\n💡 需要有 worker 在运行:")
+    print(f"   python3 volume_cli.py queue worker --slots 2")
+    print(f"💡 查看队列:")
+    print(f"   python3 volume_cli.py queue list")
+
+
+def list_jobs(args):
+    """列出队列中的任务"""
+    queue = JobQueue(detect_volume_path())
+    jobs = queue.list_jobs()
+    if not args.all:
+        jobs = [j for j in jobs if j['status'] in ('queued', 'running')]
+    if not jobs:
+        print("📋 队列为空" if not args.all else "📋 没有任何任务")
+        return
+
+    icons = {'queued': '⏳', 'running': '🔄', 'completed': '✅', 'failed': '❌', 'cancelled': '🚫'}
+    print(f"{'':<3}{'任务ID':<28} {'优先级':>6}  {'状态':<10} 命令")
+    for job in sorted(jobs, key=lambda j: (j['status'] != 'running', -j.get('priority', 0), j['submitted_at'])):
+        status = job['status'] + ('*' if job['status'] == 'running' and job.get('cancel_requested') else '')
+        print(f"{icons.get(job['status'], '❓'):<3}{job['job_id']:<28} {job.get('priority', 0):>6}  "
+              f"{status:<10} {' '.join(job['argv'])}")
+        if job['status'] == 'running':
+            print(f"{'':<32}worker: {job.get('worker')}  日志: {job.get('log_file', '-')}")
+    print(f"\n💡 运行中任务的进度: python3 volume_cli.py deps status <任务ID>")
+
+
+def run_worker(args):
+    """运行队列 worker"""
+    worker = QueueWorker(detect_volume_path(), slots=args.slots, poll_interval=args.poll)
+    worker.run(exit_when_idle=args.exit_when_idle)
+
+
+def cancel_job(args):
+    """取消任务"""
+    queue = JobQueue(detect_volume_path())
+    try:
+        status = queue.cancel(args.job_id)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if status == 'cancelled':
+        print(f"🚫 已取消: {args.job_id}")
+    elif status == 'running':
+        print(f"🛑 已请求终止运行中的任务: {args.job_id}（由所属 worker 在下一轮发送 SIGTERM）")
+    else:
+        print(f"⚠️  任务已结束（{status}），无需取消")
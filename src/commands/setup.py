@@ -2,25 +2,150 @@
 # -*- coding: utf-8 -*-
 """
 一键设置命令
+
+setup 是一条步骤流水线（venv 创建、每个依赖组、后处理、激活、每个模型），
+每步完成后写入 .metadata/setup/<项目>.jsonl，Pod 被抢占后重新运行会从中断处继续
 """
+import os
+import re
 import sys
-from .dependencies import install_dependencies
+import time
+import threading
+import subprocess
+from pathlib import Path
+from src.projects.loader import get_project
+from src.setup_journal import JOURNAL_ENV, SetupJournal, config_fingerprint
+from .dependencies import install_dependencies, _stream_prefixed
 from .models import download_models
+from .utils import detect_volume_path
 
 
-def handle_setup(args):
-    """处理 setup 命令 - 一键设置项目（依赖+模型）"""
-    print("=" * 60)
-    print("🚀 一键设置项目")
-    print("=" * 60)
-    print(f"\n📦 项目: {args.project}\n")
+class SetupProgress:
+    """汇总各阶段子进程输出中的进度，有变化时输出一行合并进度"""
+    
+    _GROUP_RE = re.compile(r'^\[PROGRESS\] group=(\S+) current=(\d+) total=(\d+)')
+    _MODEL_RE = re.compile(r'^\[(\d+)/(\d+)\] (\S+)')
+    
+    def __init__(self, stages):
+        self.start = time.time()
+        self.state = {stage: '运行中' for stage in stages}
+    
+    def on_line(self, stage: str, line: str):
+        """解析一行输出（调用方持有输出锁）"""
+        text = line.strip()
+        match = self._GROUP_RE.match(text)
+        if stage == 'deps' and match:
+            state = f"组 {int(match.group(2)) + 1}/{match.group(3)} ({match.group(1)})"
+        elif stage == 'models' and self._MODEL_RE.match(text):
+            match = self._MODEL_RE.match(text)
+            state = f"模型 {match.group(1)}/{match.group(2)} ({match.group(3)})"
+        else:
+            return
+        self.state[stage] = state
+        self.print_line()
+    
+    def finish(self, stage: str, ok: bool, seconds: float):
+        self.state[stage] = f"{'✅ 完成' if ok else '❌ 失败'} ({seconds:.0f}s)"
+        self.print_line()
+    
+    def print_line(self):
+        parts = ' | '.join(f"{stage}: {state}" for stage, state in self.state.items())
+        sys.stdout.write(f"📊 [setup {time.time() - self.start:.0f}s] {parts}\n")
+
+
+def _stage_commands(args, journal: SetupJournal):
+    """各阶段对应的 CLI 子命令（上次 setup 已完成的阶段不再运行）"""
+    cli_path = os.path.abspath(sys.argv[0])
+    stages = {}
+    for stage in ('deps', 'models'):
+        if not getattr(args, f'skip_{stage}') and journal.is_done(f'stage:{stage}'):
+            print(f"⏭️  {'依赖安装' if stage == 'deps' else '模型下载'}: 上次 setup 已完成")
+    if not args.skip_deps and not journal.is_done('stage:deps'):
+        cmd = [sys.executable, cli_path, 'deps', 'install', '--project', args.project]
+        if args.mirror:
+            cmd.extend(['--mirror', args.mirror])
+        stages['deps'] = cmd
+    if not args.skip_models and not journal.is_done('stage:models'):
+        stages['models'] = [sys.executable, cli_path, 'models', 'download', '--project', args.project]
+    return stages
+
+
+def _run_pipelined(args, journal: SetupJournal) -> bool:
+    """
+    依赖安装与模型下载并发执行（前者主要耗 CPU/磁盘，后者主要耗网络，互不共享资源）
+    
+    每个阶段一个 CLI 子进程，输出加 [deps]/[models] 前缀交错转发，
+    任一阶段失败不影响另一阶段，总耗时约为两者中较长的一个
+    
+    Returns:
+        是否有阶段失败
+    """
+    stages = _stage_commands(args, journal)
+    if args.skip_deps:
+        print("⏭️  跳过依赖安装")
+    if args.skip_models:
+        print("⏭️  跳过模型下载")
+    if not stages:
+        return False
+    
+    env = os.environ.copy()
+    env['PYTHONUNBUFFERED'] = '1'
+    lock = threading.Lock()
+    progress = SetupProgress(stages)
+    runs = {}
+    
+    print(f"⚡ 并发执行: {' + '.join(stages)}\n")
+    for stage, cmd in stages.items():
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, env=env, bufsize=1)
+        on_line = lambda line, stage=stage: progress.on_line(stage, line)
+        reader = threading.Thread(target=_stream_prefixed, args=(proc, f'[{stage}]', lock, on_line), daemon=True)
+        reader.start()
+        runs[stage] = {'proc': proc, 'reader': reader, 'start': time.time()}
+    
+    # 按完成先后收集结果，先完成的阶段立即报告
+    pending = dict(runs)
+    while pending:
+        for stage, run in list(pending.items()):
+            if run['proc'].poll() is None:
+                continue
+            run['reader'].join()
+            run['seconds'] = time.time() - run['start']
+            run['ok'] = run['proc'].returncode == 0
+            journal.record(f'stage:{stage}', 'done' if run['ok'] else 'failed',
+                           seconds=round(run['seconds'], 3), exit_code=run['proc'].returncode)
+            with lock:
+                progress.finish(stage, run['ok'], run['seconds'])
+                sys.stdout.flush()
+            del pending[stage]
+        if pending:
+            time.sleep(0.2)
     
+    total = time.time() - progress.start
+    print("\n" + "-" * 60)
+    for stage, run in runs.items():
+        print(f"  {'✅' if run['ok'] else '❌'} {stage:<8} {run['seconds']:>7.1f}s")
+    serial = sum(run['seconds'] for run in runs.values())
+    print(f"  ⏱️  总耗时 {total:.1f}s（串行约需 {serial:.1f}s）")
+    
+    for stage, run in runs.items():
+        if not run['ok']:
+            print(f"\n⚠️  {'依赖安装' if stage == 'deps' else '模型下载'}失败（退出码 {run['proc'].returncode}），见上方 [{stage}] 输出")
+    return any(not run['ok'] for run in runs.values())
+
+
+def _run_sequential(args, journal: SetupJournal) -> bool:
+    """依次安装依赖、下载模型（在当前进程中执行）"""
     has_error = False
     
     # 1. 安装依赖
-    if not args.skip_deps:
+    if not args.skip_deps and journal.is_done('stage:deps'):
+        print("⏭️  依赖安装: 上次 setup 已完成\n")
+    elif not args.skip_deps:
         print("步骤 1/2: 安装依赖")
         print("-" * 60)
+        stage_start = time.time()
+        stage_ok = True
         try:
             # 复制参数
             deps_args = type('obj', (object,), {
@@ -33,18 +158,24 @@ def handle_setup(args):
         except SystemExit as e:
             if e.code != 0:
                 print("\n⚠️  依赖安装失败，但继续模型下载...")
-                has_error = True
+                stage_ok = False
         except Exception as e:
             print(f"\n⚠️  依赖安装出错: {e}")
-            has_error = True
+            stage_ok = False
+        journal.record('stage:deps', 'done' if stage_ok else 'failed', seconds=round(time.time() - stage_start, 3))
+        has_error = has_error or not stage_ok
         print()
     else:
         print("⏭️  跳过依赖安装\n")
     
     # 2. 下载模型
-    if not args.skip_models:
+    if not args.skip_models and journal.is_done('stage:models'):
+        print("⏭️  模型下载: 上次 setup 已完成\n")
+    elif not args.skip_models:
         print("步骤 2/2: 下载模型")
         print("-" * 60)
+        stage_start = time.time()
+        stage_ok = True
         try:
             # 复制参数
             models_args = type('obj', (object,), {
@@ -56,14 +187,72 @@ def handle_setup(args):
         except SystemExit as e:
             if e.code != 0:
                 print("\n⚠️  模型下载失败")
-                has_error = True
+                stage_ok = False
         except Exception as e:
             print(f"\n⚠️  模型下载出错: {e}")
-            has_error = True
+            stage_ok = False
+        journal.record('stage:models', 'done' if stage_ok else 'failed', seconds=round(time.time() - stage_start, 3))
+        has_error = has_error or not stage_ok
         print()
     else:
         print("⏭️  跳过模型下载\n")
     
+    return has_error
+
+
+def _fingerprint(args) -> str:
+    """影响 setup 结果的配置：依赖配置内容、Python 版本、模型列表、镜像源"""
+    try:
+        project = get_project(args.project)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    deps_config = ''
+    if project.dependencies_config and Path(project.dependencies_config).exists():
+        deps_config = Path(project.dependencies_config).read_text(encoding='utf-8')
+    return config_fingerprint(deps_config, project.python_version, sorted(project.get_all_models()), args.mirror)
+
+
+def _print_steps(journal: SetupJournal, since: float):
+    """每个步骤的耗时（本次之前完成的步骤标记为续传跳过）"""
+    journal.load()
+    steps = [r for r in journal.summary() if r['step'] != 'run']
+    if not steps:
+        return
+    print(f"\n⏱️  步骤耗时:")
+    for record in steps:
+        icon = '✅' if record['status'] == 'done' else '❌'
+        seconds = f"{record['seconds']:.1f}s" if record.get('seconds') is not None else '-'
+        note = '（上次完成）' if record['ts'] < since else ''
+        print(f"  {icon} {record['step']:<36} {seconds:>8} {note}")
+
+
+def handle_setup(args):
+    """处理 setup 命令 - 一键设置项目（依赖+模型）"""
+    print("=" * 60)
+    print("🚀 一键设置项目")
+    print("=" * 60)
+    print(f"\n📦 项目: {args.project}\n")
+    
+    volume_path = detect_volume_path()
+    journal = SetupJournal.for_project(volume_path, args.project)
+    since = time.time()
+    if journal.begin(_fingerprint(args), restart=args.restart):
+        done = sum(1 for r in journal.steps.values() if r['status'] == 'done')
+        print(f"♻️  从上次中断处继续（{done} 个步骤已完成，--restart 可从头开始）\n")
+    # 子进程（及顺序模式下的当前进程）据此记录和跳过步骤
+    os.environ[JOURNAL_ENV] = str(journal.path)
+    
+    if args.sequential:
+        has_error = _run_sequential(args, journal)
+    else:
+        has_error = _run_pipelined(args, journal)
+    
+    # 子进程写入的步骤记录
+    journal.load()
+    journal.finish(ok=not has_error)
+    _print_steps(journal, since)
+    
     # 总结
     print("=" * 60)
     if has_error:
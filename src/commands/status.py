@@ -4,10 +4,37 @@
 状态查看命令
 """
 import os
+import time
 from src.volume_manager import VolumeManager
+from src.disk_usage import UsageCache
+from src.fs_utils import format_size
 from .utils import detect_volume_path
 
 
+def _print_project(stats: dict):
+    """单个项目的统计（大小来自磁盘占用缓存）"""
+    print(f"   依赖: {stats['dependencies_count']} 个", end='')
+    if 'dependencies_size' in stats:
+        print(f" ({stats['dependencies_size']})")
+    else:
+        print()
+    for venv in stats.get('venvs', []):
+        stale = "，当前代已变化，可能过期" if venv['stale'] else ""
+        print(f"     - {venv['name']}: {format_size(venv['bytes'])} / {venv['files']} 个文件"
+              f"（统计于 {venv['updated_at'][:19]}{stale}）")
+    print(f"   模型: {stats['models_count']} 个", end='')
+    if stats.get('models_bytes'):
+        print(f" ({format_size(stats['models_bytes'])})")
+    else:
+        print()
+    if stats.get('missing'):
+        print(f"   ⚠️  {stats['missing']} 个已注册模型的目录不在 Volume 上")
+    if stats.get('unmeasured'):
+        print(f"   ⚠️  {stats['unmeasured']} 个目录尚未统计大小（status --refresh）")
+    if stats.get('last_updated'):
+        print(f"   更新: {stats['last_updated']}")
+
+
 def handle_status(args):
     """处理 status 命令"""
     volume_path = detect_volume_path()
@@ -18,20 +45,23 @@ def handle_status(args):
     print("=" * 60)
     print(f"📂 Volume 路径: {volume_path}\n")
     
+    if getattr(args, 'refresh', False):
+        names = [args.project] if args.project else manager.store.project_names()
+        start = time.time()
+        print(f"🔄 重新统计磁盘占用...")
+        count = UsageCache(volume_path, manager.store).refresh(names)
+        print(f"✅ 已统计 {count} 个目录 ({time.time() - start:.1f}s)\n")
+    
     if args.project:
         # 显示单个项目
         stats = manager.get_project_stats(args.project)
-        if not stats.get('dependencies_count') and not stats.get('models_count'):
+        if not (stats.get('dependencies_count') or stats.get('models_count')
+                or stats.get('venvs') or stats.get('unmeasured')):
             print(f"⚠️  项目 {args.project} 尚未安装")
             return
         
         print(f"📦 项目: {stats['project']}")
-        print(f"   依赖: {stats['dependencies_count']} 个")
-        if 'dependencies_size' in stats:
-            print(f"   大小: {stats['dependencies_size']}")
-        print(f"   模型: {stats['models_count']} 个")
-        if stats.get('last_updated'):
-            print(f"   更新: {stats['last_updated']}")
+        _print_project(stats)
     else:
         # 显示所有项目
         projects = manager.list_projects()
@@ -43,14 +73,15 @@ def handle_status(args):
             return
         
         print(f"已安装项目: {len(projects)}\n")
+        paths = {}
         for stats in projects:
             print(f"📦 {stats['project']}")
-            print(f"   依赖: {stats['dependencies_count']} 个", end='')
-            if 'dependencies_size' in stats:
-                print(f" ({stats['dependencies_size']})")
-            else:
-                print()
-            print(f"   模型: {stats['models_count']} 个")
-            if stats.get('last_updated'):
-                print(f"   更新: {stats['last_updated']}")
+            _print_project(stats)
+            paths.update(stats.get('paths', {}))
             print()
+        
+        # 模型可能被多个项目共享，按路径去重后汇总
+        venvs_bytes = sum(size for path, size in paths.items() if path.startswith('venvs' + os.sep))
+        models_bytes = sum(paths.values()) - venvs_bytes
+        print(f"💾 合计: venv {format_size(venvs_bytes)}，模型 {format_size(models_bytes)}"
+              f"（缓存值，status --refresh 重新统计）")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地盘预热命令
+"""
+import sys
+import shlex
+from src.fs_utils import parse_size
+from src.local_cache import warm_project
+from .utils import detect_volume_path
+
+
+def handle_warm(args):
+    """处理 warm 命令：把项目的 venv 和模型复制到本地盘并输出环境变量"""
+    try:
+        budget = parse_size(args.budget) if args.budget else None
+    except ValueError:
+        print(f"❌ 无效的预算大小: {args.budget}")
+        sys.exit(1)
+    
+    volume_path = detect_volume_path()
+    
+    # 进度输出到 stderr，stdout 只保留 export 语句，方便 eval "$(...)"
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        print("=" * 60)
+        print(f"🔥 本地盘预热: {args.project}")
+        print("=" * 60)
+        print(f"📂 Volume: {volume_path}")
+        print(f"📍 本地缓存: {args.dest}")
+        
+        try:
+            env = warm_project(
+                args.project,
+                volume_path,
+                cache_root=args.dest,
+                budget_bytes=budget,
+                include_venv=not args.skip_venv,
+                include_models=not args.skip_models,
+                workers=args.workers
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    finally:
+        sys.stdout = stdout
+    
+    lines = [f"export {key}={shlex.quote(value)}" for key, value in env.items()]
+    if args.env_file:
+        with open(args.env_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        print(f"✅ 环境变量已写入 {args.env_file}", file=sys.stderr)
+    print('\n'.join(lines))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依赖组 DAG - 解析 dependencies.yaml 中各组的 after 依赖关系
+
+兼容规则:
+- 任何组都没有声明 after 时，按 install_order 串行（每组依赖前一组），与旧行为一致
+- 只要有组声明了 after，未声明的组视为无依赖，可与其他组并行准备
+"""
+from typing import Dict, List, Tuple
+
+
+def build_group_graph(config: Dict) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    构建依赖组 DAG
+
+    Args:
+        config: dependencies.yaml 解析结果
+
+    Returns:
+        (order, after)
+        - order: 需要安装的组（按 install_order 优先级，已做拓扑排序）
+        - after: {组名: [必须先安装完成的组]}
+
+    Raises:
+        ValueError: after 引用了不存在的组或存在循环依赖
+    """
+    groups = config.get('groups', {}) or {}
+    install_order = config.get('install_order', list(groups.keys())) or []
+    names = [g for g in install_order if groups.get(g) and groups[g].get('packages')]
+
+    declared = any('after' in (groups[g] or {}) for g in names)
+    after = {}
+    for i, name in enumerate(names):
+        if declared:
+            deps = groups[name].get('after') or []
+            if isinstance(deps, str):
+                deps = [deps]
+        else:
+            deps = names[i - 1:i]
+        for dep in deps:
+            if dep not in names:
+                raise ValueError(f"依赖组 {name} 的 after 引用了未启用的组: {dep}")
+        after[name] = list(deps)
+
+    # Kahn 拓扑排序，同层按 install_order 顺序
+    order = []
+    remaining = list(names)
+    while remaining:
+        ready = [g for g in remaining if all(d in order for d in after[g])]
+        if not ready:
+            raise ValueError(f"依赖组存在循环依赖: {', '.join(remaining)}")
+        order.append(ready[0])
+        remaining.remove(ready[0])
+
+    return order, after
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+磁盘占用缓存 - status 直接读取，不遍历 Volume
+
+- venv 在激活新一代后、模型在下载完成后各统计一次，写入元数据库的 usage 表
+- venv 记录统计时的代目录名，当前激活的代变化后（如其他 Pod 安装了新版本）标记为过期
+- status --refresh 用并行 os.scandir 遍历重新统计全部 venv 和已注册模型
+- 同一目录树中的硬链接只计一次（克隆出的新一代与旧代共享文件，这里统计的是单个 venv 的大小）
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.fs_utils import walk_parallel
+from src.local_cache import model_dir
+from src.metadata_store import MetadataStore
+from src.venv_generations import VenvGenerations
+
+
+def measure(path: Path, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    并行统计目录的文件数和字节数
+
+    Returns:
+        {'bytes': n, 'files': n}
+    """
+    total = files = 0
+    seen = set()
+    for _, kind, st in walk_parallel(Path(path), workers=workers, with_stat=True):
+        if kind != 'file':
+            continue
+        if st.st_nlink > 1:
+            if st.st_ino in seen:
+                continue
+            seen.add(st.st_ino)
+        total += st.st_size
+        files += 1
+    return {'bytes': total, 'files': files}
+
+
+class UsageCache:
+    """venv / 模型磁盘占用缓存"""
+
+    def __init__(self, volume_path: str, store: Optional[MetadataStore] = None):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 根目录
+            store: 已打开的元数据库（默认新建连接）
+        """
+        self.volume_path = Path(volume_path)
+        self.store = store or MetadataStore(str(self.volume_path))
+
+    def _key(self, path: Path) -> str:
+        """Volume 内相对路径（不同 Pod 的挂载点可能不同）"""
+        return str(Path(path).relative_to(self.volume_path))
+
+    def _venv_marker(self, venv_name: str) -> Optional[str]:
+        """当前激活的代目录名"""
+        current = VenvGenerations(self.volume_path / 'venvs').current(venv_name)
+        return current.name if current else None
+
+    def project_venvs(self, project_name: str) -> List[str]:
+        """项目在 Volume 上的 venv（按 Python 版本）"""
+        venvs_dir = self.volume_path / 'venvs'
+        pattern = re.compile(r'py\d+\.\d+-' + re.escape(project_name) + '$')
+        try:
+            return sorted(entry.name for entry in venvs_dir.iterdir() if pattern.match(entry.name))
+        except FileNotFoundError:
+            return []
+
+    def update_venv(self, venv_name: str, generation_path: Optional[Path] = None) -> Dict[str, int]:
+        """统计 venv（默认当前激活的代）并写入缓存"""
+        venv_path = self.volume_path / 'venvs' / venv_name
+        usage = measure(generation_path or venv_path)
+        usage['marker'] = Path(generation_path).name if generation_path else self._venv_marker(venv_name)
+        self.store.record_usage({self._key(venv_path): usage})
+        return usage
+
+    def record_model(self, model_id: str, source: str, usage: Dict[str, int]):
+        """写入已统计好的模型占用（下载时顺便统计过）"""
+        path = model_dir(self.volume_path / 'models', model_id, source)
+        self.store.record_usage({self._key(path): usage})
+
+    def refresh(self, project_names: List[str]) -> int:
+        """
+        重新统计项目的全部 venv 和已注册模型（共享的模型只统计一次）
+
+        Returns:
+            统计的目录数
+        """
+        entries = {}
+        for project_name in project_names:
+            for venv_name in self.project_venvs(project_name):
+                venv_path = self.volume_path / 'venvs' / venv_name
+                usage = measure(venv_path)
+                usage['marker'] = self._venv_marker(venv_name)
+                entries[self._key(venv_path)] = usage
+            for model_id, info in self.store.get_models(project_name).items():
+                path = model_dir(self.volume_path / 'models', model_id, info.get('source'))
+                key = self._key(path)
+                if key in entries:
+                    continue
+                # 已注册但目录不在（如被手动删除）也记下来，status 不再提示未统计
+                entries[key] = measure(path) if path.exists() else {'bytes': 0, 'files': 0, 'marker': 'missing'}
+        if entries:
+            self.store.record_usage(entries)
+        return len(entries)
+
+    def project_usage(self, project_name: str) -> Dict:
+        """
+        从缓存汇总项目占用（不访问 venv / 模型目录）
+
+        Returns:
+            {'venvs': [{'name', 'bytes', 'files', 'stale', 'updated_at'}],
+             'venvs_bytes', 'models_bytes', 'unmeasured', 'missing', 'paths'}，
+            unmeasured 为尚未统计的目录数，missing 为上次统计时目录不存在的模型数，paths 为 {已统计的相对路径: 字节}（汇总多个项目时去重）
+        """
+        venvs = self.project_venvs(project_name)
+        models = self.store.get_models(project_name)
+        venv_keys = {name: f'venvs/{name}' for name in venvs}
+        model_keys = [self._key(model_dir(self.volume_path / 'models', model_id, info.get('source')))
+                      for model_id, info in models.items()]
+        cached = self.store.get_usage(list(venv_keys.values()) + model_keys)
+
+        result = {'venvs': [], 'venvs_bytes': 0, 'models_bytes': 0, 'unmeasured': 0, 'missing': 0, 'paths': {}}
+        for name, key in venv_keys.items():
+            usage = cached.get(key)
+            if usage is None:
+                result['unmeasured'] += 1
+                continue
+            result['venvs'].append({
+                'name': name, 'bytes': usage['bytes'], 'files': usage['files'],
+                'stale': usage['marker'] != self._venv_marker(name), 'updated_at': usage['updated_at'],
+            })
+            result['venvs_bytes'] += usage['bytes']
+            result['paths'][key] = usage['bytes']
+        for key in model_keys:
+            usage = cached.get(key)
+            if usage is None:
+                result['unmeasured'] += 1
+                continue
+            if usage['marker'] == 'missing':
+                result['missing'] += 1
+            result['models_bytes'] += usage['bytes']
+            result['paths'][key] = usage['bytes']
+        return result
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import 耗时分析 - 用 venv 的解释器运行 `python -X importtime`，按顶层包汇总
+
+结果保存在 .metadata/import_profiles/<project>/<module>/<时间>.json，
+每次分析都会与上一次结果对比，依赖变更后变慢的包会被标记出来
+"""
+import os
+import re
+import json
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# import time:       123 |        456 |   package.module
+_LINE_RE = re.compile(r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    解析 -X importtime 输出为树
+
+    输出是后序的：子模块先于父模块打印，缩进（每层 2 个空格）表示深度
+
+    Returns:
+        顶层节点列表，节点为 {'name', 'self_us', 'cumulative_us', 'children'}
+    """
+    pending = {}  # depth -> 尚未挂到父节点的节点
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        node = {
+            'name': name,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'children': pending.pop(depth + 1, []),
+        }
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def _walk(nodes: List[Dict], parent_root: Optional[str] = None):
+    for node in nodes:
+        yield node, parent_root
+        yield from _walk(node['children'], node['name'].split('.')[0])
+
+
+def aggregate_by_package(tree: List[Dict]) -> Dict[str, Dict]:
+    """
+    按顶层包汇总
+
+    - self_us: 包内所有模块自身耗时之和（独占成本）
+    - cumulative_us: 从包外首次进入该包的 import 的累计耗时之和（含其拉入的其他包）
+    """
+    packages = {}
+    for node, parent_root in _walk(tree):
+        root = node['name'].split('.')[0]
+        stats = packages.setdefault(root, {'self_us': 0, 'cumulative_us': 0, 'modules': 0})
+        stats['self_us'] += node['self_us']
+        stats['modules'] += 1
+        if parent_root != root:
+            stats['cumulative_us'] += node['cumulative_us']
+    return packages
+
+
+def _installed_distributions(venv_path: Path) -> List[str]:
+    """venv 中已安装的分发包（name-version），用于判断两次分析之间依赖是否变化"""
+    dists = []
+    for site_packages in Path(venv_path).glob('lib/python*/site-packages'):
+        for entry in site_packages.iterdir():
+            if entry.name.endswith('.dist-info'):
+                dists.append(entry.name[:-len('.dist-info')])
+    return sorted(dists)
+
+
+class ImportProfiler:
+    """Import 耗时分析器"""
+
+    def __init__(self, volume_path: str):
+        self.volume_path = Path(volume_path)
+        self.profiles_dir = self.volume_path / '.metadata' / 'import_profiles'
+
+    def run(
+        self,
+        venv_path: Path,
+        module: str,
+        repeat: int = 3,
+        extra_paths: Optional[List[str]] = None,
+        timeout: int = 600
+    ) -> Dict:
+        """
+        运行 import 分析（重复 repeat 次取总耗时最小的一次，降低抖动）
+
+        Raises:
+            RuntimeError: 模块导入失败
+        """
+        python_bin = Path(venv_path) / 'bin' / 'python'
+        env = os.environ.copy()
+        if extra_paths:
+            env['PYTHONPATH'] = os.pathsep.join(extra_paths + [env.get('PYTHONPATH', '')]).rstrip(os.pathsep)
+
+        best = None
+        for _ in range(max(1, repeat)):
+            result = subprocess.run(
+                [str(python_bin), '-X', 'importtime', '-c', f'import {module}'],
+                capture_output=True, text=True, env=env, timeout=timeout
+            )
+            if result.returncode != 0:
+                error_lines = [l for l in result.stderr.splitlines() if not l.startswith('import time:')]
+                raise RuntimeError(f"导入 {module} 失败:\n" + '\n'.join(error_lines[-10:]))
+            tree = parse_importtime(result.stderr)
+            total_us = sum(node['cumulative_us'] for node in tree)
+            if best is None or total_us < best['total_us']:
+                best = {'tree': tree, 'total_us': total_us}
+
+        return {
+            'module': module,
+            'venv': str(venv_path),
+            'created_at': datetime.now().isoformat(),
+            'total_us': best['total_us'],
+            'packages': aggregate_by_package(best['tree']),
+            'tree': best['tree'],
+            'distributions': _installed_distributions(venv_path),
+        }
+
+    def _module_dir(self, project_name: str, module: str) -> Path:
+        return self.profiles_dir / project_name / module
+
+    def latest(self, project_name: str, module: str) -> Optional[Dict]:
+        """最近一次保存的分析结果"""
+        module_dir = self._module_dir(project_name, module)
+        if not module_dir.exists():
+            return None
+        files = sorted(module_dir.glob('*.json'))
+        if not files:
+            return None
+        with open(files[-1], 'r') as f:
+            return json.load(f)
+
+    def save(self, project_name: str, profile: Dict) -> Path:
+        """保存分析结果"""
+        module_dir = self._module_dir(project_name, profile['module'])
+        module_dir.mkdir(parents=True, exist_ok=True)
+        profile_file = module_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(profile_file, 'w') as f:
+            json.dump(profile, f, indent=2)
+        return profile_file
+
+    @staticmethod
+    def compare(previous: Dict, current: Dict, threshold: float = 0.2, min_delta_ms: float = 50) -> Dict:
+        """
+        对比两次分析
+
+        Args:
+            threshold: 相对增幅阈值（0.2 = 20%）
+            min_delta_ms: 绝对增幅阈值（毫秒），两个条件同时满足才算回归
+
+        Returns:
+            {'regressions': [...], 'added': [...], 'removed': [...], 'total_delta_us': n}
+        """
+        regressions = []
+        old_packages = previous.get('packages', {})
+        for name, stats in current['packages'].items():
+            old = old_packages.get(name)
+            if not old:
+                continue
+            delta_us = stats['cumulative_us'] - old['cumulative_us']
+            if delta_us >= min_delta_ms * 1000 and delta_us >= old['cumulative_us'] * threshold:
+                regressions.append({
+                    'package': name,
+                    'before_us': old['cumulative_us'],
+                    'after_us': stats['cumulative_us'],
+                    'delta_us': delta_us,
+                })
+        regressions.sort(key=lambda r: r['delta_us'], reverse=True)
+
+        old_dists = set(previous.get('distributions', []))
+        new_dists = set(current.get('distributions', []))
+        return {
+            'regressions': regressions,
+            'added': sorted(new_dists - old_dists),
+            'removed': sorted(old_dists - new_dists),
+            'total_delta_us': current['total_us'] - previous['total_us'],
+        }
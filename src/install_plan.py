@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安装计划 - 不安装任何东西，估算 setup 需要下载的内容、磁盘增量和耗时
+
+- 依赖: uv pip compile 解析出精确版本，再从索引的 simple API（PEP 691 JSON，
+  不支持时解析 PEP 503 HTML）获取匹配目标平台的 wheel 大小，缺少大小时发 HEAD 请求
+- 模型: HuggingFace / ModelScope 的文件列表 API 获取每个文件大小
+- 已在 Volume 上的包（venv 中同版本）和模型不计入下载量
+"""
+import os
+import re
+import json
+import subprocess
+import urllib.request
+import urllib.error
+from pathlib import Path
+from urllib.parse import urljoin, quote
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_INDEX = 'https://pypi.org/simple'
+DEFAULT_PLATFORM = 'x86_64-manylinux_2_28'
+# wheel 解压安装后的体积约为 wheel 大小的倍数（经验值，仅用于估算）
+INSTALL_EXPANSION = 2.0
+HTTP_TIMEOUT = 30
+
+_SIMPLE_JSON = 'application/vnd.pypi.simple.v1+json'
+_ANCHOR_RE = re.compile(r'<a\s[^>]*href="([^"]+)"[^>]*>([^<]+)</a>', re.I)
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _http_json(url: str, headers: Optional[Dict[str, str]] = None):
+    request = urllib.request.Request(url, headers=headers or {})
+    with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+        return json.loads(response.read().decode('utf-8')), response.headers
+
+
+def _head_size(url: str) -> Optional[int]:
+    request = urllib.request.Request(url, method='HEAD')
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+            length = response.headers.get('Content-Length')
+            return int(length) if length else None
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+# ==================== 依赖 ====================
+
+def compile_group(
+    packages: List[str],
+    python_version: str,
+    index_url: Optional[str],
+    no_deps: bool = False,
+    platform: str = DEFAULT_PLATFORM
+) -> List[Tuple[str, str]]:
+    """
+    用 uv pip compile 解析依赖组（不安装）
+
+    Returns:
+        [(包名, 版本), ...]
+
+    Raises:
+        RuntimeError: 解析失败
+    """
+    if no_deps:
+        # --no-deps 的组只安装列出的包本身，直接取固定版本
+        pinned = []
+        for spec in packages:
+            match = re.match(r'\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*==\s*([^\s;,]+)', spec)
+            if match:
+                pinned.append((match.group(1), match.group(2)))
+        return pinned
+
+    cmd = ['uv', 'pip', 'compile', '-', '--python-version', python_version,
+           '--python-platform', platform, '--no-header', '--no-annotate', '--quiet']
+    if index_url:
+        cmd.extend(['--index-url', index_url])
+    result = subprocess.run(cmd, input='\n'.join(packages), capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"退出码 {result.returncode}")
+
+    pinned = []
+    for line in result.stdout.splitlines():
+        match = re.match(r'^([A-Za-z0-9][A-Za-z0-9._-]*)(?:\[[^\]]*\])?==([^\s;]+)', line.strip())
+        if match:
+            pinned.append((match.group(1), match.group(2)))
+    return pinned
+
+
+def _list_index_files(index_url: str, name: str) -> List[Dict]:
+    """从 simple API 获取某个包的所有文件 [{'filename', 'url', 'size'}]"""
+    page_url = f"{index_url.rstrip('/')}/{quote(canonical_name(name))}/"
+    request = urllib.request.Request(page_url, headers={'Accept': f'{_SIMPLE_JSON}, text/html;q=0.1'})
+    with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+        content_type = response.headers.get('Content-Type', '')
+        body = response.read().decode('utf-8', errors='replace')
+        base_url = response.geturl()
+
+    if _SIMPLE_JSON in content_type or content_type.startswith('application/json'):
+        data = json.loads(body)
+        return [{'filename': f['filename'], 'url': urljoin(base_url, f['url']), 'size': f.get('size')}
+                for f in data.get('files', [])]
+
+    files = []
+    for href, text in _ANCHOR_RE.findall(body):
+        url = urljoin(base_url, href.replace('&amp;', '&'))
+        filename = text.strip() or url.split('#')[0].rsplit('/', 1)[-1]
+        files.append({'filename': filename, 'url': url, 'size': None})
+    return files
+
+
+def _wheel_score(filename: str, version: str, python_version: str) -> Optional[int]:
+    """wheel 与目标环境的匹配分数（越大越优先，不匹配返回 None）"""
+    parts = filename[:-len('.whl')].split('-')
+    if len(parts) < 5:
+        return None
+    file_version, py_tags, abi_tags, plat_tags = parts[1], parts[-3], parts[-2], parts[-1]
+    if file_version != version and file_version.split('+')[0] != version:
+        return None
+
+    plat_score = None
+    for plat in plat_tags.split('.'):
+        if plat == 'any':
+            plat_score = max(plat_score or 0, 1)
+        elif plat.endswith('x86_64') and ('manylinux' in plat or plat.startswith('linux')):
+            plat_score = max(plat_score or 0, 2)
+    if plat_score is None:
+        return None
+
+    cp = 'cp' + python_version.replace('.', '')
+    best = None
+    for py in py_tags.split('.'):
+        if py == cp:
+            score = 30
+        elif abi_tags == 'abi3' and py.startswith('cp3') and int(py[3:] or 0) <= int(cp[3:]):
+            score = 20
+        elif py in ('py3', 'py2.py3') or py.startswith('py3'):
+            score = 10
+        else:
+            continue
+        best = max(best or 0, score)
+    return None if best is None else best + plat_score
+
+
+def resolve_artifact(index_url: str, name: str, version: str, python_version: str) -> Dict:
+    """
+    找到会被下载的文件及其大小
+
+    Returns:
+        {'filename', 'url', 'size'}（size 可能为 None）；找不到时 filename 为 None
+    """
+    files = _list_index_files(index_url, name)
+    candidates = []
+    for f in files:
+        filename = f['filename']
+        if filename.endswith('.whl'):
+            score = _wheel_score(filename, version, python_version)
+            if score is not None:
+                candidates.append((score, f))
+        elif re.search(rf'-{re.escape(version)}\.(tar\.gz|zip)$', filename):
+            candidates.append((0, f))
+    if not candidates:
+        return {'filename': None, 'url': None, 'size': None}
+
+    artifact = dict(max(candidates, key=lambda c: c[0])[1])
+    if artifact['size'] is None:
+        artifact['size'] = _head_size(artifact['url'].split('#')[0])
+    return artifact
+
+
+def _installed_versions(venv_path: Path) -> Dict[str, str]:
+    """venv 中已安装的分发包 {规范化名称: 版本}"""
+    installed = {}
+    for site_packages in Path(venv_path).glob('lib/python*/site-packages'):
+        for entry in site_packages.glob('*.dist-info'):
+            name, _, version = entry.name[:-len('.dist-info')].rpartition('-')
+            installed[canonical_name(name)] = version
+    return installed
+
+
+def plan_dependencies(
+    yaml_config_file: str,
+    python_version: str,
+    venv_path: Optional[Path] = None,
+    mirror: Optional[str] = None,
+    jobs: int = 16
+) -> Dict:
+    """
+    依赖下载计划
+
+    Returns:
+        {'packages': [{'name', 'version', 'group', 'present', 'filename', 'size'}],
+         'errors': {组名: 错误}}
+    """
+    from src.dependency_graph import build_group_graph
+
+    with open(yaml_config_file, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    groups = config.get('groups', {}) or {}
+    order, _ = build_group_graph(config)
+
+    installed = _installed_versions(venv_path) if venv_path and Path(venv_path).exists() else {}
+    packages = {}
+    errors = {}
+    for group_name in order:
+        group = groups[group_name]
+        index_url = group.get('index_url') or mirror or DEFAULT_INDEX
+        try:
+            pinned = compile_group(group['packages'], python_version, index_url, no_deps=group.get('no_deps', False))
+        except RuntimeError as e:
+            errors[group_name] = str(e)
+            continue
+        for name, version in pinned:
+            key = canonical_name(name)
+            # 先安装的组决定包的来源（如 torch 来自 pytorch 索引）
+            if key in packages:
+                continue
+            local_version = installed.get(key)
+            packages[key] = {
+                'name': name,
+                'version': version,
+                'group': group_name,
+                'index_url': index_url,
+                'present': local_version is not None and local_version.split('+')[0] == version.split('+')[0],
+                'filename': None,
+                'size': None,
+            }
+
+    def lookup(pkg):
+        try:
+            artifact = resolve_artifact(pkg['index_url'], pkg['name'], pkg['version'], python_version)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            pkg['error'] = str(e)
+            return
+        pkg['filename'] = artifact['filename']
+        pkg['size'] = artifact['size']
+
+    to_download = [p for p in packages.values() if not p['present']]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        list(pool.map(lookup, to_download))
+
+    return {'packages': list(packages.values()), 'errors': errors}
+
+
+# ==================== 模型 ====================
+
+def _huggingface_files(model_id: str) -> List[Tuple[str, int]]:
+    endpoint = os.environ.get('HF_ENDPOINT', 'https://huggingface.co').rstrip('/')
+    headers = {}
+    if os.environ.get('HF_TOKEN'):
+        headers['Authorization'] = f"Bearer {os.environ['HF_TOKEN']}"
+    url = f"{endpoint}/api/models/{model_id}/tree/main?recursive=true"
+    files = []
+    while url:
+        data, response_headers = _http_json(url, headers)
+        for entry in data:
+            if entry.get('type') == 'file':
+                size = (entry.get('lfs') or {}).get('size', entry.get('size', 0))
+                files.append((entry['path'], int(size or 0)))
+        # 大仓库分页：Link: <...>; rel="next"
+        match = re.search(r'<([^>]+)>;\s*rel="next"', response_headers.get('Link', '') or '')
+        url = match.group(1) if match else None
+    return files
+
+
+def _modelscope_files(model_id: str) -> List[Tuple[str, int]]:
+    domain = os.environ.get('MODELSCOPE_DOMAIN', 'www.modelscope.cn')
+    url = f"https://{domain}/api/v1/models/{model_id}/repo/files?Revision=master&Recursive=true"
+    data, _ = _http_json(url)
+    files = []
+    for entry in (data.get('Data') or {}).get('Files', []) or []:
+        if entry.get('Type') == 'blob':
+            files.append((entry['Path'], int(entry.get('Size') or 0)))
+    return files
+
+
+MODEL_FILE_LISTERS = {
+    'huggingface': _huggingface_files,
+    'modelscope': _modelscope_files,
+}
+
+
+def plan_models(models: List[Tuple[str, str]], exists, jobs: int = 8) -> List[Dict]:
+    """
+    模型下载计划
+
+    Args:
+        models: [(model_id, source), ...]
+        exists: 判断模型是否已在 Volume 上的函数 (model_id, source) -> bool
+
+    Returns:
+        [{'model_id', 'source', 'present', 'files', 'size', 'error'}]
+    """
+    def lookup(item):
+        model_id, source = item
+        entry = {'model_id': model_id, 'source': source, 'present': exists(model_id, source),
+                 'files': None, 'size': None, 'error': None}
+        if entry['present']:
+            return entry
+        lister = MODEL_FILE_LISTERS.get(source)
+        if lister is None:
+            entry['error'] = f"不支持的模型源: {source}"
+            return entry
+        try:
+            files = lister(model_id)
+            entry['files'] = len(files)
+            entry['size'] = sum(size for _, size in files)
+        except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+            entry['error'] = str(e)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return list(pool.map(lookup, models))
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务队列 - 保存在 Volume 上，多个 Pod 共享
+
+- 任意 CLI 操作（deps install / models download / setup / scripts 下的上传脚本）都可以入队
+- worker 按优先级（高优先）和提交时间取任务，每个 worker 有固定的并发槽位
+- 同一冲突键（如 venv:<项目>）的任务不会同时运行；setup 同时占用 venv 和 models 两个键
+- 队列状态变更在队列租约（leases.Lease）内完成，不依赖 fcntl 锁能否在网络卷上跨主机生效
+- 任务运行期间由任务运行器持有任务租约 job:<job_id> 并定期心跳，结束时发布退出码；
+  worker 异常退出后，其他 Pod 的 worker 在租约释放或心跳超时后回收任务状态
+
+目录结构: .metadata/queue/jobs/<job_id>.json（任务记录，含运行主机），租约在 .metadata/leases/ 下
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import string
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from src.task_manager import TaskManager, PACKAGE_ROOT
+from src.leases import Lease
+
+CLI_PATH = PACKAGE_ROOT / 'volume_cli.py'
+# 任务刚启动时运行器可能还没拿到租约、刚结束时所属 worker 可能还没来得及回收，这段时间内不判定为失联
+START_GRACE_SECONDS = 60
+# 队列租约的心跳超时：持有者异常退出后最多阻塞其他 worker 这么久（秒）
+QUEUE_LEASE_TTL = 30.0
+
+# 各命令默认占用的冲突键（{project} 替换为 --project 的值）
+DEFAULT_CONFLICT_KEYS = {
+    ('deps', 'install'): ['venv:{project}'],
+    ('deps', 'clone'): ['venv:{to_project}'],
+    ('deps', 'prune'): ['venv:{project}'],
+    ('deps', 'relocate'): ['venv:{project}'],
+    ('models', 'download'): ['models:{project}'],
+    ('setup',): ['venv:{project}', 'models:{project}'],
+    ('clean',): ['venv:{project}', 'models:{project}'],
+}
+
+
+def _option(argv: List[str], name: str) -> Optional[str]:
+    """从参数列表中取 --name value / --name=value"""
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(name + '='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def default_conflict_keys(argv: List[str]) -> List[str]:
+    """按命令推断冲突键（未知命令不设冲突键）"""
+    for prefix, templates in DEFAULT_CONFLICT_KEYS.items():
+        if tuple(argv[:len(prefix)]) == prefix:
+            values = {
+                'project': _option(argv, '--project'),
+                'to_project': _option(argv, '--to'),
+            }
+            keys = []
+            for template in templates:
+                # 缺少对应参数时不设该键（命令本身会报参数错误）
+                if all(value or '{%s}' % name not in template for name, value in values.items()):
+                    keys.append(template.format(**values))
+            return keys
+    return []
+
+
+def job_command(argv: List[str]) -> List[str]:
+    """
+    任务参数 → 运行命令（不含解释器）
+
+    - 以 .py 结尾的第一个参数视为脚本（相对路径按仓库根目录解析，如 scripts/upload_models.py）
+    - 其他情况作为 volume_cli.py 的子命令
+    """
+    if argv and argv[0].endswith('.py'):
+        script = Path(argv[0])
+        if not script.is_absolute() and not script.exists():
+            script = PACKAGE_ROOT / script
+        return [str(script)] + argv[1:]
+    return [str(CLI_PATH)] + argv
+
+
+class JobQueue:
+    """Volume 上的持久化任务队列"""
+
+    def __init__(self, volume_path: str):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 根目录
+        """
+        self.volume_path = Path(volume_path)
+        self.queue_dir = self.volume_path / '.metadata' / 'queue'
+        self.jobs_dir = self.queue_dir / 'jobs'
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.tasks = TaskManager(volume_path)
+
+    @contextmanager
+    def _locked(self):
+        """队列状态变更的跨 Pod 互斥"""
+        lease = Lease(str(self.volume_path), 'queue', ttl=QUEUE_LEASE_TTL, poll_interval=0.2)
+        lease.acquire()
+        try:
+            yield
+        finally:
+            lease.release()
+
+    def _job_file(self, job_id: str) -> Path:
+        return self.jobs_dir / f'{job_id}.json'
+
+    @staticmethod
+    def lease_key(job_id: str) -> str:
+        """任务运行期间由运行器持有的租约键"""
+        return f'job:{job_id}'
+
+    def _job_lease(self, job_id: str) -> Lease:
+        return Lease(str(self.volume_path), self.lease_key(job_id))
+
+    def _save(self, job: Dict):
+        job_file = self._job_file(job['job_id'])
+        tmp = job_file.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(job, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, job_file)
+
+    def get(self, job_id: str) -> Dict:
+        job_file = self._job_file(job_id)
+        if not job_file.exists():
+            raise FileNotFoundError(f"任务不存在: {job_id}")
+        with open(job_file, 'r') as f:
+            return json.load(f)
+
+    def list_jobs(self) -> List[Dict]:
+        """所有任务（按提交时间排序）"""
+        jobs = []
+        for job_file in self.jobs_dir.glob('*.json'):
+            try:
+                with open(job_file, 'r') as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        jobs.sort(key=lambda j: j.get('submitted_at', ''))
+        return jobs
+
+    def submit(self, argv: List[str], priority: int = 0, conflict_keys: Optional[List[str]] = None,
+               scheduling: Optional[Dict] = None) -> Dict:
+        """
+        提交任务
+
+        Args:
+            argv: CLI 参数（如 ['deps', 'install', '--project', 'tts']）
+            priority: 优先级，越大越先运行
+            conflict_keys: 冲突键（默认按命令推断）
+            scheduling: 运行时的调度配置（nice/ionice/CPU 亲和性/cgroup 权重）
+
+        Returns:
+            任务记录
+        """
+        if not argv:
+            raise ValueError("任务命令不能为空")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4))
+        job = {
+            'job_id': f"job_{timestamp}_{suffix}",
+            'argv': argv,
+            'priority': priority,
+            'conflict_keys': conflict_keys if conflict_keys is not None else default_conflict_keys(argv),
+            'status': 'queued',
+            'submitted_at': datetime.now().isoformat(),
+        }
+        if scheduling:
+            job['scheduling'] = scheduling
+        with self._locked():
+            self._save(job)
+        return job
+
+    def cancel(self, job_id: str) -> str:
+        """
+        取消任务：排队中的直接取消，运行中的由所属 worker 在下一轮终止
+
+        Returns:
+            取消后的状态
+        """
+        with self._locked():
+            job = self.get(job_id)
+            if job['status'] == 'queued':
+                job['status'] = 'cancelled'
+                job['finished_at'] = datetime.now().isoformat()
+            elif job['status'] == 'running':
+                job['cancel_requested'] = True
+            self._save(job)
+        return job['status']
+
+    @staticmethod
+    def _worker_alive(worker_id: str) -> bool:
+        """worker 是否是本机仍在运行的进程（其他 Pod 的 worker 无法判断，返回 False）"""
+        host, _, pid = worker_id.rpartition(':')
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except OSError:
+            return False
+        return True
+
+    def _finish(self, job: Dict, exit_code: Optional[int]):
+        job['exit_code'] = exit_code
+        if job.get('cancel_requested'):
+            job['status'] = 'cancelled'
+        else:
+            job['status'] = 'completed' if exit_code == 0 else 'failed'
+        job['finished_at'] = datetime.now().isoformat()
+        # 退出码已记入任务记录，租约发布的结果不再需要
+        try:
+            self._job_lease(job['job_id']).result_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _recover_orphans(self, jobs: List[Dict]):
+        """回收运行器已结束（任务租约已释放或心跳超时）且所属 worker 没有回收的任务（调用方持有队列租约）"""
+        now = time.time()
+        for job in jobs:
+            if job['status'] != 'running' or now - job.get('started_ts', now) < START_GRACE_SECONDS:
+                continue
+            lease = self._job_lease(job['job_id'])
+            if self._worker_alive(job.get('worker', '')) or lease.current() is not None:
+                continue
+            result = lease.last_result(since=job.get('started_ts'))
+            if (result and job.get('host') != socket.gethostname()
+                    and now - result.get('finished_at', 0) < START_GRACE_SECONDS):
+                # 运行器刚正常结束，所属 worker 可能在其他 Pod 上，先留给它回收
+                continue
+            exit_code = result.get('exit_code') if result else None
+            if exit_code is None and job.get('task_id'):
+                try:
+                    exit_code = self.tasks.get_task_status(job['task_id'])['progress'].get('exit_code')
+                except (FileNotFoundError, OSError, ValueError):
+                    pass
+            self._finish(job, exit_code)
+            job['orphaned'] = True
+            self._save(job)
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        取一个可运行的任务（优先级最高、最早提交、与运行中任务无冲突）并标记为运行中
+        """
+        with self._locked():
+            jobs = self.list_jobs()
+            self._recover_orphans(jobs)
+            busy = {key for j in jobs if j['status'] == 'running' for key in j.get('conflict_keys', [])}
+            queued = sorted((j for j in jobs if j['status'] == 'queued'),
+                            key=lambda j: (-j.get('priority', 0), j['submitted_at']))
+            for job in queued:
+                if busy.intersection(job.get('conflict_keys', [])):
+                    continue
+                job['status'] = 'running'
+                job['worker'] = worker_id
+                job['host'] = socket.gethostname()
+                job['started_at'] = datetime.now().isoformat()
+                job['started_ts'] = time.time()
+                self._save(job)
+                return job
+        return None
+
+    def update(self, job_id: str, **fields) -> Dict:
+        with self._locked():
+            job = self.get(job_id)
+            job.update(fields)
+            self._save(job)
+            return job
+
+
+class QueueWorker:
+    """队列 worker：按槽位数并发运行任务"""
+
+    def __init__(self, volume_path: str, slots: int = 1, poll_interval: float = 2.0):
+        self.queue = JobQueue(volume_path)
+        self.slots = max(1, slots)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # job_id -> (任务记录, Popen)
+        self.running = {}
+
+    def _start(self, job: Dict):
+        try:
+            task_info, process = self.queue.tasks.spawn_task(
+                job_command(job['argv']), task_id=job['job_id'], lease_key=self.queue.lease_key(job['job_id']),
+                scheduling=job.get('scheduling'))
+        except OSError as e:
+            self.queue.update(job['job_id'], status='failed', error=str(e),
+                              finished_at=datetime.now().isoformat())
+            print(f"❌ {job['job_id']} 启动失败: {e}")
+            return
+        job = self.queue.update(job['job_id'], task_id=task_info['task_id'], pid=process.pid,
+                                log_file=task_info['log_file'])
+        self.running[job['job_id']] = (job, process)
+        print(f"▶️  {job['job_id']} [优先级 {job.get('priority', 0)}] {' '.join(job['argv'])}")
+
+    def _reap(self):
+        """收集已结束的任务，处理取消请求"""
+        for job_id, (job, process) in list(self.running.items()):
+            exit_code = process.poll()
+            if exit_code is None:
+                try:
+                    if self.queue.get(job_id).get('cancel_requested'):
+                        self.queue.tasks.stop_task(job['task_id'])
+                except (FileNotFoundError, OSError):
+                    pass
+                continue
+            with self.queue._locked():
+                current = self.queue.get(job_id)
+                self.queue._finish(current, exit_code)
+                self.queue._save(current)
+            del self.running[job_id]
+            icon = {'completed': '✅', 'cancelled': '🚫'}.get(current['status'], '❌')
+            print(f"{icon} {job_id} {current['status']} (退出码 {exit_code})")
+
+    def run(self, exit_when_idle: bool = False):
+        """
+        运行 worker 主循环
+
+        Args:
+            exit_when_idle: 没有可运行任务且本 worker 的任务都结束后退出
+        """
+        print(f"👷 Worker {self.worker_id}: {self.slots} 个槽位，队列 {self.queue.jobs_dir}")
+        try:
+            while True:
+                self._reap()
+                while len(self.running) < self.slots:
+                    job = self.queue.claim(self.worker_id)
+                    if job is None:
+                        break
+                    self._start(job)
+                if exit_when_idle and not self.running:
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            # 已启动的任务在独立会话中继续运行，结束后由其他 worker 回收状态
+            print(f"\n⚠️  Worker 退出，{len(self.running)} 个运行中的任务继续在后台执行")
+            sys.exit(130)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨 Pod 租约 - 同一 Volume 上的多个 Pod 对同一个 venv / 模型互斥
+
+- 租约文件 .metadata/leases/<键>.lease 以 O_CREAT|O_EXCL 创建（网络文件系统上也是原子的），
+  内容为持有者（主机:PID）、令牌和心跳时间；持有期间后台线程每 TTL/4 刷新一次心跳
+- 不依赖 fcntl：RunPod 等 FUSE 网络卷上 POSIX 锁不一定能跨主机传播，而文件创建/重命名可以
+- 过期回收：心跳超过 TTL 未刷新，或持有者是本机已退出的进程，即视为失效；
+  回收时先以 O_EXCL 创建 .break 标记，确认租约仍是同一个失效持有者后再删除，避免误删新租约
+- 持有者释放时可发布结果（<键>.result.json），等待者拿到租约后据此复用结果而不重复工作
+"""
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# 心跳超过该时间未刷新即视为失效（秒）
+LEASE_TTL = 120.0
+# 等待其他持有者时的轮询间隔（秒）
+POLL_INTERVAL = 2.0
+# .break 标记存在超过该时间说明回收者自己中途退出了
+BREAK_TTL = 30.0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Lease:
+    """Volume 上的命名租约"""
+
+    def __init__(self, volume_path: str, key: str, ttl: float = LEASE_TTL,
+                 poll_interval: float = POLL_INTERVAL):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 根目录
+            key: 租约键（如 venv:py3.10-tts、model:modelscope:iic/xxx、job:<任务ID>）
+            ttl: 心跳超时（秒）
+            poll_interval: 等待其他持有者时的轮询间隔（秒）
+        """
+        self.key = key
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        leases_dir = Path(volume_path) / '.metadata' / 'leases'
+        leases_dir.mkdir(parents=True, exist_ok=True)
+        safe = re.sub(r'[^A-Za-z0-9._-]+', '_', key)[:80]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+        self.path = leases_dir / f'{safe}-{digest}.lease'
+        self.result_path = self.path.with_suffix('.result.json')
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.token = None
+        self.lost = False
+        # 本次获取过程中回收的失效租约
+        self.recovered: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ==================== 租约文件 ====================
+
+    def _record(self, acquired_at: float) -> Dict:
+        return {'key': self.key, 'holder': self.holder, 'token': self.token,
+                'acquired_at': acquired_at, 'heartbeat': time.time(), 'ttl': self.ttl}
+
+    def _read(self) -> Optional[Dict]:
+        """
+        读取租约（不存在时为 None；正在写入的空文件按 mtime 计算心跳）
+
+        网络卷上的暂时性错误（ESTALE、EACCES 等）按刚刚刷新过心跳处理：视为仍被持有，下一轮轮询再读
+        """
+        try:
+            with open(self.path, 'r') as f:
+                data = f.read()
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+        except OSError:
+            return {'heartbeat': time.time(), 'unreadable': True}
+        try:
+            record = json.loads(data)
+        except ValueError:
+            record = {}
+        record.setdefault('heartbeat', mtime)
+        return record
+
+    def _is_stale(self, record: Dict) -> bool:
+        host, _, pid = (record.get('holder') or '').rpartition(':')
+        if host == socket.gethostname() and pid.isdigit() and not _pid_alive(int(pid)):
+            return True
+        return time.time() - record['heartbeat'] > record.get('ttl', self.ttl)
+
+    def _try_create(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        self.token = uuid.uuid4().hex
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._record(time.time()), f)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _break(self, stale: Dict) -> bool:
+        """回收失效租约（同一时刻只有一个回收者），返回是否由本进程回收"""
+        marker = self.path.with_suffix('.break')
+        try:
+            os.close(os.open(marker, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(marker).st_mtime > BREAK_TTL:
+                    marker.unlink()
+            except OSError:
+                pass
+            return False
+        try:
+            current = self._read()
+            if current is not None and current.get('token') == stale.get('token') and self._is_stale(current):
+                self.path.unlink()
+                self.recovered.append(stale)
+                return True
+        except OSError:
+            pass
+        finally:
+            try:
+                marker.unlink()
+            except OSError:
+                pass
+        return False
+
+    def current(self) -> Optional[Dict]:
+        """当前有效的租约记录（未被持有或已失效时为 None；只读取，不回收）"""
+        record = self._read()
+        if record is None or self._is_stale(record):
+            return None
+        return record
+
+    # ==================== 获取 / 心跳 / 释放 ====================
+
+    def acquire(self, timeout: Optional[float] = None,
+                on_wait: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        获取租约，被其他进程持有时等待其释放或失效
+
+        Args:
+            timeout: 最长等待时间（None 表示一直等待）
+            on_wait: 开始等待时的回调（参数为当前持有者的租约记录）
+
+        Returns:
+            是否等待过其他持有者
+
+        Raises:
+            TimeoutError: 超时仍未获取
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        waited = False
+        while not self._try_create():
+            record = self._read()
+            if record is None:
+                continue  # 刚被释放
+            if self._is_stale(record):
+                if not self._break(record):
+                    time.sleep(0.2)  # 其他进程正在回收
+                continue
+            if not waited:
+                waited = True
+                if on_wait:
+                    on_wait(record)
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(f"等待租约超时: {self.key}（持有者 {record.get('holder')}）")
+            time.sleep(self.poll_interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+        return waited
+
+    def _heartbeat(self):
+        acquired_at = time.time()
+        while not self._stop.wait(self.ttl / 4):
+            record = self._read()
+            if record and record.get('unreadable'):
+                continue  # 暂时读不到，下一轮再续约
+            if not record or record.get('token') != self.token:
+                # 被当作失效回收了（如进程被长时间挂起），不再续约
+                self.lost = True
+                return
+            acquired_at = record.get('acquired_at', acquired_at)
+            tmp = self.path.with_name(f'{self.path.name}.{self.token}.tmp')
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(self._record(acquired_at), f)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+    def release(self, result: Optional[Dict] = None):
+        """
+        释放租约
+
+        Args:
+            result: 发布给后续持有者的结果（可 JSON 序列化）
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if result is not None:
+            published = dict(result, holder=self.holder, finished_at=time.time())
+            tmp = self.result_path.with_name(f'{self.result_path.name}.{self.token}.tmp')
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(published, f, ensure_ascii=False)
+                os.replace(tmp, self.result_path)
+            except OSError:
+                pass
+        record = self._read()
+        if record and record.get('token') == self.token:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+        self.token = None
+
+    def last_result(self, since: Optional[float] = None) -> Optional[Dict]:
+        """
+        上一个持有者发布的结果
+
+        Args:
+            since: 只返回该时间之后完成的结果（通常为本进程开始等待的时间）
+        """
+        try:
+            with open(self.result_path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if since is not None and result.get('finished_at', 0) < since:
+            return None
+        return result
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def describe_holder(record: Dict) -> str:
+    """持有者的单行描述"""
+    age = time.time() - record.get('acquired_at', record.get('heartbeat', time.time()))
+    return f"{record.get('holder') or '未知'}（已持有 {age:.0f}s）"
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地盘缓存 - Worker 启动时把项目的 venv 和模型从 Volume 复制到容器本地盘
+
+- 本地目录结构与 Volume 一致: <缓存根>/venvs/<venv名>、<缓存根>/models/...
+- 每个条目一个清单（相对路径 → [大小, mtime_ns]），未变化的文件直接跳过
+- 文件并行复制，优先 copy_file_range（内核内复制），不支持时用大缓冲区复制
+- 总大小受预算限制，超出时按最近使用时间（LRU）淘汰其他条目
+"""
+import os
+import json
+import time
+import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src.fs_utils import default_workers, walk_parallel
+
+try:
+    import fcntl
+except ImportError:  # 非 Linux 平台
+    fcntl = None
+
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+INDEX_NAME = '.cache-index.json'
+MANIFESTS_DIRNAME = '.manifests'
+
+
+def _copy_file(src: str, dst: str, st: os.stat_result):
+    """复制单个文件（先写临时文件再 rename），保留权限和 mtime（pyc 校验依赖源文件 mtime）"""
+    tmp = f'{dst}.part-{os.getpid()}'
+    with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+        copied = 0
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while copied < st.st_size:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), st.st_size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                # 跨文件系统/内核不支持时降级为普通复制
+                fsrc.seek(copied)
+                fdst.seek(copied)
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+    os.chmod(tmp, st.st_mode & 0o7777)
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, dst)
+
+
+class LocalCache:
+    """本地盘缓存"""
+
+    def __init__(self, cache_root: str, budget_bytes: Optional[int] = None, workers: Optional[int] = None):
+        """
+        初始化
+
+        Args:
+            cache_root: 本地缓存根目录（容器本地盘）
+            budget_bytes: 缓存总大小上限，None 表示不限制
+            workers: 并行复制数
+        """
+        self.cache_root = Path(cache_root)
+        self.cache_root.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self.workers = workers or default_workers()
+        self.index_file = self.cache_root / INDEX_NAME
+        self.manifests_dir = self.cache_root / MANIFESTS_DIRNAME
+        # 本次要使用的条目，不参与淘汰
+        self._pinned = set()
+
+    def pin(self, keys: List[str]):
+        """标记本次要使用的条目，腾空间时不淘汰它们"""
+        self._pinned.update(keys)
+
+    def _lock(self):
+        """进程间互斥（同一容器内多个 worker 同时启动）"""
+        lock_file = open(self.cache_root / '.lock', 'w')
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _load_index(self) -> Dict:
+        if not self.index_file.exists():
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict):
+        tmp = self.index_file.with_name(f'{INDEX_NAME}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_file)
+
+    def _manifest_file(self, key: str) -> Path:
+        return self.manifests_dir / (key.replace('/', '__') + '.json')
+
+    def _load_manifest(self, key: str) -> Dict[str, List[int]]:
+        manifest_file = self._manifest_file(key)
+        if not manifest_file.exists():
+            return {}
+        try:
+            with open(manifest_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, key: str, manifest: Dict[str, List[int]]):
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        manifest_file = self._manifest_file(key)
+        tmp = manifest_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, manifest_file)
+
+    def local_path(self, key: str) -> Path:
+        return self.cache_root / key
+
+    def evict(self, key: str, index: Optional[Dict] = None):
+        """删除一个缓存条目"""
+        shutil.rmtree(self.local_path(key), ignore_errors=True)
+        manifest_file = self._manifest_file(key)
+        if manifest_file.exists():
+            manifest_file.unlink()
+        if index is not None:
+            index.pop(key, None)
+
+    def _make_room(self, index: Dict, key: str, needed: int) -> bool:
+        """按 LRU 淘汰其他条目，直到放得下 needed 字节"""
+        if self.budget_bytes is None:
+            return True
+        if needed > self.budget_bytes:
+            return False
+        others = {k: v for k, v in index.items() if k != key}
+        used = sum(v['bytes'] for v in others.values())
+        for victim, _ in sorted(others.items(), key=lambda kv: kv[1]['last_used']):
+            if used + needed <= self.budget_bytes:
+                break
+            if victim in self._pinned:
+                continue
+            print(f"  🧹 淘汰本地缓存: {victim}")
+            self.evict(victim, index)
+            used -= others[victim]['bytes']
+        return used + needed <= self.budget_bytes
+
+    def sync(self, key: str, source: Path) -> Optional[Dict]:
+        """
+        把 Volume 上的目录同步到本地缓存
+
+        Args:
+            key: 缓存键，即本地相对路径（如 'venvs/py3.10-tts'）
+            source: Volume 上的源目录
+
+        Returns:
+            {'path', 'copied', 'skipped', 'removed', 'bytes', 'copied_bytes', 'seconds'}；
+            超出预算放不下时返回 None（调用方应继续使用 Volume 上的路径）
+        """
+        start = time.time()
+        source_root = os.path.realpath(source)
+        entries = walk_parallel(source_root, workers=self.workers, with_stat=True)
+        total = sum(st.st_size for _, kind, st in entries if kind == 'file')
+
+        with self._lock():
+            index = self._load_index()
+            if not self._make_room(index, key, total):
+                self._save_index(index)
+                return None
+
+            dest = self.local_path(key)
+            dest.mkdir(parents=True, exist_ok=True)
+            manifest = self._load_manifest(key)
+            new_manifest = {}
+            to_copy = []
+
+            for rel, kind, st in sorted(entries, key=lambda e: e[0]):
+                target = dest / rel
+                if kind == 'dir':
+                    if target.is_symlink():
+                        target.unlink()  # 源中符号链接换成了目录，不能经由旧链接写入
+                    target.mkdir(exist_ok=True)
+                elif kind == 'symlink':
+                    link = os.readlink(os.path.join(source_root, rel))
+                    if not target.is_symlink() or os.readlink(target) != link:
+                        if target.is_dir() and not target.is_symlink():
+                            # 源中目录换成了符号链接
+                            shutil.rmtree(target)
+                        elif target.is_symlink() or target.exists():
+                            target.unlink()
+                        os.symlink(link, target)
+                else:
+                    signature = [st.st_size, st.st_mtime_ns]
+                    new_manifest[rel] = signature
+                    if manifest.get(rel) != signature or not target.exists():
+                        to_copy.append((rel, st))
+
+            # 先在清单中清掉待复制条目，复制中途失败时下次会重新复制
+            pending = {rel for rel, _ in to_copy}
+            self._save_manifest(key, {k: v for k, v in new_manifest.items() if k not in pending})
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(lambda item: _copy_file(os.path.join(source_root, item[0]),
+                                                      str(dest / item[0]), item[1]), to_copy))
+
+            removed = [rel for rel in manifest if rel not in new_manifest]
+            dest_real = os.path.realpath(dest)
+            for rel in removed:
+                # 所在目录已换成符号链接时旧文件已随目录删除，不能经由链接删除链接目标中的文件
+                rel_dir = os.path.dirname(rel)
+                if os.path.realpath(dest / rel_dir) != os.path.normpath(os.path.join(dest_real, rel_dir)):
+                    continue
+                try:
+                    (dest / rel).unlink()
+                except FileNotFoundError:
+                    pass
+
+            self._save_manifest(key, new_manifest)
+            index[key] = {'source': str(source), 'bytes': total, 'last_used': time.time()}
+            self._save_index(index)
+            self._pinned.add(key)
+
+        return {
+            'path': str(dest),
+            'copied': len(to_copy),
+            'skipped': len(new_manifest) - len(to_copy),
+            'removed': len(removed),
+            'bytes': total,
+            'copied_bytes': sum(st.st_size for _, st in to_copy),
+            'seconds': time.time() - start,
+        }
+
+
+def model_dir(models_root: Path, model_id: str, source: str) -> Path:
+    """模型在 models 目录下的路径（与 VolumeManager.check_model_exists 一致）"""
+    if source == 'modelscope':
+        return Path(models_root) / 'hub' / model_id
+    parts = model_id.split('/')
+    if len(parts) == 2:
+        return Path(models_root) / f'models--{parts[0]}--{parts[1]}'
+    return Path(models_root) / model_id
+
+
+def warm_project(
+    project_name: str,
+    volume_path: str,
+    cache_root: str = '/tmp/runpod-cache',
+    budget_bytes: Optional[int] = None,
+    include_venv: bool = True,
+    include_models: bool = True,
+    workers: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    把项目的 venv 和模型复制到本地盘（供 Serverless 入口在启动时调用）
+
+    Returns:
+        需要设置的环境变量；某类内容没能完整放进本地缓存时，不返回对应变量（继续用 Volume）
+    """
+    from src.projects.loader import get_project
+    from src.venv_manager import VenvManager
+    from src.venv_paths import detect_venv_prefix, rewrite_venv_prefix
+    from src.fs_utils import format_size
+
+    project = get_project(project_name)
+    cache = LocalCache(cache_root, budget_bytes=budget_bytes, workers=workers)
+    env = {}
+
+    def report(label, stats):
+        if stats is None:
+            print(f"  ⚠️  {label}: 超出本地缓存预算，继续使用 Volume")
+        else:
+            print(f"  ✅ {label}: 复制 {stats['copied']} 个文件 ({format_size(stats['copied_bytes'])})，"
+                  f"跳过 {stats['skipped']} 个，共 {format_size(stats['bytes'])} ({stats['seconds']:.1f}s)")
+
+    # 先确定要同步的条目，避免为后面的条目腾空间时淘汰掉本项目刚复制的内容
+    venv_path = None
+    if include_venv and project.dependencies_config:
+        venv_mgr = VenvManager(volume_path)
+        venv_path = venv_mgr.get_venv_path(project_name, project.python_version)
+        if not venv_mgr.venv_exists(venv_path):
+            print(f"  ⚠️  Venv 不存在，跳过: {venv_path}")
+            venv_path = None
+
+    models_root = Path(volume_path) / 'models'
+    models = []
+    complete = {}
+    if include_models:
+        for model_id, source in project.get_all_models():
+            src_dir = model_dir(models_root, model_id, source)
+            if src_dir.exists():
+                models.append((source, src_dir, f"models/{src_dir.relative_to(models_root)}"))
+            else:
+                print(f"  ⚠️  模型不存在，跳过: {model_id} ({source})")
+                complete[source] = False
+
+    cache.pin(([f'venvs/{venv_path.name}'] if venv_path else []) + [key for _, _, key in models])
+
+    if venv_path:
+        key = f'venvs/{venv_path.name}'
+        stats = cache.sync(key, venv_path)
+        report(key, stats)
+        if stats:
+            local_venv = cache.local_path(key)
+            old_prefix = detect_venv_prefix(venv_path)
+            if old_prefix:
+                rewrite_venv_prefix(local_venv, old_prefix, str(local_venv))
+            env['VIRTUAL_ENV'] = str(local_venv)
+            env['PATH'] = f"{local_venv / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}"
+
+    for source, src_dir, key in models:
+        stats = cache.sync(key, src_dir)
+        report(key, stats)
+        complete[source] = complete.get(source, True) and stats is not None
+
+    local_models = str(cache.local_path('models'))
+    if complete.get('modelscope'):
+        env['MODELSCOPE_CACHE'] = local_models
+    if complete.get('huggingface'):
+        env['HF_HUB_CACHE'] = local_models
+
+    return env
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元数据库 - .metadata/metadata.db（SQLite）
+
+表:
+    projects           项目（按 Python 版本区分，旧格式无版本时为 ''）
+    models             项目已注册的模型
+    dependency_groups  每个 venv 依赖组最近一次的安装结果
+    tasks              后台任务索引（详情仍在 tasks/<任务ID>.json）
+    files              venv 校验的 stat 签名缓存
+    usage              venv / 模型目录的磁盘占用缓存（安装、下载后更新，status --refresh 全量重算）
+    throughput         依赖安装 / 模型下载的吞吐量样本（plan 估算耗时，每类只保留最近若干条）
+
+- 写操作在 BEGIN IMMEDIATE 事务中批量完成，本机多个进程同时写入由 SQLite 的文件锁串行化，
+  写锁暂时被占用（database is locked）时退避重试
+- 本地文件系统上使用 WAL（读写互不阻塞）；WAL 依赖共享内存，不能跨主机
+- Volume 为网络文件系统（NFS、FUSE 等）时 SQLite 的 fcntl 锁不一定能跨主机生效，
+  改用回滚日志，并且每次读写都先取得 Volume 租约 metadata-db（leases.Lease），多个 Pod 之间完全串行
+- 首次打开时把旧的 .metadata/<项目>[-pyX.Y].json、throughput.json、任务索引和校验缓存导入数据库，
+  旧 JSON 文件重命名为 .json.migrated 保留
+"""
+import os
+import json
+import time
+import sqlite3
+import shutil
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.leases import Lease
+
+DB_NAME = 'metadata.db'
+SCHEMA_VERSION = 3
+# 不支持 WAL 共享内存的网络/分布式文件系统
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ceph', 'glusterfs', 'lustre',
+                       'gpfs', '9p', 'fuse', 'virtiofs')
+TASK_FIELDS = ('task_id', 'command', 'status', 'pid', 'log_file', 'started_at', 'completed_at')
+# 网络文件系统上串行访问数据库的租约心跳超时（秒），持有者异常退出后最多阻塞其他 Pod 这么久
+DB_LEASE_TTL = 30.0
+# 开始写事务时遇到 database is locked 的重试次数（每次退避加倍）
+BUSY_RETRIES = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT NOT NULL,
+    python_version TEXT NOT NULL DEFAULT '',
+    last_updated TEXT,
+    PRIMARY KEY (name, python_version)
+);
+CREATE TABLE IF NOT EXISTS models (
+    project TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    source TEXT,
+    size INTEGER,
+    installed_at TEXT,
+    PRIMARY KEY (project, model_id)
+);
+CREATE INDEX IF NOT EXISTS models_by_id ON models (model_id);
+CREATE TABLE IF NOT EXISTS dependency_groups (
+    project TEXT NOT NULL,
+    python_version TEXT NOT NULL DEFAULT '',
+    group_name TEXT NOT NULL,
+    status TEXT,
+    seconds REAL,
+    bytes INTEGER,
+    details TEXT,
+    installed_at TEXT,
+    PRIMARY KEY (project, python_version, group_name)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    command TEXT,
+    status TEXT,
+    pid INTEGER,
+    log_file TEXT,
+    started_at TEXT,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_by_started ON tasks (started_at);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status);
+CREATE TABLE IF NOT EXISTS files (
+    venv TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    PRIMARY KEY (venv, path)
+);
+CREATE TABLE IF NOT EXISTS usage (
+    path TEXT PRIMARY KEY,
+    bytes INTEGER,
+    files INTEGER,
+    marker TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS throughput (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    bytes INTEGER,
+    seconds REAL,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS throughput_by_kind ON throughput (kind, id);
+"""
+
+
+def filesystem_type(path: Path) -> Optional[str]:
+    """path 所在挂载点的文件系统类型（按 /proc/mounts 最长前缀匹配）"""
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1].replace('\\040', ' ')
+                if (path == mount or path.startswith(mount.rstrip('/') + '/')) and len(mount) > len(best):
+                    best, fstype = mount, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+
+class MetadataStore:
+    """Volume 元数据库"""
+
+    def __init__(self, volume_path: str):
+        """
+        初始化（首次打开时建表并迁移旧 JSON 元数据）
+
+        Args:
+            volume_path: Volume 根目录
+        """
+        self.metadata_dir = Path(volume_path) / '.metadata'
+        self.metadata_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.metadata_dir / DB_NAME
+        fstype = filesystem_type(self.metadata_dir) or ''
+        network = fstype.startswith(NETWORK_FILESYSTEMS)
+        self.journal_mode = 'DELETE' if network else 'WAL'
+        self._lease = Lease(volume_path, 'metadata-db', ttl=DB_LEASE_TTL, poll_interval=0.05) if network else None
+        self._lease_depth = 0
+
+        # isolation_level=None：由 _transaction() 显式控制事务
+        self.conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self._serialized():
+            self.conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+            self.conn.execute('PRAGMA synchronous=NORMAL' if not network else 'PRAGMA synchronous=FULL')
+        self._migrate()
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _serialized(self):
+        """网络文件系统上持有 metadata-db 租约（可重入；本地文件系统上不做任何事）"""
+        if self._lease is None:
+            yield
+            return
+        if self._lease_depth == 0:
+            self._lease.acquire()
+        self._lease_depth += 1
+        try:
+            yield
+        finally:
+            self._lease_depth -= 1
+            if self._lease_depth == 0:
+                self._lease.release()
+
+    def _query(self, sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+        """只读查询"""
+        with self._serialized():
+            return self.conn.execute(sql, tuple(params)).fetchall()
+
+    def _begin(self):
+        """开始写事务，写锁被占用时退避重试（连接本身的 busy timeout 之外再兜底）"""
+        for attempt in range(BUSY_RETRIES):
+            try:
+                self.conn.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or attempt == BUSY_RETRIES - 1:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：开始时即取得写锁，避免读后升级写锁时的死锁"""
+        with self._serialized():
+            self._begin()
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    # ==================== 迁移 ====================
+
+    def _migrate(self):
+        version = 0
+        try:
+            rows = self._query("SELECT value FROM meta WHERE key = 'schema_version'")
+            version = int(rows[0]['value']) if rows else 0
+        except sqlite3.OperationalError:
+            pass  # 新数据库
+        if version >= SCHEMA_VERSION:
+            return
+
+        migrated_files = []
+        with self._transaction() as conn:
+            # executescript 会隐式提交，这里逐条执行以保持在同一事务中
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            # 其他进程可能已在我们等锁期间完成迁移
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            version = int(row['value']) if row else 0
+            if version >= SCHEMA_VERSION:
+                return
+            # 版本 1：从 JSON 元数据导入；版本 3：导入 throughput.json；其余版本只新增表
+            if version < 1:
+                migrated_files = self._import_project_files(conn)
+                self._import_task_index(conn)
+                self._import_verify_cache(conn)
+            if version < 3:
+                migrated_files += self._import_throughput(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                         (str(SCHEMA_VERSION),))
+
+        # 提交后再处理旧文件：项目元数据保留备份，可重建的索引/缓存直接删除
+        for metadata_file in migrated_files:
+            try:
+                os.replace(metadata_file, metadata_file.with_name(metadata_file.name + '.migrated'))
+            except OSError:
+                pass
+        tasks_dir = self.metadata_dir / 'tasks'
+        for name in ('.index.json', '.index.jsonl', '.index.lock'):
+            try:
+                (tasks_dir / name).unlink()
+            except OSError:
+                pass
+        shutil.rmtree(self.metadata_dir / 'verify_cache', ignore_errors=True)
+
+    def _import_project_files(self, conn) -> List[Path]:
+        """导入 .metadata/<项目>.json 和 <项目>-pyX.Y.json"""
+        migrated = []
+        for metadata_file in sorted(self.metadata_dir.glob('*.json')):
+            try:
+                with open(metadata_file, 'r') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # 项目元数据总是带 last_updated 且 models/dependencies 为字典（throughput.json 等不是）
+            if (not isinstance(metadata, dict) or 'last_updated' not in metadata
+                    or not isinstance(metadata.get('models', {}), dict)
+                    or not isinstance(metadata.get('dependencies', {}), dict)):
+                continue
+
+            name = metadata.get('project') or metadata_file.stem
+            python_version = metadata.get('python_version') or ''
+            if python_version and name.endswith(f'-py{python_version}'):
+                name = name[:-len(f'-py{python_version}')]
+            conn.execute(
+                "INSERT INTO projects (name, python_version, last_updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, python_version) DO UPDATE SET last_updated = "
+                "max(coalesce(last_updated, ''), coalesce(excluded.last_updated, ''))",
+                (name, python_version, metadata.get('last_updated')))
+            for model_id, info in (metadata.get('models') or {}).items():
+                info = info or {}
+                # 同一模型以较新的记录为准，较新记录缺少大小时保留已知的大小
+                conn.execute(
+                    "INSERT INTO models (project, model_id, source, size, installed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (project, model_id) DO UPDATE SET "
+                    "source = CASE WHEN coalesce(excluded.installed_at, '') >= coalesce(installed_at, '') "
+                    "THEN excluded.source ELSE source END, "
+                    "size = CASE WHEN coalesce(excluded.installed_at, '') >= coalesce(installed_at, '') "
+                    "THEN coalesce(excluded.size, size) ELSE coalesce(size, excluded.size) END, "
+                    "installed_at = nullif(max(coalesce(installed_at, ''), coalesce(excluded.installed_at, '')), '')",
+                    (name, model_id, info.get('source'), info.get('size'), info.get('installed_at')))
+            # 旧版 pip --target 安装记录的依赖（没有分组，每个包一行）
+            for package, info in (metadata.get('dependencies') or {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO dependency_groups "
+                    "(project, python_version, group_name, status, details, installed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, python_version, package, 'legacy', json.dumps(info, ensure_ascii=False),
+                     metadata.get('last_updated')))
+            migrated.append(metadata_file)
+        return migrated
+
+    def _import_task_index(self, conn):
+        """从任务元数据文件建立任务索引"""
+        tasks_dir = self.metadata_dir / 'tasks'
+        if not tasks_dir.exists():
+            return
+        rows = []
+        for metadata_file in tasks_dir.glob('*.json'):
+            if metadata_file.name.startswith('.'):
+                continue
+            try:
+                with open(metadata_file, 'r') as f:
+                    task_info = json.load(f)
+                rows.append(tuple(task_info.get(k) for k in TASK_FIELDS))
+            except (OSError, ValueError, AttributeError):
+                continue
+        self._upsert_tasks(conn, rows)
+
+    def _import_verify_cache(self, conn):
+        cache_dir = self.metadata_dir / 'verify_cache'
+        for cache_file in cache_dir.glob('*.json') if cache_dir.exists() else []:
+            try:
+                with open(cache_file, 'r') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                continue
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (venv, path, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)",
+                ((cache_file.stem, path, *signature) for path, signature in cache.items() if len(signature) == 3))
+
+    # ==================== 项目与模型 ====================
+
+    def _import_throughput(self, conn) -> List[Path]:
+        """导入 .metadata/throughput.json（{类别: [{'bytes', 'seconds', 'at'}]}）"""
+        history_file = self.metadata_dir / 'throughput.json'
+        try:
+            with open(history_file, 'r') as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(history, dict):
+            return []
+        for kind, samples in history.items():
+            conn.executemany(
+                "INSERT INTO throughput (kind, bytes, seconds, recorded_at) VALUES (?, ?, ?, ?)",
+                ((kind, sample.get('bytes'), sample.get('seconds'), sample.get('at'))
+                 for sample in samples if isinstance(sample, dict)))
+        return [history_file]
+
+    def _touch_project(self, conn, name: str, python_version: Optional[str]):
+        conn.execute(
+            "INSERT INTO projects (name, python_version, last_updated) VALUES (?, ?, ?) "
+            "ON CONFLICT (name, python_version) DO UPDATE SET last_updated = excluded.last_updated",
+            (name, python_version or '', datetime.now().isoformat()))
+
+    def register_models(self, project: str, models: Iterable[Tuple[str, str, Optional[int]]]):
+        """
+        批量注册模型（一个事务）
+
+        Args:
+            project: 项目名称
+            models: [(model_id, source, size), ...]
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO models (project, model_id, source, size, installed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (project, model_id) DO UPDATE SET source = excluded.source, "
+                "size = coalesce(excluded.size, size), installed_at = excluded.installed_at",
+                ((project, model_id, source, size, now) for model_id, source, size in models))
+            self._touch_project(conn, project, None)
+
+    def get_models(self, project: str) -> Dict[str, Dict]:
+        rows = self._query(
+            "SELECT model_id, source, size, installed_at FROM models WHERE project = ?", (project,))
+        return {row['model_id']: {'source': row['source'], 'size': row['size'],
+                                  'installed_at': row['installed_at']} for row in rows}
+
+    def clear_models(self, project: str) -> int:
+        """删除项目的模型记录，返回删除数"""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM models WHERE project = ?", (project,)).rowcount
+
+    def delete_project(self, project: str):
+        """删除项目的全部元数据"""
+        with self._transaction() as conn:
+            for table, column in (('projects', 'name'), ('models', 'project'), ('dependency_groups', 'project')):
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (project,))
+
+    def project_names(self) -> List[str]:
+        """有任何记录的项目"""
+        rows = self._query(
+            "SELECT name FROM projects UNION SELECT project FROM models "
+            "UNION SELECT project FROM dependency_groups ORDER BY 1")
+        return [row[0] for row in rows]
+
+    def project_stats(self, project: str) -> Dict:
+        """项目的依赖组数、模型数和最近更新时间"""
+        row = self._query(
+            "SELECT (SELECT count(DISTINCT group_name) FROM dependency_groups WHERE project = ?), "
+            "(SELECT count(*) FROM models WHERE project = ?), "
+            "(SELECT max(last_updated) FROM projects WHERE name = ?)", (project,) * 3)[0]
+        return {
+            'project': project,
+            'dependencies_count': row[0],
+            'models_count': row[1],
+            'last_updated': row[2],
+        }
+
+    # ==================== 依赖组 ====================
+
+    def record_groups(self, project: str, python_version: str, groups: Dict[str, Dict]):
+        """
+        批量记录依赖组安装结果（一个事务）
+
+        Args:
+            groups: {组名: {'status', 'seconds', 'bytes'}}
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO dependency_groups "
+                "(project, python_version, group_name, status, seconds, bytes, installed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((project, python_version, name, info.get('status'), info.get('seconds'), info.get('bytes'), now)
+                 for name, info in groups.items()))
+            self._touch_project(conn, project, python_version)
+
+    # ==================== 任务索引 ====================
+
+    @staticmethod
+    def _upsert_tasks(conn, rows: List[tuple]):
+        conn.executemany(
+            f"INSERT OR REPLACE INTO tasks ({', '.join(TASK_FIELDS)}) VALUES ({', '.join('?' * len(TASK_FIELDS))})",
+            rows)
+
+    def upsert_task(self, task_info: Dict):
+        with self._transaction() as conn:
+            self._upsert_tasks(conn, [tuple(task_info.get(k) for k in TASK_FIELDS)])
+
+    def list_tasks(self, limit: Optional[int] = None) -> List[Dict]:
+        """按开始时间倒序"""
+        sql = f"SELECT {', '.join(TASK_FIELDS)} FROM tasks ORDER BY started_at DESC"
+        rows = self._query(sql + (" LIMIT ?" if limit else ""), (limit,) if limit else ())
+        return [dict(row) for row in rows]
+
+    def delete_tasks(self, task_ids: List[str]):
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM tasks WHERE task_id = ?", ((task_id,) for task_id in task_ids))
+
+    # ==================== 文件签名 ====================
+
+    def load_file_signatures(self, venv: str) -> Dict[str, List[int]]:
+        rows = self._query("SELECT path, size, mtime_ns, inode FROM files WHERE venv = ?", (venv,))
+        return {row['path']: [row['size'], row['mtime_ns'], row['inode']] for row in rows}
+
+    def save_file_signatures(self, venv: str, signatures: Dict[str, List[int]]):
+        """替换 venv 的全部文件签名（一个事务）"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM files WHERE venv = ?", (venv,))
+            conn.executemany(
+                "INSERT INTO files (venv, path, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)",
+                ((venv, path, *signature) for path, signature in signatures.items()))
+
+    # ==================== 磁盘占用 ====================
+
+    def record_usage(self, entries: Dict[str, Dict]):
+        """
+        批量写入磁盘占用（一个事务）
+
+        Args:
+            entries: {Volume 内相对路径: {'bytes', 'files', 'marker'}}
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO usage (path, bytes, files, marker, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((path, info.get('bytes'), info.get('files'), info.get('marker'), now)
+                 for path, info in entries.items()))
+
+    def get_usage(self, paths: Iterable[str]) -> Dict[str, Dict]:
+        """已缓存的磁盘占用（未统计的路径不在结果中）"""
+        paths = list(paths)
+        if not paths:
+            return {}
+        rows = self._query(
+            f"SELECT path, bytes, files, marker, updated_at FROM usage WHERE path IN ({', '.join('?' * len(paths))})",
+            paths)
+        return {row['path']: dict(row) for row in rows}
+
+    # ==================== 吞吐量 ====================
+
+    def record_throughput(self, kind: str, size_bytes: int, seconds: float, keep: int):
+        """追加一条吞吐量样本，只保留该类别最近的 keep 条（一个事务）"""
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO throughput (kind, bytes, seconds, recorded_at) VALUES (?, ?, ?, ?)",
+                         (kind, size_bytes, seconds, datetime.now().isoformat()))
+            conn.execute(
+                "DELETE FROM throughput WHERE kind = ? AND id NOT IN "
+                "(SELECT id FROM throughput WHERE kind = ? ORDER BY id DESC LIMIT ?)", (kind, kind, keep))
+
+    def throughput_samples(self, kind: str) -> List[Dict]:
+        """该类别的吞吐量样本（按记录顺序）"""
+        rows = self._query("SELECT bytes, seconds, recorded_at FROM throughput WHERE kind = ? ORDER BY id", (kind,))
+        return [dict(row) for row in rows]
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务资源采样 - 从 /proc 统计任务进程树的 CPU、内存、I/O 和网络
+
+- 每次采样遍历 /proc，找出根进程的全部后代，累加 CPU 时间（含已回收子进程的 cutime/cstime）、
+  RSS 以及 /proc/<pid>/io 中的字节数
+- 网络只能按网络命名空间统计（/proc/<pid>/net/dev，不含 lo），Pod 中通常就是任务本身的流量
+- 任务结束后用运行器自身的 getrusage(RUSAGE_CHILDREN) 和 /proc/self/io 增量得到总量
+  （已回收子进程的计数会累加到父进程），并与最后一次采样取较大值
+- 非 Linux 或 /proc 不可读时返回 None，调用方跳过采样
+"""
+import os
+import time
+import resource
+import threading
+from typing import Callable, Dict, List, Optional
+
+PROC = '/proc'
+# 默认采样间隔（秒）：足以看出瓶颈，事件文件每小时约 100 KB
+SAMPLE_INTERVAL = 5.0
+
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # 非 POSIX 平台
+    CLOCK_TICKS = PAGE_SIZE = None
+
+
+def _read_stat(pid: str) -> Optional[List[str]]:
+    """/proc/<pid>/stat 中 comm 之后的字段（comm 可能含空格和括号）"""
+    try:
+        with open(f'{PROC}/{pid}/stat', 'r') as f:
+            data = f.read()
+    except OSError:
+        return None
+    return data[data.rfind(')') + 2:].split()
+
+
+def _read_io(pid: str) -> Dict[str, int]:
+    """/proc/<pid>/io（无权限时为空）"""
+    counters = {}
+    try:
+        with open(f'{PROC}/{pid}/io', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                counters[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return counters
+
+
+def _read_net(pid: str) -> Optional[Dict[str, int]]:
+    """进程所在网络命名空间的收发字节数（不含 lo）"""
+    rx = tx = 0
+    try:
+        with open(f'{PROC}/{pid}/net/dev', 'r') as f:
+            for line in f.readlines()[2:]:
+                name, _, values = line.partition(':')
+                if name.strip() == 'lo':
+                    continue
+                fields = values.split()
+                rx += int(fields[0])
+                tx += int(fields[8])
+    except (OSError, ValueError, IndexError):
+        return None
+    return {'rx': rx, 'tx': tx}
+
+
+def process_tree(root_pid: int) -> List[str]:
+    """根进程及其全部后代的 pid"""
+    children = {}
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return []
+    for pid in entries:
+        if not pid.isdigit():
+            continue
+        fields = _read_stat(pid)
+        if fields:
+            children.setdefault(fields[1], []).append(pid)
+
+    tree, pending = [], [str(root_pid)]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def snapshot(root_pid: int) -> Optional[Dict]:
+    """
+    进程树当前的累计计数
+
+    Returns:
+        {'cpu_seconds', 'rss', 'procs', 'read_bytes', 'write_bytes', 'rchar', 'wchar', 'net_rx', 'net_tx'}，
+        /proc 不可用时为 None
+    """
+    if CLOCK_TICKS is None or not os.path.isdir(PROC):
+        return None
+    totals = {'cpu_seconds': 0.0, 'rss': 0, 'procs': 0,
+              'read_bytes': 0, 'write_bytes': 0, 'rchar': 0, 'wchar': 0}
+    for pid in process_tree(root_pid):
+        fields = _read_stat(pid)
+        if not fields:
+            continue  # 采样期间已退出
+        # utime stime cutime cstime（stat 第 14-17 个字段）；rss 为第 24 个字段（页数）
+        totals['cpu_seconds'] += sum(int(v) for v in fields[11:15]) / CLOCK_TICKS
+        totals['rss'] += int(fields[21]) * PAGE_SIZE
+        totals['procs'] += 1
+        io = _read_io(pid)
+        for key in ('read_bytes', 'write_bytes', 'rchar', 'wchar'):
+            totals[key] += io.get(key, 0)
+
+    net = _read_net(str(root_pid))
+    totals['net_rx'] = net['rx'] if net else None
+    totals['net_tx'] = net['tx'] if net else None
+    return totals
+
+
+class ResourceSampler:
+    """后台线程定期采样任务进程树，并在结束时汇总峰值和总量"""
+
+    COUNTERS = ('read_bytes', 'write_bytes', 'rchar', 'wchar', 'net_rx', 'net_tx')
+
+    def __init__(self, pid: int, on_sample: Callable[[Dict], None], interval: float = SAMPLE_INTERVAL):
+        """
+        初始化
+
+        Args:
+            pid: 任务根进程
+            on_sample: 每次采样的回调（参数为采样结果）
+            interval: 采样间隔（秒）
+        """
+        self.pid = pid
+        self.on_sample = on_sample
+        self.interval = interval
+        self.start_time = time.time()
+        self.peak_rss = 0
+        self.peak_cpu_pct = 0.0
+        self.peak_procs = 0
+        self.samples = 0
+        self.last_sample = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # 任务网络命名空间的起始计数（任务与运行器在同一命名空间）
+        self._net_start = _read_net('self')
+        self._self_io_start = _read_io('self')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        last_time, last_cpu = self.start_time, 0.0
+        while not self._stop.wait(self.interval):
+            current = snapshot(self.pid)
+            if current is None or current['procs'] == 0:
+                continue
+            now = time.time()
+            cpu_pct = (current['cpu_seconds'] - last_cpu) / max(now - last_time, 1e-6) * 100
+            last_time, last_cpu = now, current['cpu_seconds']
+
+            sample = {
+                'elapsed': round(now - self.start_time, 1),
+                'cpu_seconds': round(current['cpu_seconds'], 2),
+                'cpu_pct': round(max(cpu_pct, 0.0), 1),
+                'rss': current['rss'],
+                'procs': current['procs'],
+            }
+            for key in self.COUNTERS:
+                sample[key] = current.get(key)
+            if self._net_start and sample['net_rx'] is not None:
+                sample['net_rx'] -= self._net_start['rx']
+                sample['net_tx'] -= self._net_start['tx']
+
+            self.peak_rss = max(self.peak_rss, sample['rss'])
+            self.peak_cpu_pct = max(self.peak_cpu_pct, sample['cpu_pct'])
+            self.peak_procs = max(self.peak_procs, sample['procs'])
+            self.samples += 1
+            self.last_sample = sample
+            self.on_sample(sample)
+
+    def stop(self) -> Dict:
+        """
+        停止采样（在回收根进程之后调用），返回汇总
+
+        Returns:
+            总 CPU 时间、平均/峰值 CPU、峰值 RSS、I/O 与网络总量
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+        seconds = max(time.time() - self.start_time, 1e-6)
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # 未被等待就退出的孙进程会交给 init 回收，不计入 RUSAGE_CHILDREN，取与最后一次采样的较大值
+        cpu_seconds = max(usage.ru_utime + usage.ru_stime, self.last_sample.get('cpu_seconds', 0))
+        summary = {
+            'seconds': round(seconds, 1),
+            'cpu_seconds': round(cpu_seconds, 2),
+            'avg_cpu_pct': round(cpu_seconds / seconds * 100, 1),
+            'peak_cpu_pct': self.peak_cpu_pct,
+            'peak_rss': self.peak_rss,
+            # 单个进程的最大 RSS（ru_maxrss 单位为 KB）
+            'max_process_rss': usage.ru_maxrss * 1024,
+            'peak_procs': self.peak_procs,
+            'cpus': os.cpu_count(),
+            'samples': self.samples,
+        }
+        # 已回收子进程的 I/O 计数累加在运行器自身的 /proc/self/io 中
+        self_io = _read_io('self')
+        for key in ('read_bytes', 'write_bytes', 'rchar', 'wchar'):
+            if key in self_io:
+                summary[key] = max(self_io[key] - self._self_io_start.get(key, 0), self.last_sample.get(key) or 0)
+            else:
+                summary[key] = self.last_sample.get(key)
+        net = _read_net('self')
+        if net and self._net_start:
+            summary['net_rx'] = net['rx'] - self._net_start['rx']
+            summary['net_tx'] = net['tx'] - self._net_start['tx']
+        else:
+            summary['net_rx'] = summary['net_tx'] = None
+        return summary
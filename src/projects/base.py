@@ -47,6 +47,15 @@ class BaseProject(ABC):
         """
         return '3.10'  # 默认 3.10
     
+    @property
+    def venv_template(self) -> Optional[str]:
+        """
+        模板项目名称
+        首次创建 venv 时，若模板项目同 Python 版本的 venv 已存在，
+        则直接克隆（reflink/hardlink）后增量安装，而不是从空 venv 开始
+        """
+        return None
+    
     def get_all_models(self) -> List[tuple]:
         """获取所有模型（返回 (model_id, source) 列表）"""
         all_models = []
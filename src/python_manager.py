@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+托管 Python 解释器 - 用 uv python install 下载到 Volume 的 pythons/ 目录
+
+- 每个版本只下载一次，所有 Pod 共用（uv 自身对安装目录加锁，多个 Pod 同时安装是安全的）
+- 不依赖 apt，不需要 root，切换 Python 版本只需几秒
+
+注意：pyvenv.cfg 的 home 只能是绝对路径（相对路径会被 CPython 忽略，退回编译时的 prefix），
+所以 venv 统一通过固定路径 /runpod-volume/pythons/ 引用解释器（CANONICAL_VOLUME_PATH）：
+Serverless 上这就是 Volume 挂载点本身，Pod 上由 canonical_pythons_dir() 创建 /runpod-volume -> /workspace 链接。
+同一个 venv（以及复制到本地盘的副本）在两种挂载点下都不需要再改写
+"""
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# venv 中记录解释器路径时使用的 Volume 路径，Pod 和 Serverless 上都指向同一个 Volume
+CANONICAL_VOLUME_PATH = Path('/runpod-volume')
+
+
+class PythonManager:
+    """Volume 上的托管 Python 解释器"""
+
+    def __init__(self, volume_path: str):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 挂载路径
+        """
+        self.volume_path = Path(volume_path)
+        self.pythons_dir = self.volume_path / 'pythons'
+
+    def _env(self) -> Dict[str, str]:
+        env = os.environ.copy()
+        env['UV_PYTHON_INSTALL_DIR'] = str(self.pythons_dir)
+        return env
+
+    def canonical_pythons_dir(self) -> Optional[Path]:
+        """
+        获取与挂载点无关的 pythons/ 路径（CANONICAL_VOLUME_PATH/pythons）
+
+        CANONICAL_VOLUME_PATH 不存在时（Pod）创建指向当前 Volume 的符号链接；
+        已被占用且不是当前 Volume 时不做改动
+
+        Returns:
+            可用时返回该路径，否则返回 None（调用方退回当前挂载点下的绝对路径）
+        """
+        canonical = CANONICAL_VOLUME_PATH
+        if canonical.is_symlink() and not canonical.exists():
+            # Pod 重建后残留的失效链接
+            try:
+                canonical.unlink()
+            except OSError:
+                return None
+        if not canonical.exists():
+            try:
+                canonical.symlink_to(self.volume_path.absolute())
+            except OSError:
+                return None
+        try:
+            if not os.path.samefile(canonical, self.volume_path):
+                return None
+        except OSError:
+            return None
+        return canonical / 'pythons'
+
+    def find(self, python_version: str) -> Optional[Path]:
+        """查找已安装的托管解释器（未安装返回 None）"""
+        if not self.pythons_dir.exists():
+            return None
+        result = subprocess.run(
+            ['uv', 'python', 'find', python_version, '--python-preference', 'only-managed'],
+            capture_output=True, text=True, env=self._env()
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        interpreter = Path(result.stdout.strip().splitlines()[-1])
+        # 只接受 pythons/ 下的解释器，避免用到 uv 默认目录中的其他安装
+        try:
+            interpreter.relative_to(self.pythons_dir)
+        except ValueError:
+            return None
+        return interpreter
+
+    def install(self, python_version: str):
+        """下载并安装解释器到 pythons/"""
+        self.pythons_dir.mkdir(parents=True, exist_ok=True)
+        cmd = ['uv', 'python', 'install', python_version]
+        print(f"📥 下载 Python {python_version} 到 {self.pythons_dir}")
+        print(f"💻 命令: UV_PYTHON_INSTALL_DIR={self.pythons_dir} {' '.join(cmd)}")
+        try:
+            subprocess.run(cmd, check=True, env=self._env())
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"安装 Python {python_version} 失败: {e}")
+
+    def ensure(self, python_version: str) -> Path:
+        """
+        获取托管解释器，没有时先下载
+
+        Returns:
+            解释器路径
+        """
+        interpreter = self.find(python_version)
+        if interpreter is None:
+            self.install(python_version)
+            interpreter = self.find(python_version)
+            if interpreter is None:
+                raise RuntimeError(f"安装后仍未找到 Python {python_version}（{self.pythons_dir}）")
+        return interpreter
+
+    def list_installed(self) -> List[str]:
+        """已安装的解释器目录名（如 cpython-3.10.16-linux-x86_64-gnu）"""
+        if not self.pythons_dir.exists():
+            return []
+        return sorted(
+            entry.name for entry in self.pythons_dir.iterdir()
+            if entry.is_dir() and not entry.name.startswith('.')
+        )
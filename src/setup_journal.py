@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+setup 断点续传日志 - 记录每个步骤的完成情况和耗时
+
+步骤:
+    venv:create        创建/克隆新一代 venv（记录代目录，续传时继续在其中安装）
+    deps:<组名>         每个依赖组（记录装入的代目录，只在同一代中续传时跳过）
+    venv:activate      重定位、裁剪、预编译并原子激活
+    model:<模型ID>      每个模型
+    post:modelscope-patch  安装后修复 ModelScope 版本检测（在新一代上、激活前，记录代目录）
+    stage:deps / stage:models  整个阶段完成（续传时整段跳过）
+
+- 日志为 .metadata/setup/<项目>.jsonl，每个记录一行，以 O_APPEND 单次 write + fsync 写入，
+  Pod 被抢占时最多丢失正在进行的那一步
+- 每次 setup 是一个 run；上一个 run 未完成（或有失败步骤）且配置指纹未变时续传，否则开始新 run
+- setup 通过环境变量 RUNPOD_SETUP_JOURNAL 把日志路径传给 deps install / models download 子进程，
+  未设置时这些命令的行为不变
+"""
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+JOURNAL_ENV = 'RUNPOD_SETUP_JOURNAL'
+
+
+def config_fingerprint(*parts) -> str:
+    """配置指纹（依赖配置内容、Python 版本、模型列表等）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+class SetupJournal:
+    """setup 步骤日志"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.run_id = None
+        self.fingerprint = None
+        self.finished = None
+        # 步骤名 -> 当前 run 中该步骤的最新记录
+        self.steps = {}
+        self.load()
+
+    @classmethod
+    def for_project(cls, volume_path: str, project_name: str) -> 'SetupJournal':
+        setup_dir = Path(volume_path) / '.metadata' / 'setup'
+        setup_dir.mkdir(parents=True, exist_ok=True)
+        return cls(setup_dir / f'{project_name}.jsonl')
+
+    @classmethod
+    def from_env(cls) -> Optional['SetupJournal']:
+        """setup 子进程中使用的日志（不在 setup 中运行时为 None）"""
+        path = os.environ.get(JOURNAL_ENV)
+        return cls(path) if path else None
+
+    def load(self):
+        """读取最近一个 run 的步骤记录（末尾未写完的行忽略）"""
+        self.run_id, self.fingerprint, self.finished, self.steps = None, None, None, {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('step') == 'run':
+                if record.get('status') == 'started':
+                    self.run_id, self.fingerprint = record['run'], record.get('fingerprint')
+                    self.finished, self.steps = None, {}
+                elif record.get('run') == self.run_id:
+                    self.finished = record
+            elif record.get('run') == self.run_id:
+                self.steps[record['step']] = record
+
+    def _append(self, record: Dict):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def begin(self, fingerprint: str, restart: bool = False) -> bool:
+        """
+        开始或续传一个 run
+
+        Args:
+            fingerprint: 当前配置指纹
+            restart: 忽略未完成的 run，重新开始
+
+        Returns:
+            是否为续传
+        """
+        resumable = (self.run_id is not None and self.fingerprint == fingerprint
+                     and not (self.finished and self.finished.get('ok')))
+        if resumable and not restart:
+            return True
+
+        # 新 run：只保留本次记录（tmp + replace，旧日志在替换前始终完整）
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.fingerprint, self.finished, self.steps = fingerprint, None, {}
+        record = {'ts': round(time.time(), 3), 'run': self.run_id, 'step': 'run',
+                  'status': 'started', 'fingerprint': fingerprint}
+        tmp = self.path.with_suffix('.jsonl.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return False
+
+    def record(self, step: str, status: str, **fields):
+        """追加一个步骤记录（status: done / failed / started）"""
+        if self.run_id is None:
+            return
+        record = {'ts': round(time.time(), 3), 'run': self.run_id, 'step': step, 'status': status}
+        record.update(fields)
+        self._append(record)
+        self.steps[step] = record
+
+    def is_done(self, step: str) -> bool:
+        return self.steps.get(step, {}).get('status') == 'done'
+
+    def get(self, step: str) -> Optional[Dict]:
+        return self.steps.get(step)
+
+    def finish(self, ok: bool):
+        self.record('run', 'finished', ok=ok)
+        self.finished = self.steps.pop('run')
+
+    def summary(self) -> List[Dict]:
+        """当前 run 的步骤记录（按完成时间）"""
+        return sorted(self.steps.values(), key=lambda r: r['ts'])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务事件流 - 与人类可读日志并列的 JSONL 结构化事件文件
+
+- 任务运行器通过环境变量 RUNPOD_TASK_EVENTS 告诉子进程事件文件路径，
+  未设置时 emit() 什么也不做（前台运行不受影响）
+- 每个事件一行 JSON，以 O_APPEND 单次 write 写入，多个线程/进程同时写不会交错
+- 读取方记录已读到的字节偏移，每次只解析新增的完整行
+"""
+import os
+import json
+import time
+from typing import Dict, List, Tuple
+
+EVENTS_ENV = 'RUNPOD_TASK_EVENTS'
+
+
+def emit(event: str, **fields):
+    """追加一个事件（未在后台任务中运行时忽略）"""
+    path = os.environ.get(EVENTS_ENV)
+    if not path:
+        return
+    record = {'ts': round(time.time(), 3), 'event': event}
+    record.update(fields)
+    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        # 事件只用于进度展示，写失败不能影响任务本身
+        pass
+
+
+def read_events(path: str, offset: int = 0) -> Tuple[List[Dict], int]:
+    """
+    从字节偏移处读取新增事件
+
+    末尾未写完的行不解析，留到下次读取
+
+    Returns:
+        (事件列表, 新的偏移)
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    end = data.rfind(b'\n') + 1
+    events = []
+    for line in data[:end].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events, offset + end
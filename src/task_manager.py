@@ -5,13 +5,27 @@
 """
 import os
 import sys
+import gzip
 import json
+import time
+import shutil
+import socket
 import subprocess
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
 import string
 
+from src.task_events import read_events
+from src.metadata_store import MetadataStore, TASK_FIELDS
+from src.leases import Lease
+
+# 后台任务以 python -m src.task_runner 启动，需要能导入 src 包
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+
+# 清理任务时归档的文件
+ARCHIVED_SUFFIXES = ('.log', '.events.jsonl')
+
 
 class TaskManager:
     """后台任务管理器"""
@@ -26,6 +40,9 @@ class TaskManager:
         self.volume_path = Path(volume_path)
         self.tasks_dir = self.volume_path / '.metadata' / 'tasks'
         self.tasks_dir.mkdir(parents=True, exist_ok=True)
+        # 任务索引在元数据库的 tasks 表中，列出任务时不需要读取每个任务的元数据
+        self.store = MetadataStore(volume_path)
+        self.archive_dir = self.tasks_dir / 'archive'
     
     def generate_task_id(self, prefix: str = "deps_install") -> str:
         """生成唯一任务ID"""
@@ -33,32 +50,63 @@ class TaskManager:
         random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=4))
         return f"{prefix}_{timestamp}_{random_suffix}"
     
-    def start_background_task(self, command_args: list, task_id: str = None) -> dict:
+    def start_background_task(self, command_args: list, task_id: str = None, scheduling: dict = None) -> dict:
         """
         启动后台任务
         
         Args:
             command_args: 命令参数列表（不包含 --async）
             task_id: 任务ID（可选，不提供则自动生成）
+            scheduling: 调度配置（nice/ionice/CPU 亲和性/cgroup 权重，见 task_priority.build_scheduling）
         
         Returns:
             任务信息字典
         """
+        task_info, _ = self.spawn_task(command_args, task_id, scheduling=scheduling)
+        return task_info
+    
+    def spawn_task(self, command_args: list, task_id: str = None, lease_key: str = None,
+                   scheduling: dict = None):
+        """
+        启动后台任务并返回进程对象（供需要等待任务结束的调用方使用，如队列 worker）
+        
+        Args:
+            command_args: 命令参数列表
+            task_id: 任务ID（可选，不提供则自动生成）
+            lease_key: 任务运行期间由运行器持有的租约键（其他 Pod 据此判断任务是否仍在运行）
+            scheduling: 调度配置，由运行器在启动命令前应用
+        
+        Returns:
+            (任务信息字典, subprocess.Popen)
+        """
         if task_id is None:
             task_id = self.generate_task_id()
         
-        # 创建日志文件
+        # 创建日志文件（人类可读）和事件文件（结构化，用于计算进度和状态）
         log_file = self.tasks_dir / f"{task_id}.log"
+        events_file = self.tasks_dir / f"{task_id}.events.jsonl"
         
-        # 构建后台命令（移除 --async 参数）
+        # 构建后台命令（移除 --async），由任务运行器包装以记录退出码
         bg_command = [sys.executable] + [arg for arg in command_args if arg != '--async']
+        runner_command = [sys.executable, '-m', 'src.task_runner', str(events_file)]
+        if lease_key:
+            runner_command.extend(['--lease', json.dumps({'volume': str(self.volume_path), 'key': lease_key})])
+        if scheduling:
+            runner_command.extend(['--scheduling', json.dumps(scheduling)])
+        runner_command += ['--'] + bg_command
+        
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PACKAGE_ROOT), env.get('PYTHONPATH')]))
+        env['PYTHONUNBUFFERED'] = '1'
         
         # 启动后台进程
         with open(log_file, 'w') as log_f:
             process = subprocess.Popen(
-                bg_command,
+                runner_command,
+                stdin=subprocess.DEVNULL,  # 后台运行没有终端输入，交互式确认直接读到 EOF
                 stdout=log_f,
                 stderr=subprocess.STDOUT,
+                env=env,
                 start_new_session=True  # 脱离当前会话
             )
         
@@ -68,20 +116,101 @@ class TaskManager:
             'command': ' '.join(command_args),
             'status': 'running',
             'pid': process.pid,
+            'host': socket.gethostname(),
+            'lease': lease_key,
             'log_file': str(log_file),
+            'events_file': str(events_file),
+            'events_offset': 0,
             'started_at': datetime.now().isoformat(),
-            'progress': {
-                'current_group': None,
-                'total_groups': 0,
-                'completed_groups': 0
-            }
+            'scheduling': scheduling,
+            'progress': self._empty_progress()
         }
         
-        metadata_file = self.tasks_dir / f"{task_id}.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(task_info, f, indent=2)
+        self._save_task(task_info)
         
-        return task_info
+        # 顺便按默认策略清理旧任务，任务目录不会无限增长
+        try:
+            self.prune_tasks()
+        except OSError:
+            pass
+        
+        return task_info, process
+    
+    def _save_task(self, task_info: dict):
+        """写入任务元数据（先写临时文件再 rename，读取方不会看到半个文件），状态变化时更新索引"""
+        if task_info.get('indexed_status') != task_info['status']:
+            task_info['indexed_status'] = task_info['status']
+            self.store.upsert_task(task_info)
+        metadata_file = self.tasks_dir / f"{task_info['task_id']}.json"
+        tmp = metadata_file.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(task_info, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, metadata_file)
+    
+    def prune_tasks(self, max_age_days: float = 30, keep: int = 100, dry_run: bool = False) -> dict:
+        """
+        清理旧任务：已结束且超过保留天数、或超出保留数量的任务
+        
+        日志和事件文件 gzip 压缩到 archive/ 后删除原文件，元数据移入 archive/，运行中的任务不处理
+        
+        Args:
+            max_age_days: 保留天数
+            keep: 最多保留的已结束任务数（按开始时间保留最新的）
+            dry_run: 只返回将被清理的任务
+        
+        Returns:
+            {'tasks': [task_id], 'bytes': 原始大小, 'archived_bytes': 压缩后大小}
+        """
+        # list_tasks 会先刷新标记为运行中的任务
+        finished = sorted(
+            (t for t in self.list_tasks() if t.get('status') != 'running'),
+            key=lambda t: t.get('started_at') or '', reverse=True
+        )
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        expired = [t for i, t in enumerate(finished) if i >= keep or (t.get('started_at') or '') < cutoff]
+        
+        stats = {'tasks': [t['task_id'] for t in expired], 'bytes': 0, 'archived_bytes': 0}
+        if dry_run or not expired:
+            for t in expired:
+                for suffix in ARCHIVED_SUFFIXES:
+                    path = self.tasks_dir / f"{t['task_id']}{suffix}"
+                    if path.exists():
+                        stats['bytes'] += path.stat().st_size
+            return stats
+        
+        self.archive_dir.mkdir(exist_ok=True)
+        for t in expired:
+            task_id = t['task_id']
+            for suffix in ARCHIVED_SUFFIXES:
+                path = self.tasks_dir / f"{task_id}{suffix}"
+                if not path.exists():
+                    continue
+                target = self.archive_dir / f"{task_id}{suffix}.gz"
+                with open(path, 'rb') as src, gzip.open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                stats['bytes'] += path.stat().st_size
+                stats['archived_bytes'] += target.stat().st_size
+                path.unlink()
+            # 元数据很小，原样移入归档目录
+            metadata_file = self.tasks_dir / f"{task_id}.json"
+            if metadata_file.exists():
+                os.replace(metadata_file, self.archive_dir / metadata_file.name)
+        
+        self.store.delete_tasks(stats['tasks'])
+        return stats
+    
+    @staticmethod
+    def _empty_progress() -> dict:
+        return {
+            'current_group': None,
+            'total_groups': 0,
+            'completed_groups': 0,
+            'success_count': 0,
+            'failed_count': 0,
+            'retry_count': 0,
+            'groups': {},
+            'exit_code': None
+        }
     
     def get_task_status(self, task_id: str) -> dict:
         """
@@ -100,17 +229,122 @@ class TaskManager:
         with open(metadata_file, 'r') as f:
             task_info = json.load(f)
         
+        if 'events_file' not in task_info:
+            return self._legacy_task_status(task_info, metadata_file)
+        
+        # 只解析上次之后新增的事件，耗时与日志总长度无关
+        events, offset = read_events(task_info['events_file'], task_info.get('events_offset', 0))
+        progress = task_info.get('progress') or self._empty_progress()
+        for event in events:
+            self._apply_event(progress, event)
+        changed = bool(events)
+        task_info['progress'] = progress
+        task_info['events_offset'] = offset
+        
+        if task_info['status'] == 'running':
+            if progress['exit_code'] is not None:
+                task_info['status'] = 'completed' if progress['exit_code'] == 0 else 'failed'
+                task_info['completed_at'] = datetime.now().isoformat()
+                changed = True
+            elif not self._runner_alive(task_info):
+                # 运行器被强制杀死，没能写入结束事件
+                events, offset = read_events(task_info['events_file'], offset)
+                for event in events:
+                    self._apply_event(progress, event)
+                task_info['events_offset'] = offset
+                task_info['status'] = 'completed' if progress['exit_code'] == 0 else 'failed'
+                task_info['completed_at'] = datetime.now().isoformat()
+                changed = True
+        
+        if changed:
+            self._save_task(task_info)
+        return task_info
+    
+    def _runner_alive(self, task_info: dict) -> bool:
+        """
+        任务运行器是否仍在运行
+
+        PID 只在启动任务的主机上有意义：其他 Pod 启动的任务按其租约判断，没有租约时无法判断，视为仍在运行
+        （结束后事件文件中的 task_finished 会更新状态）
+        """
+        if task_info.get('host', socket.gethostname()) == socket.gethostname():
+            return self._pid_alive(task_info['pid'])
+        if task_info.get('lease'):
+            return Lease(str(self.volume_path), task_info['lease']).current() is not None
+        return True
+    
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)  # 检查进程是否存在
+        except OSError:
+            return False
+        return True
+    
+    @staticmethod
+    def _apply_event(progress: dict, event: dict):
+        """把一个事件合并到进度中"""
+        kind = event.get('event')
+        groups = progress.setdefault('groups', {})
+        if kind == 'install_started':
+            progress['total_groups'] = event.get('total', 0)
+            progress['completed_groups'] = 0
+            progress['success_count'] = progress['failed_count'] = 0
+            groups.clear()
+        elif kind == 'group_started':
+            progress['current_group'] = event['group']
+            groups[event['group']] = {'status': 'running', 'packages': event.get('packages')}
+        elif kind == 'group_finished':
+            entry = groups.setdefault(event['group'], {})
+            entry.update({
+                'status': 'success' if event.get('ok') else 'failed',
+                'seconds': event.get('seconds'),
+                'prefetch_seconds': event.get('prefetch_seconds'),
+                'exit_code': event.get('exit_code'),
+                'bytes': event.get('bytes')
+            })
+            progress['completed_groups'] += 1
+            progress['success_count' if event.get('ok') else 'failed_count'] += 1
+        elif kind == 'group_skipped':
+            groups[event['group']] = {'status': 'skipped', 'reason': event.get('reason')}
+            progress['completed_groups'] += 1
+            progress['failed_count'] += 1
+        elif kind in ('venv_activated', 'venv_discarded'):
+            progress['generation'] = event.get('generation')
+            progress['activated'] = kind == 'venv_activated'
+        elif kind == 'model_started':
+            progress.setdefault('models', {})[event['model']] = {'status': 'running'}
+            progress['current_model'] = event['model']
+            progress['total_models'] = event.get('total', 0)
+        elif kind == 'model_finished':
+            progress.setdefault('models', {})[event['model']] = {
+                'status': 'success' if event.get('ok') else 'failed',
+                'seconds': event.get('seconds'),
+                'bytes': event.get('bytes')
+            }
+        elif kind == 'resource_sample':
+            fields = {k: v for k, v in event.items() if k not in ('ts', 'event')}
+            resources = progress.setdefault('resources', {})
+            resources.update(fields)
+            resources['peak_rss'] = max(resources.get('peak_rss', 0), fields.get('rss') or 0)
+            resources['peak_cpu_pct'] = max(resources.get('peak_cpu_pct', 0), fields.get('cpu_pct') or 0)
+        elif kind == 'scheduling_applied':
+            progress['scheduling'] = {'applied': event.get('applied', {}), 'errors': event.get('errors', {})}
+        elif kind == 'resource_summary':
+            progress['resource_summary'] = {k: v for k, v in event.items() if k not in ('ts', 'event')}
+        elif kind == 'task_finished':
+            progress['exit_code'] = event.get('exit_code')
+            progress['seconds'] = event.get('seconds')
+    
+    def _legacy_task_status(self, task_info: dict, metadata_file: Path) -> dict:
+        """没有事件文件的旧任务：从日志文本推断状态和进度"""
         # 检查进程是否还在运行
         if task_info['status'] == 'running':
-            pid = task_info['pid']
-            try:
-                os.kill(pid, 0)  # 检查进程是否存在
-            except OSError:
+            if not self._runner_alive(task_info):
                 # 进程已结束，更新状态
                 task_info['status'] = self._detect_final_status(task_info['log_file'])
                 task_info['completed_at'] = datetime.now().isoformat()
-                with open(metadata_file, 'w') as f:
-                    json.dump(task_info, f, indent=2)
+                self._save_task(task_info)
         
         # 解析日志获取最新进度
         task_info['progress'] = self._parse_log_progress(task_info['log_file'])
@@ -118,7 +352,7 @@ class TaskManager:
         return task_info
     
     def _detect_final_status(self, log_file: str) -> str:
-        """从日志检测最终状态"""
+        """从日志检测最终状态（仅用于没有事件文件的旧任务）"""
         try:
             with open(log_file, 'r') as f:
                 content = f.read()
@@ -176,19 +410,73 @@ class TaskManager:
         
         return progress
     
-    def list_tasks(self) -> list:
-        """列出所有任务"""
-        tasks = []
-        for metadata_file in self.tasks_dir.glob('*.json'):
+    def follow(self, task_id: str, poll_interval: float = 0.5):
+        """
+        跟踪任务直到结束
+        
+        按文件大小变化轮询（网络 Volume 上 inotify 收不到其他主机的写入），
+        日志和事件文件都只读取新增部分
+        
+        Yields:
+            ('log', 新增日志文本) / ('progress', 进度字典) / ('done', 任务信息)
+        """
+        task_info = self.get_task_status(task_id)
+        log_file = task_info['log_file']
+        events_file = task_info.get('events_file')
+        log_offset = 0
+        events_offset = 0
+        progress = self._empty_progress()
+        yield 'progress', progress
+        
+        while True:
+            # 先判断是否结束再读取，保证结束前写入的内容都能读到
+            finished = task_info['status'] != 'running'
+            
             try:
-                with open(metadata_file, 'r') as f:
-                    task_info = json.load(f)
-                    tasks.append(task_info)
-            except:
-                continue
-        
-        # 按开始时间倒序排序
-        tasks.sort(key=lambda x: x.get('started_at', ''), reverse=True)
+                size = os.path.getsize(log_file)
+            except OSError:
+                size = log_offset
+            if size > log_offset:
+                with open(log_file, 'rb') as f:
+                    f.seek(log_offset)
+                    data = f.read(size - log_offset)
+                # 只输出完整的行，不完整的留到下次（任务结束时全部输出）
+                end = len(data) if finished else data.rfind(b'\n') + 1
+                if end:
+                    log_offset += end
+                    yield 'log', data[:end].decode('utf-8', errors='replace')
+            
+            if events_file:
+                events, events_offset = read_events(events_file, events_offset)
+                for event in events:
+                    self._apply_event(progress, event)
+                if events:
+                    yield 'progress', progress
+            
+            if finished:
+                yield 'done', task_info
+                return
+            time.sleep(poll_interval)
+            task_info = self.get_task_status(task_id)
+    
+    def list_tasks(self, limit: int = None) -> list:
+        """
+        列出任务摘要（来自索引，不逐个读取任务元数据）
+        
+        Args:
+            limit: 只返回最近的若干个
+        """
+        # 按开始时间倒序（started_at 有索引）
+        tasks = self.store.list_tasks(limit)
+        
+        # 只刷新仍标记为运行中的任务（进程可能已结束）
+        for i, task in enumerate(tasks):
+            if task.get('status') == 'running':
+                try:
+                    task_info = self.get_task_status(task['task_id'])
+                except (FileNotFoundError, OSError, ValueError):
+                    continue
+                tasks[i] = {k: task_info.get(k) for k in TASK_FIELDS}
         return tasks
     
     def stop_task(self, task_id: str, force: bool = False) -> bool:
@@ -212,33 +500,37 @@ class TaskManager:
         if task_info['status'] != 'running':
             return False
         
+        host = task_info.get('host', socket.gethostname())
+        if host != socket.gethostname():
+            # PID 属于其他 Pod，在本机发信号可能误杀无关进程
+            raise PermissionError(f"任务运行在其他 Pod（{host}）上，请在该 Pod 上停止（队列任务可用 queue cancel）")
+        
         pid = task_info['pid']
         
         try:
             # 检查进程是否存在
             os.kill(pid, 0)
             
-            # 终止进程
+            # 终止进程：记录的是 task_runner 的 PID，它以 start_new_session 启动，
+            # 向整个进程组发信号，SIGKILL 时实际命令也一起终止
             import signal
             if force:
-                os.kill(pid, signal.SIGKILL)  # 强制终止
+                os.killpg(pid, signal.SIGKILL)  # 强制终止
             else:
-                os.kill(pid, signal.SIGTERM)  # 优雅终止
+                os.killpg(pid, signal.SIGTERM)  # 优雅终止
             
             # 更新状态
             task_info['status'] = 'stopped'
             task_info['stopped_at'] = datetime.now().isoformat()
             
-            with open(metadata_file, 'w') as f:
-                json.dump(task_info, f, indent=2)
+            self._save_task(task_info)
             
             return True
         
         except ProcessLookupError:
             # 进程不存在
             task_info['status'] = 'completed'
-            with open(metadata_file, 'w') as f:
-                json.dump(task_info, f, indent=2)
+            self._save_task(task_info)
             return False
         except PermissionError:
             raise PermissionError(f"没有权限终止进程 {pid}")
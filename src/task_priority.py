@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务调度优先级 - nice、ionice、CPU 亲和性和 cgroup v2 权重
+
+- 由任务运行器在启动实际命令前作用于自身，命令及其子进程全部继承
+- cgroup v2：只在运行器当前所在 cgroup 已向子 cgroup 开放 cpu/io 控制器（已委派）时生效，
+  在其下创建 runpod-task-<任务ID> 叶子 cgroup，把运行器移入并写入 cpu.weight / io.weight。
+  不会替用户开放控制器：那需要把父 cgroup 中的其他进程迁走（cgroup v2 不允许有进程的 cgroup
+  向子 cgroup 开放控制器），会改变容器内其他进程的 cgroup 且无法还原；
+  未委派、容器内 cgroup 只读等情况记录原因并跳过
+- 每一项单独生效，某项失败不影响其他项和任务本身
+"""
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+IONICE_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+# --polite 预设：让出 CPU 和磁盘给前台任务
+POLITE = {'nice': 10, 'ionice': 'idle', 'cpu_weight': 20, 'io_weight': 20}
+CGROUP_PREFIX = 'runpod-task-'
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """解析 CPU 列表（如 '0-3,6'）"""
+    cpus = set()
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition('-')
+        if not start.isdigit() or (sep and not end.isdigit()) or int(end or start) < int(start):
+            raise ValueError(f"无效的 CPU 列表: {text}")
+        cpus.update(range(int(start), int(end or start) + 1))
+    if not cpus:
+        raise ValueError(f"无效的 CPU 列表: {text}")
+    return sorted(cpus)
+
+
+def build_scheduling(args) -> Optional[Dict]:
+    """
+    从命令行参数构建调度配置（都未指定时返回 None）
+
+    Raises:
+        ValueError: 参数取值无效
+    """
+    scheduling = dict(POLITE) if getattr(args, 'polite', False) else {}
+    if getattr(args, 'nice', None) is not None:
+        if not 0 <= args.nice <= 19:
+            raise ValueError("--nice 取值范围为 0-19")
+        scheduling['nice'] = args.nice
+    if getattr(args, 'ionice', None):
+        cls, _, level = args.ionice.partition(':')
+        if cls not in IONICE_CLASSES or (level and not (level.isdigit() and int(level) <= 7)):
+            raise ValueError("--ionice 格式为 idle、best-effort[:0-7] 或 realtime[:0-7]")
+        scheduling['ionice'] = args.ionice
+    if getattr(args, 'cpus', None):
+        scheduling['cpus'] = parse_cpu_list(args.cpus)
+    for key in ('cpu_weight', 'io_weight'):
+        value = getattr(args, key, None)
+        if value is not None:
+            if not 1 <= value <= 10000:
+                raise ValueError(f"--{key.replace('_', '-')} 取值范围为 1-10000")
+            scheduling[key] = value
+    return scheduling or None
+
+
+def describe_scheduling(scheduling: Dict) -> str:
+    """调度配置的单行描述"""
+    labels = {'nice': 'nice', 'ionice': 'ionice', 'cpus': 'CPU', 'cpu_weight': 'cpu.weight', 'io_weight': 'io.weight'}
+    parts = []
+    for key, label in labels.items():
+        if key in scheduling:
+            value = scheduling[key]
+            parts.append(f"{label}={','.join(map(str, value)) if isinstance(value, list) else value}")
+    return ' '.join(parts)
+
+
+def _cgroup2_dir() -> Optional[Path]:
+    """当前进程所在的 cgroup v2 目录（未挂载 cgroup2 时为 None）"""
+    mount = None
+    try:
+        with open('/proc/self/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    mount = fields[1]
+                    break
+        if mount is None:
+            return None
+        with open('/proc/self/cgroup', 'r') as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return Path(mount) / line.strip()[3:].lstrip('/')
+    except OSError:
+        pass
+    return None
+
+
+def _write(path: Path, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _delegation_error(parent: Path, controller: str) -> Optional[str]:
+    """
+    父 cgroup 是否已向子 cgroup 开放控制器
+
+    Returns:
+        未开放的原因（已开放为 None）
+    """
+    try:
+        enabled = (parent / 'cgroup.subtree_control').read_text().split()
+    except OSError as e:
+        return f'无法读取 {parent} 的控制器: {e.strerror}'
+    if controller not in enabled:
+        return (f'{controller} 控制器未委派给 {parent} 的子 cgroup'
+                f'（需预先在 cgroup.subtree_control 中开放，不会自动迁移其他进程）')
+    return None
+
+
+def _apply_cgroup(scheduling: Dict, task_id: str, applied: Dict, errors: Dict):
+    parent = _cgroup2_dir()
+    keys = []
+    for key, filename in (('cpu_weight', 'cpu.weight'), ('io_weight', 'io.weight')):
+        if key not in scheduling:
+            continue
+        reason = '未挂载 cgroup v2' if parent is None else _delegation_error(parent, filename.split('.')[0])
+        if reason:
+            errors[key] = reason
+        else:
+            keys.append((key, filename))
+    if not keys:
+        return
+
+    # 清理之前的任务退出后留下的空 cgroup（仍有进程时 rmdir 失败，保持不变）
+    for stale in parent.glob(f'{CGROUP_PREFIX}*'):
+        try:
+            stale.rmdir()
+        except OSError:
+            pass
+
+    group = parent / f'{CGROUP_PREFIX}{task_id}'
+    try:
+        group.mkdir(exist_ok=True)
+        _write(group / 'cgroup.procs', str(os.getpid()))
+    except OSError as e:
+        errors['cgroup'] = f'无法加入 {group}: {e.strerror}'
+        try:
+            group.rmdir()
+        except OSError:
+            pass
+        return
+    applied['cgroup'] = str(group)
+    applied['cgroup_parent'] = str(parent)
+
+    for key, filename in keys:
+        try:
+            _write(group / filename, str(scheduling[key]))
+            applied[key] = scheduling[key]
+        except OSError as e:
+            errors[key] = f'写入 {filename} 失败: {e.strerror}'
+
+    # 没有任何权重生效时不必留在子 cgroup 中
+    if 'cpu_weight' not in applied and 'io_weight' not in applied:
+        release_cgroup({'applied': applied})
+        del applied['cgroup'], applied['cgroup_parent']
+
+
+def apply_scheduling(scheduling: Dict, task_id: str) -> Dict:
+    """
+    把调度配置作用于当前进程（之后启动的子进程继承）
+
+    Args:
+        scheduling: build_scheduling() 的结果
+        task_id: 任务ID（用于命名子 cgroup）
+
+    Returns:
+        {'applied': {...}, 'errors': {项: 原因}}
+    """
+    applied, errors = {}, {}
+
+    if 'nice' in scheduling:
+        try:
+            applied['nice'] = os.nice(scheduling['nice'] - os.nice(0))
+        except (OSError, AttributeError) as e:
+            errors['nice'] = str(e)
+
+    if 'ionice' in scheduling:
+        cls, _, level = scheduling['ionice'].partition(':')
+        ionice = shutil.which('ionice')
+        if ionice is None:
+            errors['ionice'] = '未找到 ionice 命令（util-linux）'
+        else:
+            command = [ionice, '-c', str(IONICE_CLASSES[cls])]
+            if level:
+                command += ['-n', level]
+            result = subprocess.run(command + ['-p', str(os.getpid())], capture_output=True, text=True)
+            if result.returncode == 0:
+                applied['ionice'] = scheduling['ionice']
+            else:
+                errors['ionice'] = result.stderr.strip() or f'退出码 {result.returncode}'
+
+    if 'cpus' in scheduling:
+        try:
+            os.sched_setaffinity(0, scheduling['cpus'])
+            applied['cpus'] = sorted(os.sched_getaffinity(0))
+        except (OSError, AttributeError, ValueError) as e:
+            errors['cpus'] = str(e)
+
+    if 'cpu_weight' in scheduling or 'io_weight' in scheduling:
+        _apply_cgroup(scheduling, task_id, applied, errors)
+
+    return {'applied': applied, 'errors': errors}
+
+
+def release_cgroup(result: Dict):
+    """
+    任务结束后运行器移回父 cgroup 并删除子 cgroup
+
+    移不回去（父 cgroup 不能直接容纳进程）或仍有残留进程时保留，下一个任务启动时清理空的子 cgroup
+    """
+    applied = result.get('applied', {})
+    if not applied.get('cgroup'):
+        return
+    try:
+        _write(Path(applied['cgroup_parent']) / 'cgroup.procs', str(os.getpid()))
+        Path(applied['cgroup']).rmdir()
+    except OSError:
+        pass
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务运行器 - 包装实际命令，记录开始/结束事件、退出码和资源占用
+
+用法（由 TaskManager 启动）:
+    python -m src.task_runner <events.jsonl> [--lease <JSON>] [--scheduling <JSON>] -- <命令> [参数...]
+
+--lease: {"volume": Volume 根目录, "key": 租约键}，运行期间持有该租约并定期心跳，结束时发布退出码；
+         队列据此判断任务是否仍在运行（跨 Pod，不依赖 fcntl 锁能否在网络卷上跨主机生效）
+--scheduling: 启动命令前作用于运行器自身的调度配置（nice/ionice/CPU 亲和性/cgroup 权重），命令继承
+"""
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+
+from src.task_events import EVENTS_ENV, emit
+from src.proc_sampler import ResourceSampler
+from src.task_priority import apply_scheduling, release_cgroup
+from src.leases import Lease
+
+
+def run(events_file: str, command: list, scheduling: dict = None) -> int:
+    """运行命令并记录 task_started / resource_* / task_finished 事件，返回退出码"""
+    os.environ[EVENTS_ENV] = events_file
+    start = time.time()
+    priority = None
+    if scheduling:
+        task_id = os.path.basename(events_file).split('.', 1)[0]
+        priority = apply_scheduling(scheduling, task_id)
+        emit('scheduling_applied', **priority)
+    process = subprocess.Popen(command)
+    emit('task_started', pid=process.pid, command=command)
+
+    # 低频采样进程树的资源占用（/proc 不可用时只记录结束时的汇总）
+    sampler = ResourceSampler(process.pid, lambda sample: emit('resource_sample', **sample))
+    sampler.start()
+
+    # 停止任务时把信号转发给实际命令，由其自行清理
+    def forward(signum, frame):
+        process.send_signal(signum)
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    exit_code = process.wait()
+    emit('resource_summary', **sampler.stop())
+    if priority:
+        release_cgroup(priority)
+    emit('task_finished', exit_code=exit_code, seconds=round(time.time() - start, 3))
+    return exit_code
+
+
+def main():
+    argv = sys.argv[1:]
+    usage = "用法: python -m src.task_runner <events.jsonl> [--lease <JSON>] [--scheduling <JSON>] -- <命令> [参数...]"
+    if not argv:
+        print(usage, file=sys.stderr)
+        sys.exit(2)
+    events_file, options = argv[0], argv[1:]
+    lease = None
+    scheduling = None
+    while len(options) >= 2 and options[0] in ('--lease', '--scheduling'):
+        if options[0] == '--lease':
+            spec = json.loads(options[1])
+            lease = Lease(spec['volume'], spec['key'])
+        else:
+            scheduling = json.loads(options[1])
+        options = options[2:]
+    if len(options) < 2 or options[0] != '--':
+        print(usage, file=sys.stderr)
+        sys.exit(2)
+    exit_code = None
+    if lease:
+        # 被 SIGKILL 时心跳停止，租约超时后由其他 worker 回收
+        lease.acquire()
+    try:
+        exit_code = run(events_file, options[1:], scheduling)
+    finally:
+        if lease:
+            lease.release({'exit_code': exit_code})
+    # 被信号终止时退出码为负数
+    sys.exit(exit_code if exit_code >= 0 else 128 - exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+吞吐量历史 - 记录每次依赖安装/模型下载的字节数与耗时，用于 plan 估算时间
+
+保存在元数据库的 throughput 表中（多个 Pod 同时记录不会互相覆盖），每类只保留最近的若干条样本
+"""
+from typing import Optional, Tuple
+
+from src.metadata_store import MetadataStore
+
+MAX_SAMPLES = 20
+
+# 没有历史记录时使用的保守默认值（字节/秒）
+DEFAULT_RATES = {
+    'deps': 30 * 1024 * 1024,    # 安装后的 site-packages 字节
+    'models': 50 * 1024 * 1024,  # 模型文件字节
+}
+
+
+class ThroughputHistory:
+    """吞吐量历史"""
+
+    def __init__(self, volume_path: str, store: Optional[MetadataStore] = None):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 根目录
+            store: 已打开的元数据库（默认新建连接）
+        """
+        self.store = store or MetadataStore(volume_path)
+
+    def record(self, kind: str, size_bytes: int, seconds: float):
+        """记录一次样本（过小的样本受固定开销影响大，不记录）"""
+        if size_bytes < 1024 * 1024 or seconds <= 0:
+            return
+        self.store.record_throughput(kind, size_bytes, round(seconds, 3), keep=MAX_SAMPLES)
+
+    def rate(self, kind: str) -> Tuple[float, int]:
+        """
+        历史吞吐量（总字节 / 总耗时，大任务权重更高）
+
+        Returns:
+            (字节/秒, 样本数)；没有样本时返回默认值和 0
+        """
+        samples = self.store.throughput_samples(kind)
+        total_seconds = sum(s['seconds'] for s in samples)
+        if not samples or total_seconds <= 0:
+            return float(DEFAULT_RATES.get(kind, 10 * 1024 * 1024)), 0
+        return sum(s['bytes'] for s in samples) / total_seconds, len(samples)
+
+    def estimate(self, kind: str, size_bytes: int) -> Optional[float]:
+        """按历史吞吐量估算耗时（秒）"""
+        rate, _ = self.rate(kind)
+        return size_bytes / rate if rate > 0 else None
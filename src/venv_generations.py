@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 代际管理（蓝绿构建）
+
+目录结构:
+    venvs/
+    ├── py3.10-<project> -> .generations/py3.10-<project>/g20250101-120000-123456
+    ├── .generations/py3.10-<project>/<generation>/   # 每次构建一个新目录
+    └── .trash/                                       # 待后台删除的旧代
+
+- 新依赖总是安装到新的代目录，安装成功后通过 symlink 原子替换激活
+- 正在运行的进程继续使用旧代，旧代交给后台低优先级进程回收
+- symlink 使用相对路径，Pod（/workspace）和 Serverless（/runpod-volume）都能解析
+"""
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from src.fs_utils import reclaim_in_background
+
+
+class VenvGenerations:
+    """Venv 代际管理器"""
+
+    GENERATIONS_DIR = '.generations'
+    TRASH_DIR = '.trash'
+    ACTIVATED_FILE = '.activated'
+
+    def __init__(self, venvs_dir: Path, keep: int = 1):
+        """
+        初始化
+
+        Args:
+            venvs_dir: venvs 根目录
+            keep: 除当前代外保留的旧代数量（给仍在运行的旧进程使用）
+        """
+        self.venvs_dir = Path(venvs_dir)
+        self.generations_root = self.venvs_dir / self.GENERATIONS_DIR
+        self.trash_dir = self.venvs_dir / self.TRASH_DIR
+        self.keep = keep
+
+    def _generations_dir(self, venv_name: str) -> Path:
+        return self.generations_root / venv_name
+
+    def _activated(self, venv_name: str) -> List[str]:
+        """激活过的代名（按激活顺序）；启用记录前的旧卷返回空列表"""
+        try:
+            return (self._generations_dir(venv_name) / self.ACTIVATED_FILE).read_text().split()
+        except FileNotFoundError:
+            return []
+
+    def current(self, venv_name: str) -> Optional[Path]:
+        """
+        当前激活的代目录
+
+        Returns:
+            代目录路径；未使用代际管理的旧 venv 返回其真实目录；不存在返回 None
+        """
+        link = self.venvs_dir / venv_name
+        if link.is_symlink():
+            # 不用 resolve()：Volume 挂载点本身可能是 symlink，保持与 venvs_dir 同一前缀便于比较
+            target = Path(os.path.normpath(self.venvs_dir / os.readlink(link)))
+            return target if target.exists() else None
+        if link.is_dir():
+            return link
+        return None
+
+    def list_generations(self, venv_name: str) -> List[Path]:
+        """列出所有代（按创建时间升序）"""
+        gen_dir = self._generations_dir(venv_name)
+        if not gen_dir.exists():
+            return []
+        return sorted(p for p in gen_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+    def new_generation_path(self, venv_name: str) -> Path:
+        """分配一个新的代目录路径（目录本身由调用方创建）"""
+        gen_dir = self._generations_dir(venv_name)
+        gen_dir.mkdir(parents=True, exist_ok=True)
+        # 目录名按时间排序即为代的先后顺序
+        while True:
+            generation_path = gen_dir / f"g{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+            if not generation_path.exists():
+                return generation_path
+            time.sleep(0.001)
+
+    def activate(self, venv_name: str, generation_path: Path):
+        """
+        原子激活指定代（写临时 symlink 后 rename 覆盖）
+
+        若 venv 仍是旧格式的真实目录，先把它迁移为一代再激活；
+        迁移期间（两次 rename 之间）路径会短暂不存在
+        """
+        link = self.venvs_dir / venv_name
+        target = os.path.relpath(generation_path, self.venvs_dir)
+
+        if link.exists() and not link.is_symlink():
+            legacy_path = self._generations_dir(venv_name) / f"g00000000-legacy-{int(time.time())}"
+            legacy_path.parent.mkdir(parents=True, exist_ok=True)
+            link.rename(legacy_path)
+
+        tmp_link = self.venvs_dir / f".{venv_name}.swap-{os.getpid()}"
+        if tmp_link.is_symlink():
+            tmp_link.unlink()
+        os.symlink(target, tmp_link)
+        os.replace(tmp_link, link)
+
+        with open(self._generations_dir(venv_name) / self.ACTIVATED_FILE, 'a') as f:
+            f.write(generation_path.name + '\n')
+
+    def discard(self, generation_path: Path) -> Optional[int]:
+        """丢弃一个（未激活的）代，后台删除"""
+        generation_path = Path(generation_path)
+        if generation_path == self.current(generation_path.parent.name):
+            raise RuntimeError(f"不能丢弃当前激活的代: {generation_path}")
+        return self._move_to_trash([generation_path])
+
+    def reclaim(self, venv_name: str) -> Optional[int]:
+        """
+        回收旧代：保留当前代和最近 keep 个激活过的旧代，其余移入回收区后台删除
+
+        从未激活过的代（构建中，或 setup 失败后保留待续传的）不占 keep 名额：
+        比当前代新的原样保留，比当前代旧的已被后来激活的代取代，一并回收。
+        同时清理回收区中残留的条目（上次删除进程被中断时留下的）
+
+        Returns:
+            后台删除进程 PID（无需回收时为 None）
+        """
+        current = self.current(venv_name)
+        activated = self._activated(venv_name)
+        old, expired = [], []
+        for generation in self.list_generations(venv_name):
+            if generation == current:
+                continue
+            # 早于第一条激活记录的代来自启用记录之前，按激活过处理
+            if activated and generation.name not in activated and generation.name > activated[0]:
+                if current is not None and generation.name < current.name:
+                    expired.append(generation)
+                continue
+            old.append(generation)
+        expired += old[:-self.keep] if self.keep > 0 else old
+        pid = self._move_to_trash(expired)
+
+        if activated:
+            # 激活记录只保留仍存在的代，避免无限增长
+            remaining = {g.name for g in self.list_generations(venv_name)}
+            history_path = self._generations_dir(venv_name) / self.ACTIVATED_FILE
+            tmp_path = history_path.with_name(f"{self.ACTIVATED_FILE}.tmp-{os.getpid()}")
+            tmp_path.write_text(''.join(f"{name}\n" for name in activated if name in remaining))
+            os.replace(tmp_path, history_path)
+        return pid
+
+    def _move_to_trash(self, paths: List[Path]) -> Optional[int]:
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        for path in paths:
+            if not path.exists():
+                continue
+            trash_path = self.trash_dir / f"{path.parent.name}-{path.name}-{int(time.time() * 1000)}"
+            path.rename(trash_path)
+        return reclaim_in_background(list(self.trash_dir.iterdir()))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 检查 - 在项目 venv 的解释器中读取已安装分发包元数据、隔离地试导入模块
+
+CLI 自身的解释器版本和 sys.path 与项目 venv 无关，
+所以所有检查都通过 venv 的 bin/python 子进程完成
+"""
+import json
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# 在 venv 中执行：stdin 传入需求列表（JSON），stdout 输出检查结果（JSON）
+PROBE_SCRIPT = r'''
+import json, re, sys
+from importlib import metadata
+
+def canonical(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    try:
+        from pip._vendor.packaging.requirements import Requirement
+    except ImportError:
+        Requirement = None
+
+def top_level(dist):
+    text = dist.read_text("top_level.txt")
+    if text:
+        return sorted({l.strip() for l in text.splitlines() if l.strip()})
+    names = set()
+    for f in dist.files or []:
+        parts = f.parts
+        if not parts or parts[0] in ("..", "__pycache__") or parts[0].endswith((".dist-info", ".egg-info", ".data")):
+            continue
+        if len(parts) == 1:
+            if parts[0].endswith(".py"):
+                names.add(parts[0][:-3])
+        elif parts[-1] == "__init__.py" and len(parts) == 2:
+            names.add(parts[0])
+    return sorted(names)
+
+installed = {}
+for dist in metadata.distributions():
+    name = dist.metadata["Name"]
+    if not name or canonical(name) in installed:
+        continue
+    installed[canonical(name)] = {"name": name, "version": dist.version, "top_level": top_level(dist)}
+
+results = []
+for spec in json.load(sys.stdin):
+    entry = {"requirement": spec}
+    if Requirement is not None:
+        try:
+            req = Requirement(spec)
+        except Exception as e:
+            entry.update(name=spec, status="invalid", error=str(e))
+            results.append(entry)
+            continue
+        name, specifier, marker = req.name, req.specifier, req.marker
+        if marker is not None and not marker.evaluate():
+            entry.update(name=name, status="skipped")
+            results.append(entry)
+            continue
+    else:
+        m = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*([^;]*)", spec)
+        if not m:
+            entry.update(name=spec, status="invalid", error="无法解析")
+            results.append(entry)
+            continue
+        name, specifier, marker = m.group(1), m.group(2).strip(), None
+        if ";" in spec:
+            entry.update(name=name, status="skipped")
+            results.append(entry)
+            continue
+    entry["name"] = name
+    dist = installed.get(canonical(name))
+    if dist is None:
+        entry["status"] = "missing"
+    else:
+        entry["installed_version"] = dist["version"]
+        entry["top_level"] = dist["top_level"]
+        if Requirement is not None:
+            ok = specifier.contains(dist["version"], prereleases=True) if str(specifier) else True
+        else:
+            pins = re.findall(r"==\s*([^\s,]+)", specifier)
+            ok = all(p == dist["version"] for p in pins)
+        entry["status"] = "ok" if ok else "mismatch"
+    results.append(entry)
+
+json.dump({"requirements": results, "installed": installed}, sys.stdout)
+'''
+
+
+def probe_requirements(python_bin: Path, requirements: List[str], timeout: int = 120) -> Dict:
+    """
+    在 venv 中检查需求是否满足（基于已安装分发包的元数据：精确名称 + 版本匹配）
+
+    Returns:
+        {'requirements': [{'requirement', 'name', 'status', 'installed_version', 'top_level'}],
+         'installed': {规范化名称: {'name', 'version', 'top_level'}}}
+        status: ok / missing / mismatch / skipped（环境标记不适用）/ invalid（无法解析）
+    """
+    result = subprocess.run(
+        [str(python_bin), '-I', '-c', PROBE_SCRIPT],
+        input=json.dumps(requirements),
+        capture_output=True, text=True, timeout=timeout
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"venv 元数据检查失败:\n{result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def _try_import(python_bin: Path, module: str, timeout: int) -> Tuple[bool, Optional[str]]:
+    try:
+        result = subprocess.run(
+            [str(python_bin), '-I', '-c', f'import {module}'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return False, f"超时（>{timeout}s）"
+    if result.returncode == 0:
+        return True, None
+    lines = result.stderr.strip().splitlines()
+    return False, lines[-1] if lines else f"退出码 {result.returncode}"
+
+
+def check_imports(
+    python_bin: Path,
+    modules: List[str],
+    jobs: int = 4,
+    timeout: int = 60
+) -> Dict[str, Tuple[bool, Optional[str]]]:
+    """
+    在隔离的子进程池中逐个导入模块（每个模块一个独立进程，互不影响，单独超时）
+
+    Returns:
+        {模块名: (是否成功, 错误信息)}
+    """
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        outcomes = pool.map(lambda m: _try_import(python_bin, m, timeout), modules)
+        return dict(zip(modules, outcomes))
@@ -6,10 +6,20 @@ Venv 管理器 - 使用 uv 创建和管理虚拟环境
 import os
 import subprocess
 import shutil
+import time
+import tempfile
 import yaml
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from src.venv_generations import VenvGenerations
+from src.python_manager import PythonManager
+from src.task_events import emit
+
+# 构建租约释放时发布、供等待者复用的结果字段
+REUSABLE_RESULT_FIELDS = ('total', 'installed', 'failed', 'groups', 'activated', 'generation')
 
 
 class VenvManager:
@@ -25,6 +35,11 @@ class VenvManager:
         self.volume_path = Path(volume_path)
         self.venvs_dir = self.volume_path / 'venvs'
         self.venvs_dir.mkdir(parents=True, exist_ok=True)
+        self.generations = VenvGenerations(self.venvs_dir)
+        self.pythons = PythonManager(volume_path)
+        # uv 缓存放在 Volume 上：多个 Python 版本/多个 Pod 共用已下载的 wheel，
+        # 且与 venv 同一文件系统，安装时可以硬链接而不是复制（用户已设置时不覆盖）
+        os.environ.setdefault('UV_CACHE_DIR', str(self.volume_path / '.uv-cache'))
     
     def _check_uv_installed(self):
         """检查 uv 是否已安装"""
@@ -55,14 +70,38 @@ class VenvManager:
         python_bin = venv_path / 'bin' / 'python'
         return venv_path.exists() and python_bin.exists()
     
+    def _create_empty_venv(self, venv_path: Path, python_version: str, prompt: Optional[str] = None):
+        """在指定目录创建空 venv"""
+        print(f"\n{'='*60}")
+        print(f"🔨 创建虚拟环境")
+        print(f"{'='*60}")
+        print(f"📂 路径: {venv_path}")
+        print(f"🐍 Python: {python_version}")
+        
+        # 使用 Volume 上的托管解释器（首次使用时下载）
+        interpreter = self.pythons.ensure(python_version)
+        print(f"🐍 解释器: {interpreter}")
+        
+        # 可重定位：venv 自身路径与挂载点无关；解释器路径在激活前由 make_relocatable 改为 /runpod-volume/pythons/
+        cmd = ['uv', 'venv', str(venv_path), '--python', str(interpreter), '--relocatable']
+        if prompt:
+            cmd.extend(['--prompt', prompt])
+        print(f"💻 命令: {' '.join(cmd)}\n")
+        
+        try:
+            subprocess.run(cmd, check=True)
+            print(f"\n✅ Venv 创建成功")
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"创建 venv 失败: {e}")
+    
     def create_venv(self, project_name: str, python_version: str, force: bool = False) -> Path:
         """
-        创建虚拟环境
+        创建虚拟环境（作为新一代创建并原子激活）
         
         Args:
             project_name: 项目名称
             python_version: Python 版本（如 '3.10'）
-            force: 强制重建（删除已存在的 venv）
+            force: 强制重建（旧 venv 在后台回收，不阻塞）
         
         Returns:
             venv 路径
@@ -71,37 +110,29 @@ class VenvManager:
         
         venv_path = self.get_venv_path(project_name, python_version)
         
-        if self.venv_exists(venv_path):
-            if force:
-                print(f"🗑️  删除已存在的 venv: {venv_path.name}")
-                shutil.rmtree(venv_path)
-            else:
-                print(f"✅ Venv 已存在: {venv_path}")
-                return venv_path
-        
-        print(f"\n{'='*60}")
-        print(f"🔨 创建虚拟环境")
-        print(f"{'='*60}")
-        print(f"📂 路径: {venv_path}")
-        print(f"🐍 Python: {python_version}")
-        
-        cmd = ['uv', 'venv', str(venv_path), '--python', python_version]
-        print(f"💻 命令: {' '.join(cmd)}\n")
+        if self.venv_exists(venv_path) and not force:
+            print(f"✅ Venv 已存在: {venv_path}")
+            return venv_path
         
+        generation_path = self.generations.new_generation_path(venv_path.name)
         try:
-            subprocess.run(cmd, check=True)
-            print(f"\n✅ Venv 创建成功")
-            return venv_path
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"创建 venv 失败: {e}")
+            self._create_empty_venv(generation_path, python_version, prompt=venv_path.name)
+        except BaseException:
+            self.generations.discard(generation_path)
+            raise
+        
+        self.generations.activate(venv_path.name, generation_path)
+        self.generations.reclaim(venv_path.name)
+        return venv_path
     
-    def ensure_venv(self, project_name: str, python_version: str) -> Path:
+    def ensure_venv(self, project_name: str, python_version: str, template: Optional[str] = None) -> Path:
         """
         确保 venv 存在（不存在则创建）
         
         Args:
             project_name: 项目名称
             python_version: Python 版本
+            template: 模板项目名称（其 venv 存在时直接克隆，之后只需增量安装）
         
         Returns:
             venv 路径
@@ -109,18 +140,369 @@ class VenvManager:
         venv_path = self.get_venv_path(project_name, python_version)
         
         if not self.venv_exists(venv_path):
+            template_path = self._template_path(project_name, python_version, template)
+            if template_path:
+                self.build_venv(project_name, python_version, base=template_path)
+                return venv_path
             return self.create_venv(project_name, python_version)
         
         return venv_path
     
+    def _template_path(self, project_name: str, python_version: str, template: Optional[str]) -> Optional[Path]:
+        """模板 venv 路径（模板未配置或不存在时返回 None）"""
+        if not template or template == project_name:
+            return None
+        template_path = self.get_venv_path(template, python_version)
+        if self.venv_exists(template_path):
+            print(f"📋 使用模板 venv: {template_path.name}")
+            return template_path
+        print(f"⚠️  模板 venv 不存在，忽略: {template_path.name}")
+        return None
+    
+    def build_venv(
+        self,
+        project_name: str,
+        python_version: str,
+        yaml_config_file: Optional[str] = None,
+        mirror: Optional[str] = None,
+        force: bool = False,
+        base: Optional[Path] = None,
+        template: Optional[str] = None,
+        clone_mode: str = 'auto',
+        compile_bytecode: bool = True,
+        journal=None,
+        modify: Optional[Callable[[Path], Optional[Dict]]] = None,
+        relocatable: bool = True
+    ) -> Dict:
+        """
+        蓝绿构建 venv：在新一代目录中安装，成功后原子激活
+        
+        - 默认以当前代为基础克隆（硬链接/reflink），uv 只安装差异部分
+        - force 时从空 venv 开始全量安装（旧代不受影响，后台回收）
+        - 任一依赖组失败则丢弃新代，当前激活的 venv 保持不变
+        - 在 setup 中运行时（journal 不为 None），新代和已完成的依赖组记入断点续传日志：
+          中断或失败后保留新代，下次 setup 继续在其中安装未完成的组
+        - 构建期间持有 venv 租约（跨 Pod）；等待到的上一个持有者若以相同配置构建成功，直接复用其结果
+        - 不安装依赖、只改动 venv 的操作（deps prune / deps relocate）通过 modify 在克隆出的新一代上执行，
+          同样不影响正在使用当前代的进程
+        
+        Args:
+            project_name: 项目名称
+            python_version: Python 版本
+            yaml_config_file: dependencies.yaml 路径（None 表示只创建/克隆不安装）
+            mirror: PyPI 镜像源
+            force: 从空 venv 全量重建
+            base: 指定克隆来源 venv（默认当前代）
+            template: 当前代不存在时使用的模板项目
+            clone_mode: 克隆方式
+            compile_bytecode: 激活前并行预编译 .pyc
+            journal: setup 断点续传日志（SetupJournal）
+            modify: 创建/克隆新一代后对其执行的改动，返回值记入结果的 modified（抛出异常则丢弃新一代）
+            relocatable: 激活前把残留的绝对路径改为可重定位形式
+        
+        Returns:
+            安装结果（额外包含 activated / generation；复用其他进程的结果时 reused 为 True）
+        """
+        from src.leases import Lease, describe_holder
+        from src.setup_journal import config_fingerprint
+        
+        self._check_uv_installed()
+        
+        venv_name = self.get_venv_path(project_name, python_version).name
+        fingerprint = None
+        if yaml_config_file:
+            with open(yaml_config_file, 'r', encoding='utf-8') as f:
+                fingerprint = config_fingerprint(f.read(), python_version, mirror, force)
+        
+        # 同一 venv 同一时刻只有一个进程（可能在其他 Pod 上）构建
+        lease = Lease(str(self.volume_path), f'venv:{venv_name}')
+        started = time.time()
+        lease.acquire(on_wait=lambda holder: print(
+            f"\n⏳ {venv_name} 正在由 {describe_holder(holder)} 构建，等待其完成..."))
+        for stale in lease.recovered:
+            print(f"♻️  已回收失效的构建租约: {stale.get('holder') or '未知'}")
+        
+        outcome = None
+        try:
+            # 等待期间其他进程已按相同配置构建并激活，直接复用
+            previous = lease.last_result(since=started)
+            current = self.generations.current(venv_name)
+            if (fingerprint and previous and previous.get('fingerprint') == fingerprint
+                    and previous.get('activated') and current is not None
+                    and current.name == Path(previous.get('generation') or '').name):
+                print(f"✅ {previous['holder']} 刚完成相同配置的构建，直接复用: {current.name}")
+                emit('venv_reused', generation=current.name, holder=previous['holder'])
+                result = {k: previous.get(k) for k in REUSABLE_RESULT_FIELDS}
+                result.update(generation=str(current), reused=True)
+                return result
+            
+            result = self._build_venv(project_name, python_version, yaml_config_file, mirror, force, base,
+                                      template, clone_mode, compile_bytecode, journal, modify, relocatable)
+            outcome = {k: result.get(k) for k in REUSABLE_RESULT_FIELDS}
+            outcome['fingerprint'] = fingerprint
+            return result
+        finally:
+            lease.release(outcome)
+    
+    def _build_venv(self, project_name: str, python_version: str, yaml_config_file: Optional[str],
+                    mirror: Optional[str], force: bool, base: Optional[Path], template: Optional[str],
+                    clone_mode: str, compile_bytecode: bool, journal,
+                    modify: Optional[Callable[[Path], Optional[Dict]]] = None, relocatable: bool = True) -> Dict:
+        """持有构建租约时执行蓝绿构建（参数同 build_venv）"""
+        venv_path = self.get_venv_path(project_name, python_version)
+        venv_name = venv_path.name
+        
+        if base is None and not force:
+            base = self.generations.current(venv_name)
+            if base is None:
+                base = self._template_path(project_name, python_version, template)
+        
+        resumed = self._resume_generation(journal)
+        generation_path = resumed or self.generations.new_generation_path(venv_name)
+        if resumed:
+            print(f"\n♻️  继续构建上次未完成的新一代 venv: {generation_path.name}")
+        else:
+            print(f"\n🟢 构建新一代 venv: {generation_path.name}")
+        
+        try:
+            if not resumed:
+                step_start = time.time()
+                if force or base is None:
+                    if force:
+                        print(f"⚠️  强制模式：从空 venv 全量安装（当前 venv 不受影响）")
+                    self._create_empty_venv(generation_path, python_version, prompt=venv_name)
+                else:
+                    print(f"📋 基于 {base} 克隆")
+                    self.clone_venv(base, generation_path, mode=clone_mode, prompt=venv_name)
+                if journal:
+                    journal.record('venv:create', 'done', generation=str(generation_path),
+                                   seconds=round(time.time() - step_start, 3))
+            
+            modified = modify(generation_path) if modify else None
+            
+            if yaml_config_file:
+                dists_before = self._dist_names(generation_path)
+                install_start = time.time()
+                result = self.install_from_yaml(generation_path, yaml_config_file, mirror=mirror, journal=journal)
+                self._record_groups(project_name, python_version, result)
+                if not result['failed']:
+                    self._record_throughput(generation_path, dists_before, time.time() - install_start)
+            else:
+                result = {'total': 0, 'installed': 0, 'failed': 0, 'groups': {}}
+            if modify:
+                result['modified'] = modified
+            
+            if yaml_config_file and not result['failed']:
+                result['patched'] = self._patch_packages(generation_path, journal)
+            
+            if relocatable and not result['failed']:
+                result['relocated'] = self.make_relocatable(generation_path)
+            
+            if yaml_config_file and not result['failed']:
+                result['prune'] = self.prune_from_yaml(generation_path, yaml_config_file)
+            
+            if compile_bytecode and not result['failed']:
+                result['bytecode'] = self.compile_bytecode(generation_path)
+        except BaseException as e:
+            if journal and not isinstance(e, Exception):
+                # 被中断（Ctrl-C 等）：保留新代供下次 setup 续传
+                print(f"\n⏸️  已中断，保留未完成的新一代供续传: {generation_path.name}")
+                raise
+            print(f"\n🗑️  丢弃未完成的新一代: {generation_path.name}")
+            self.generations.discard(generation_path)
+            if journal:
+                journal.record('venv:create', 'failed', error=str(e))
+            raise
+        
+        result['generation'] = str(generation_path)
+        if result['failed']:
+            result['activated'] = False
+            if journal:
+                print(f"\n❌ 有依赖组安装失败，当前 venv 保持不变；新一代已保留，重新运行 setup 只重试失败的组")
+                return result
+            print(f"\n❌ 有依赖组安装失败，丢弃新一代，当前 venv 保持不变")
+            self.generations.discard(generation_path)
+            emit('venv_discarded', generation=generation_path.name, failed_groups=result['failed'])
+            return result
+        
+        activate_start = time.time()
+        self.generations.activate(venv_name, generation_path)
+        if journal:
+            journal.record('venv:activate', 'done', generation=str(generation_path),
+                           seconds=round(time.time() - activate_start, 3))
+        emit('venv_activated', generation=generation_path.name, venv=str(venv_path))
+        self._record_usage(venv_name, generation_path)
+        pid = self.generations.reclaim(venv_name)
+        print(f"\n🔄 已原子激活: {venv_path} -> {generation_path.name}")
+        if pid:
+            print(f"🧹 旧版本在后台回收中 (PID {pid})")
+        result['activated'] = True
+        return result
+    
+    @staticmethod
+    def _resume_generation(journal) -> Optional[Path]:
+        """setup 续传时上次创建、尚未激活且仍存在的新一代"""
+        if journal is None:
+            return None
+        if not journal.is_done('venv:activate') and journal.is_done('venv:create'):
+            generation = Path(journal.get('venv:create')['generation'])
+            if generation.exists():
+                return generation
+        # 没有可续传的新代（已激活、创建失败被丢弃或已被回收），之前完成的依赖组也随之作废
+        for step in [s for s in journal.steps if s.startswith(('deps:', 'post:'))]:
+            del journal.steps[step]
+        return None
+    
+    def clone_venv(
+        self,
+        source_path: Path,
+        target_path: Path,
+        mode: str = 'auto',
+        force: bool = False,
+        prompt: Optional[str] = None
+    ) -> Dict:
+        """
+        克隆 venv（reflink/hardlink 并行复制 + 修正绝对路径）
+        
+        克隆结果与源 venv 共享数据块/inode，后续 uv 安装只处理差异部分
+        
+        Args:
+            source_path: 源 venv 路径
+            target_path: 目标 venv 路径
+            mode: 克隆方式（auto/reflink/hardlink/copy）
+            force: 目标已存在时删除重建
+            prompt: venv 提示名（默认使用目标目录名）
+        
+        Returns:
+            克隆统计
+        """
+        from src.fs_utils import TreeCloner
+        from src.venv_paths import detect_venv_prefix, rewrite_venv_prefix, set_venv_prompt
+        
+        if not self.venv_exists(source_path):
+            raise RuntimeError(f"源 venv 不存在: {source_path}")
+        
+        if target_path.exists():
+            if not force:
+                raise RuntimeError(f"目标 venv 已存在: {target_path}（使用 --force 覆盖）")
+            print(f"🗑️  删除已存在的 venv: {target_path.name}")
+            shutil.rmtree(target_path)
+        
+        staging_path = target_path.with_name(f'{target_path.name}.cloning')
+        if staging_path.exists():
+            shutil.rmtree(staging_path)
+        
+        start = time.time()
+        cloner = TreeCloner(mode=mode)
+        try:
+            stats = cloner.clone_tree(source_path, staging_path)
+            old_prefix = detect_venv_prefix(source_path) or str(source_path)
+            stats['rewritten'] = rewrite_venv_prefix(staging_path, old_prefix, str(target_path))
+            set_venv_prompt(staging_path, prompt or target_path.name)
+            staging_path.rename(target_path)
+        except BaseException:
+            if staging_path.exists():
+                shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+        
+        stats['seconds'] = time.time() - start
+        methods = ', '.join(f"{k} {v}" for k, v in stats['methods'].items()) or '无文件'
+        print(f"✅ Venv 克隆完成: {stats['files']} 文件 ({methods}), "
+              f"修正路径 {stats['rewritten']} 个, 耗时 {stats['seconds']:.2f}s")
+        return stats
+    
+    def _group_install_cmd(
+        self,
+        python_bin: Path,
+        group: Dict,
+        mirror: Optional[str] = None,
+        force: bool = False
+    ) -> List[str]:
+        """构建单个依赖组的 uv 安装命令"""
+        cmd = ['uv', 'pip', 'install', '--python', str(python_bin)]
+        cmd.extend(group['packages'])
+        
+        if group.get('no_deps'):
+            cmd.append('--no-deps')
+        if group.get('index_url'):
+            cmd.extend(['--index-url', group['index_url']])
+        elif mirror:
+            cmd.extend(['--index-url', mirror])
+        if force:
+            cmd.append('--reinstall')
+        return cmd
+    
+    def _prefetch_group(self, install_cmd: List[str], constraints: Optional[List[str]] = None) -> Dict:
+        """
+        预取依赖组：解析并下载到 uv 缓存（不写入 venv，可与其他组并行）
+        
+        安装到临时 --target 目录并使用 symlink 链接模式，几乎不产生额外 I/O；
+        之后真正安装到 venv 时直接从缓存链接。预取失败不致命，安装阶段会给出真实错误
+        
+        Args:
+            install_cmd: 组的安装命令
+            constraints: 上游组已装入 venv 的版本（name==version），空 --target 中也按这些版本解析
+        """
+        start = time.time()
+        with tempfile.TemporaryDirectory(prefix='uv-prefetch-') as target:
+            cmd = install_cmd + ['--target', target, '--link-mode', 'symlink', '--quiet']
+            if constraints:
+                constraints_file = Path(target) / '.constraints.txt'
+                constraints_file.write_text('\n'.join(constraints) + '\n', encoding='utf-8')
+                cmd += ['--constraint', str(constraints_file)]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        error = None
+        if result.returncode != 0:
+            stderr = result.stderr.strip()
+            error = stderr.splitlines()[-1] if stderr else f"退出码 {result.returncode}"
+        return {'ok': result.returncode == 0, 'seconds': time.time() - start, 'error': error}
+    
+    def _installed_pins(self, python_bin: Path) -> List[str]:
+        """venv 中已安装包的 name==version（用作预取约束）"""
+        result = subprocess.run(['uv', 'pip', 'freeze', '--python', str(python_bin)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return []
+        return [line.strip() for line in result.stdout.splitlines() if '==' in line and not line.startswith('-')]
+    
+    @staticmethod
+    def _prefetchable_groups(order: List[str], after: Dict[str, List[str]], groups: Dict,
+                             mirror: Optional[str]) -> Set[str]:
+        """
+        可以预取的组：所有（传递）上游组与本组使用同一索引
+        
+        上游组来自专用索引（如 PyTorch cu128）时，下游组在空 --target 中会从默认索引
+        解析出另一套 torch/CUDA，白白下载数 GB，这类组不预取
+        """
+        def index(name):
+            return groups[name].get('index_url') or mirror
+        
+        upstream = {}
+        for name in order:  # 拓扑序，上游已计算
+            upstream[name] = set(after[name])
+            for dep in after[name]:
+                upstream[name] |= upstream[dep]
+        return {name for name in order if all(index(dep) == index(name) for dep in upstream[name])}
+    
     def install_from_yaml(
         self,
         venv_path: Path,
         yaml_config_file: str,
         mirror: Optional[str] = None,
-        force: bool = False
+        force: bool = False,
+        journal=None
     ) -> Dict:
-        """从 dependencies.yaml 安装依赖"""
+        """
+        从 dependencies.yaml 安装依赖
+        
+        各组按 after 声明构成 DAG：上游组都已装入 venv 的组即开始预取（解析/下载，
+        以上游已装版本为约束，可与其他组的安装并行），写入 venv 的安装步骤串行执行
+        （依赖组成功后才会安装后继组，同时就绪的组按 install_order 优先级，与预取完成先后无关）；
+        上游来自其他索引的组不预取；
+        setup 续传时跳过断点续传日志中已完成的组
+        """
+        from src.dependency_graph import build_group_graph
+        
         self._check_uv_installed()
         
         with open(yaml_config_file, 'r', encoding='utf-8') as f:
@@ -131,46 +513,327 @@ class VenvManager:
             raise RuntimeError(f"Venv Python 不存在: {python_bin}")
         
         groups = config.get('groups', {})
-        install_order = config.get('install_order', list(groups.keys()))
+        order, after = build_group_graph(config)
+        max_parallel = int(config.get('max_parallel', 4))
+        prefetch = config.get('prefetch', True) and len(order) > 1
         
         print(f"\n{'='*60}")
-        print(f"📦 安装依赖: {len(install_order)} 组")
+        print(f"📦 安装依赖: {len(order)} 组")
         print(f"{'='*60}")
+        for name in order:
+            deps = f" (after: {', '.join(after[name])})" if after[name] else ''
+            print(f"  - {name}{deps}")
+        emit('install_started', venv=str(venv_path), groups=order, total=len(order))
         
+        commands = {name: self._group_install_cmd(python_bin, groups[name], mirror, force) for name in order}
+        timings = {name: {'prefetch': 0.0, 'install': 0.0, 'wall': 0.0, 'bytes': None} for name in order}
         results = {}
-        for group_name in install_order:
-            group = groups.get(group_name)
-            if not group or not group.get('packages'):
-                continue
-            
-            cmd = ['uv', 'pip', 'install', '--python', str(python_bin)]
-            cmd.extend(group['packages'])
+        start = time.time()
+        
+        # 上次 setup 中已装入本代的组（只认记录的代目录与当前一致的步骤）
+        for name in order:
+            step = journal.get(f'deps:{name}') if journal else None
+            if (step and step.get('status') == 'done'
+                    and Path(step.get('generation') or '').name == Path(venv_path).name):
+                print(f"\n⏭️  {name}: 上次 setup 已完成，跳过")
+                results[name] = True
+                timings[name]['install'] = step.get('seconds') or 0.0
+                emit('group_finished', group=name, ok=True, exit_code=0, resumed=True,
+                     seconds=step.get('seconds'))
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as pool:
+            pending = [name for name in order if name not in results]
+            futures = {}
+            prefetchable = self._prefetchable_groups(order, after, groups, mirror) if prefetch else set()
+            if prefetch and len(pending) > 1:
+                skipped = [g for g in pending if g not in prefetchable]
+                print(f"\n⚡ 并行预取（解析 + 下载，并发 {max_parallel}，上游组装好后开始）"
+                      + (f"；上游来自其他索引、不预取: {', '.join(skipped)}" if skipped else ''))
+            else:
+                prefetchable = set()
             
-            if group.get('no_deps'):
-                cmd.append('--no-deps')
-            if group.get('index_url'):
-                cmd.extend(['--index-url', group['index_url']])
-            elif mirror:
-                cmd.extend(['--index-url', mirror])
-            if force:
-                cmd.append('--reinstall')
+            def submit_prefetches():
+                """为上游组已全部装入 venv 的组提交预取"""
+                pins = None
+                for g in pending:
+                    if g in prefetchable and g not in futures and all(results.get(d) for d in after[g]):
+                        if after[g] and pins is None:
+                            pins = self._installed_pins(python_bin)
+                        futures[g] = pool.submit(self._prefetch_group, commands[g], pins if after[g] else None)
             
-            print(f"\n📦 {group_name} ({len(group['packages'])} 包)")
-            result = subprocess.run(cmd, check=False)
-            results[group_name] = (result.returncode == 0)
+            while pending:
+                submit_prefetches()
+                # 跳过依赖组失败的组
+                for name in [g for g in pending if any(results.get(d) is False for d in after[g])]:
+                    failed_deps = [d for d in after[name] if results.get(d) is False]
+                    print(f"\n⏭️  {name}: 依赖组失败 ({', '.join(failed_deps)})，跳过")
+                    emit('group_skipped', group=name, reason=f"依赖组失败: {', '.join(failed_deps)}")
+                    results[name] = False
+                    pending.remove(name)
+                
+                ready = [g for g in pending if all(results.get(d) for d in after[g])]
+                if not ready:
+                    break
+                
+                # 同时就绪时按 install_order 优先级安装（等待其预取完成，其他组的预取在后台继续）
+                name = ready[0]
+                pending.remove(name)
+                if name in futures:
+                    info = futures[name].result()
+                    timings[name]['prefetch'] = info['seconds']
+                    if not info['ok']:
+                        print(f"\n⚠️  {name}: 预取失败（{info['error']}），直接安装")
+                
+                print(f"\n📦 {name} ({len(groups[name]['packages'])} 包)")
+                print(f"[PROGRESS] group={name} current={len(results)} total={len(order)}", flush=True)
+                emit('group_started', group=name, packages=len(groups[name]['packages']))
+                dists_before = self._dist_names(venv_path)
+                group_start = time.time()
+                result = subprocess.run(commands[name], check=False)
+                timings[name]['install'] = time.time() - group_start
+                timings[name]['wall'] = time.time() - start
+                results[name] = (result.returncode == 0)
+                if journal:
+                    journal.record(f'deps:{name}', 'done' if results[name] else 'failed',
+                                   seconds=round(timings[name]['install'], 3), exit_code=result.returncode,
+                                   generation=str(venv_path))
+                timings[name]['bytes'] = sum(self._dist_sizes(venv_path, exclude=dists_before).values())
+                emit('group_finished', group=name, ok=results[name], exit_code=result.returncode,
+                     seconds=round(timings[name]['install'], 3),
+                     prefetch_seconds=round(timings[name]['prefetch'], 3),
+                     bytes=timings[name]['bytes'])
         
         success = sum(1 for s in results.values() if s)
         print(f"\n{'='*60}")
-        print(f"✅ 完成: {success}/{len(results)} 组成功")
+        print(f"✅ 完成: {success}/{len(results)} 组成功 (总耗时 {time.time() - start:.1f}s)")
         print(f"{'='*60}")
+        print(f"  {'组':<20} {'预取':>8} {'安装':>8} {'完成于':>8}")
+        for name in order:
+            t = timings[name]
+            icon = "✅" if results.get(name) else "❌"
+            print(f"  {icon} {name:<18} {t['prefetch']:>7.1f}s {t['install']:>7.1f}s {t['wall']:>7.1f}s")
         
         return {
-            'total': sum(len(groups[g].get('packages', [])) for g in install_order if g in groups),
+            'total': sum(len(groups[g].get('packages', [])) for g in order),
             'installed': success,
             'failed': len(results) - success,
-            'groups': results
+            'groups': results,
+            'timings': timings
         }
     
+    def get_site_packages(self, venv_path: Path) -> Optional[Path]:
+        """venv 的 site-packages 目录"""
+        candidates = sorted(Path(venv_path).glob('lib/python*/site-packages'))
+        return candidates[0] if candidates else None
+    
+    def compile_bytecode(
+        self,
+        venv_path: Path,
+        workers: int = 0,
+        invalidation_mode: str = 'timestamp'
+    ) -> Dict:
+        """
+        并行预编译 site-packages 中的所有模块（使用 venv 自己的解释器）
+        
+        Serverless 冷启动时首次 import 会编译 .pyc，在只读/高延迟的网络 Volume 上
+        要么写不进缓存、要么每次冷启动都要付出数秒，因此安装后统一预编译
+        
+        Args:
+            venv_path: venv 路径
+            workers: 并发进程数（0 表示全部 CPU 核心）
+            invalidation_mode: .pyc 失效检查方式（timestamp/checked-hash/unchecked-hash）
+        
+        Returns:
+            {'py_files': n, 'pyc_before': n, 'pyc_after': n, 'compiled': n, 'errors': bool, 'seconds': t}
+        """
+        from src.fs_utils import walk_parallel
+        
+        python_bin = Path(venv_path) / 'bin' / 'python'
+        site_packages = self.get_site_packages(venv_path)
+        if not python_bin.exists() or site_packages is None:
+            raise RuntimeError(f"无效的 venv: {venv_path}")
+        
+        result = subprocess.run(
+            [str(python_bin), '-c', 'import sys; print(sys.implementation.cache_tag)'],
+            check=True, capture_output=True, text=True
+        )
+        cache_tag = result.stdout.strip()
+        
+        def count():
+            py_files = pyc_files = 0
+            for rel, kind, _ in walk_parallel(site_packages):
+                if kind != 'file':
+                    continue
+                if rel.endswith('.py'):
+                    py_files += 1
+                elif rel.endswith('.pyc') and f'.{cache_tag}.' in rel:
+                    pyc_files += 1
+            return py_files, pyc_files
+        
+        _, pyc_before = count()
+        
+        print(f"\n⚙️  预编译字节码: {site_packages} ({cache_tag}, {workers or os.cpu_count()} 进程)")
+        start = time.time()
+        cmd = [
+            str(python_bin), '-m', 'compileall', '-q',
+            '-j', str(workers),
+            '--invalidation-mode', invalidation_mode,
+            str(site_packages)
+        ]
+        # 个别包自带无法编译的文件（如 Python 2 语法的测试数据），只告警不失败
+        compile_result = subprocess.run(cmd, check=False)
+        seconds = time.time() - start
+        
+        py_files, pyc_after = count()
+        stats = {
+            'py_files': py_files,
+            'pyc_before': pyc_before,
+            'pyc_after': pyc_after,
+            'compiled': max(0, pyc_after - pyc_before),
+            'errors': compile_result.returncode != 0,
+            'seconds': seconds
+        }
+        print(f"✅ 字节码: 新编译 {stats['compiled']} 个, 共 {pyc_after}/{py_files} 个模块已缓存, 耗时 {seconds:.1f}s")
+        if stats['errors']:
+            print(f"⚠️  部分文件编译失败（见上方输出），不影响使用")
+        return stats
+    
+    def _dist_names(self, venv_path: Path) -> Set[str]:
+        """已安装分发包的 dist-info 目录名"""
+        site_packages = self.get_site_packages(venv_path)
+        if site_packages is None:
+            return set()
+        return {entry.name for entry in site_packages.glob('*.dist-info')}
+    
+    def _dist_sizes(self, venv_path: Path, exclude: Optional[Set[str]] = None) -> Dict[str, int]:
+        """已安装分发包的安装大小 {dist-info 目录名: 字节}（按 RECORD 统计，跳过 exclude 中的包）"""
+        sizes = {}
+        site_packages = self.get_site_packages(venv_path)
+        if site_packages is None:
+            return sizes
+        for dist_info in site_packages.glob('*.dist-info'):
+            if exclude and dist_info.name in exclude:
+                continue
+            total = 0
+            try:
+                with open(dist_info / 'RECORD', 'r', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        size = line.rstrip('\n').rsplit(',', 1)[-1]
+                        if size.isdigit():
+                            total += int(size)
+            except OSError:
+                continue
+            sizes[dist_info.name] = total
+        return sizes
+    
+    def _record_groups(self, project_name: str, python_version: str, result: Dict):
+        """把各依赖组的安装结果写入元数据库（一个事务）"""
+        from src.metadata_store import MetadataStore
+        
+        timings = result.get('timings', {})
+        groups = {
+            name: {'status': 'ok' if ok else 'failed',
+                   'seconds': round(timings.get(name, {}).get('install', 0.0), 3),
+                   'bytes': timings.get(name, {}).get('bytes')}
+            for name, ok in result.get('groups', {}).items()
+        }
+        if groups:
+            MetadataStore(str(self.volume_path)).record_groups(project_name, python_version, groups)
+    
+    def _record_usage(self, venv_name: str, generation_path: Path):
+        """统计新激活的 venv 大小写入磁盘占用缓存（status 直接读取）"""
+        from src.disk_usage import UsageCache
+        from src.fs_utils import format_size
+        
+        try:
+            usage = UsageCache(str(self.volume_path)).update_venv(venv_name, generation_path)
+        except OSError:
+            return
+        print(f"💾 venv 大小: {format_size(usage['bytes'])}（{usage['files']} 个文件）")
+    
+    def _record_throughput(self, venv_path: Path, dists_before: Set[str], seconds: float):
+        """记录本次安装的吞吐量（新装/升级的包的安装字节数 / 安装耗时），供 plan 估算时间"""
+        from src.throughput import ThroughputHistory
+        
+        installed_bytes = sum(self._dist_sizes(venv_path, exclude=dists_before).values())
+        try:
+            ThroughputHistory(str(self.volume_path)).record('deps', installed_bytes, seconds)
+        except OSError:
+            pass
+    
+    def _patch_packages(self, venv_path: Path, journal=None) -> Optional[bool]:
+        """
+        在新一代上修复 ModelScope 的版本检测（安装之后、预编译和激活之前）
+        
+        改写后同步更新 RECORD，.pyc 随后按新内容编译；setup 中记为 post:modelscope-patch，
+        续传时同一代中已完成则跳过
+        
+        Returns:
+            是否已处于修复状态（未安装 modelscope 时为 None）
+        """
+        from src.volume_manager import VolumeManager
+        
+        site_packages = self.get_site_packages(venv_path)
+        if site_packages is None or not (site_packages / 'modelscope').exists():
+            return None
+        step = journal.get('post:modelscope-patch') if journal else None
+        if (step and step.get('status') == 'done'
+                and Path(step.get('generation') or '').name == Path(venv_path).name):
+            return step.get('patched')
+        
+        start = time.time()
+        print(f"\n🛠️  后处理: 修复 ModelScope 版本检测...")
+        patched = VolumeManager(str(self.volume_path)).fix_modelscope_release_date(site_packages)
+        if journal:
+            journal.record('post:modelscope-patch', 'done', generation=str(venv_path),
+                           seconds=round(time.time() - start, 3), patched=patched)
+        return patched
+    
+    def make_relocatable(self, venv_path: Path) -> int:
+        """
+        把 venv 中残留的绝对路径改成与挂载点无关的形式
+        
+        uv --relocatable 创建的 venv 通常无需改写；旧 venv 或其他工具生成的脚本在这里统一处理。
+        解释器（pyvenv.cfg 的 home 和 bin/python*）改为 /runpod-volume/pythons/ 下的路径，
+        Pod 和 Serverless 上都能解析，不需要按挂载点改写
+        """
+        from src.python_manager import CANONICAL_VOLUME_PATH
+        from src.venv_paths import make_relocatable, retarget_interpreter
+        
+        count = make_relocatable(venv_path)
+        pythons_dir = self.pythons.canonical_pythons_dir()
+        if pythons_dir is not None:
+            count += retarget_interpreter(venv_path, pythons_dir)
+        else:
+            print(f"⚠️  {CANONICAL_VOLUME_PATH} 不可用（已被占用或无权限创建），"
+                  f"venv 的解释器路径仍绑定当前挂载点 {self.volume_path}")
+        if count:
+            print(f"📌 已转换为可重定位 venv: 改写 {count} 个文件")
+        return count
+    
+    def prune_from_yaml(self, venv_path: Path, yaml_config_file: str, dry_run: bool = False) -> Optional[Dict]:
+        """
+        按 dependencies.yaml 的 prune 配置裁剪 venv（未启用时返回 None）
+        """
+        from src.fs_utils import format_size
+        from src.venv_prune import load_prune_profile, prune_venv
+        
+        with open(yaml_config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        
+        profile = load_prune_profile(config)
+        if not profile:
+            return None
+        
+        print(f"\n✂️  裁剪 site-packages{'（预览）' if dry_run else ''}: {len(profile['patterns'])} 条规则")
+        start = time.time()
+        stats = prune_venv(venv_path, profile, dry_run=dry_run)
+        print(f"✅ 删除 {stats['files']} 个文件、{stats['dirs']} 个空目录，"
+              f"节省 {format_size(stats['bytes'])} / {stats['inodes']} 个 inode ({time.time() - start:.1f}s)")
+        if stats['dedupe']['files']:
+            print(f"🔗 重复共享库改为硬链接: {stats['dedupe']['files']} 个，节省 {format_size(stats['dedupe']['bytes'])}")
+        return stats
+    
     def list_packages(self, venv_path: Path) -> List[str]:
         """
         列出 venv 中已安装的包
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 镜像 - 把 venv 打包成单个 tar 镜像，冷启动时顺序读取后解压到本地盘
+
+网络 Volume 上逐个 stat/open 几万个小文件非常慢，而顺序读一个大文件很快：
+- 镜像: venvs/.images/<venv名>.tar[.zst|.lz4]
+- 索引: venvs/.images/<venv名>.index.json（来源代际、原始路径、成员列表；未压缩时含数据偏移）
+- 解压后按索引中的原始路径重写绝对路径，本地目录中的 .venv-image.json 记录镜像 ID，
+  镜像未变化时跳过解压
+
+注意：bin/python 指向的基础解释器不在镜像中，本地需要有相同路径的解释器
+"""
+import os
+import json
+import shutil
+import tarfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Optional
+
+from src.fs_utils import walk_parallel, reclaim_in_background
+from src.venv_paths import detect_venv_prefix, rewrite_venv_prefix
+
+IMAGES_DIRNAME = '.images'
+LOCAL_MARKER = '.venv-image.json'
+
+# 压缩方式 → (扩展名, 压缩命令, 解压命令)
+COMPRESSIONS = {
+    'none': ('.tar', None, None),
+    'zstd': ('.tar.zst', ['zstd', '-q', '-T0', '-3'], ['zstd', '-q', '-d', '-c']),
+    'lz4': ('.tar.lz4', ['lz4', '-q', '-1'], ['lz4', '-q', '-d', '-c']),
+}
+
+
+def resolve_compression(compression: str = 'auto') -> str:
+    """auto: 优先 zstd，其次 lz4，都没有时不压缩"""
+    if compression == 'auto':
+        for name in ('zstd', 'lz4'):
+            if shutil.which(COMPRESSIONS[name][1][0]):
+                return name
+        return 'none'
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}（可选: auto, {', '.join(COMPRESSIONS)}）")
+    if COMPRESSIONS[compression][1] and not shutil.which(COMPRESSIONS[compression][1][0]):
+        raise RuntimeError(f"未找到 {COMPRESSIONS[compression][1][0]} 命令")
+    return compression
+
+
+def image_paths(images_dir: Path, venv_name: str, compression: str):
+    """(镜像文件, 索引文件)"""
+    images_dir = Path(images_dir)
+    return images_dir / f'{venv_name}{COMPRESSIONS[compression][0]}', images_dir / f'{venv_name}.index.json'
+
+
+def load_image_index(images_dir: Path, venv_name: str) -> Optional[Dict]:
+    """读取镜像索引（镜像不存在时返回 None）"""
+    index_file = Path(images_dir) / f'{venv_name}.index.json'
+    if not index_file.exists():
+        return None
+    with open(index_file, 'r') as f:
+        index = json.load(f)
+    index['image_file'] = str(Path(images_dir) / index['image'])
+    return index
+
+
+def pack_venv(venv_path: Path, images_dir: Path, compression: str = 'auto') -> Dict:
+    """
+    把 venv 打包为单个镜像
+
+    Args:
+        venv_path: venv 路径（可以是代际 symlink，打包的是当前代际的内容）
+        images_dir: 镜像目录
+        compression: auto / none / zstd / lz4
+
+    Returns:
+        镜像索引
+    """
+    compression = resolve_compression(compression)
+    venv_path = Path(venv_path)
+    real_root = Path(os.path.realpath(venv_path))
+    venv_name = venv_path.name
+    images_dir = Path(images_dir)
+    images_dir.mkdir(parents=True, exist_ok=True)
+    image_file, index_file = image_paths(images_dir, venv_name, compression)
+
+    entries = sorted(walk_parallel(real_root), key=lambda e: e[0])
+    tmp_image = image_file.with_name(f'.{image_file.name}.tmp')
+    members = []
+
+    with open(tmp_image, 'wb') as out:
+        compressor = None
+        if COMPRESSIONS[compression][1]:
+            compressor = subprocess.Popen(COMPRESSIONS[compression][1], stdin=subprocess.PIPE, stdout=out)
+            tar = tarfile.open(fileobj=compressor.stdin, mode='w|', format=tarfile.PAX_FORMAT)
+        else:
+            tar = tarfile.open(fileobj=out, mode='w', format=tarfile.PAX_FORMAT)
+        try:
+            for rel, kind, _ in entries:
+                # 硬链接（如 dedupe 后的共享库）由 tarfile 按 inode 自动识别为链接成员
+                tar.add(str(real_root / rel), arcname=rel, recursive=False)
+                if kind != 'file':
+                    continue
+                info = tar.members[-1]
+                offset = None
+                if compressor is None and info.isreg():
+                    # 数据紧跟在成员头之后，按 512 字节块对齐
+                    offset = tar.offset - -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                members.append([rel, info.size, offset])
+            tar.close()
+        finally:
+            if compressor:
+                compressor.stdin.close()
+                if compressor.wait() != 0:
+                    tmp_image.unlink()
+                    raise RuntimeError(f"{compression} 压缩失败（退出码 {compressor.returncode}）")
+
+    os.replace(tmp_image, image_file)
+    # 换了压缩方式时清理旧镜像
+    for other, (suffix, _, _) in COMPRESSIONS.items():
+        if other != compression:
+            stale = images_dir / f'{venv_name}{suffix}'
+            if stale.exists():
+                stale.unlink()
+
+    index = {
+        'id': f'{real_root.name}@{datetime.now().strftime("%Y%m%d-%H%M%S")}',
+        'venv': venv_name,
+        'generation': real_root.name,
+        'prefix': detect_venv_prefix(venv_path) or str(venv_path),
+        'image': image_file.name,
+        'compression': compression,
+        'image_bytes': image_file.stat().st_size,
+        'files': len(members),
+        'entries': len(entries),
+        'bytes': sum(m[1] for m in members),
+        'created_at': datetime.now().isoformat(),
+        'members': members,
+    }
+    tmp_index = index_file.with_name(f'.{index_file.name}.tmp')
+    with open(tmp_index, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_index, index_file)
+    index['image_file'] = str(image_file)
+    return index
+
+
+def _extract(image_file: Path, compression: str, dest: Path):
+    """解压镜像到目录（优先用系统 tar，流式读取）"""
+    decompress_cmd = COMPRESSIONS[compression][2]
+    with open(image_file, 'rb') as src:
+        decompressor = None
+        stream = src
+        if decompress_cmd:
+            decompressor = subprocess.Popen(decompress_cmd, stdin=src, stdout=subprocess.PIPE)
+            stream = decompressor.stdout
+        try:
+            if shutil.which('tar'):
+                subprocess.run(['tar', '-x', '-f', '-', '-C', str(dest)], stdin=stream, check=True)
+            else:
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    tar.extractall(dest)
+        finally:
+            if decompressor:
+                decompressor.stdout.close()
+                if decompressor.wait() != 0:
+                    raise RuntimeError(f"{compression} 解压失败（退出码 {decompressor.returncode}）")
+
+
+def unpack_venv(index: Dict, dest: Path, force: bool = False) -> Dict:
+    """
+    把镜像解压到本地目录（供 Serverless 入口在启动时调用）
+
+    Args:
+        index: load_image_index() 的结果
+        dest: 本地 venv 路径（如 /tmp/venvs/py3.10-tts）
+        force: 镜像未变化时也重新解压
+
+    Returns:
+        {'skipped': bool, 'rewritten': 改写的文件数, 'path': 本地路径}
+    """
+    dest = Path(dest).absolute()
+    marker = dest / LOCAL_MARKER
+    if not force and marker.exists():
+        try:
+            with open(marker, 'r') as f:
+                if json.load(f).get('id') == index['id']:
+                    return {'skipped': True, 'rewritten': 0, 'path': str(dest)}
+        except (OSError, ValueError):
+            pass
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    staging = dest.with_name(f'.{dest.name}.unpacking-{os.getpid()}')
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+
+    try:
+        _extract(Path(index['image_file']), index['compression'], staging)
+        # 直接按最终路径改写，rename 后即可使用
+        rewritten = rewrite_venv_prefix(staging, index['prefix'], str(dest))
+        with open(staging / LOCAL_MARKER, 'w') as f:
+            json.dump({'id': index['id'], 'image': index['image_file'], 'prefix': index['prefix']}, f)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if dest.exists() or dest.is_symlink():
+        old = dest.with_name(f'.{dest.name}.old-{os.getpid()}')
+        os.rename(dest, old)
+        os.rename(staging, dest)
+        reclaim_in_background([old])
+    else:
+        os.rename(staging, dest)
+    return {'skipped': False, 'rewritten': rewritten, 'path': str(dest)}
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 路径修正 - 改写脚本/pyvenv.cfg/.pth 中写死的绝对路径，以及指向托管解释器的路径
+"""
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from src.fs_utils import default_workers
+
+# 超过该大小的文件不会是需要改写的文本脚本
+MAX_REWRITE_SIZE = 4 * 1024 * 1024
+
+
+def detect_venv_prefix(venv_path: Path) -> Optional[str]:
+    """
+    检测 venv 创建时写入的绝对路径
+
+    依次尝试 bin/activate 中的 VIRTUAL_ENV 和 bin/ 下脚本的 shebang
+
+    Returns:
+        绝对路径字符串，检测不到（或 venv 为可重定位格式）时返回 None
+    """
+    activate = venv_path / 'bin' / 'activate'
+    if activate.exists():
+        match = re.search(r"^\s*(?:export\s+)?VIRTUAL_ENV=['\"]?(/[^'\"\n]+?)['\"]?\s*$",
+                          activate.read_text(encoding='utf-8', errors='replace'), re.M)
+        if match:
+            return match.group(1).rstrip('/')
+
+    bin_dir = venv_path / 'bin'
+    if bin_dir.is_dir():
+        for script in sorted(bin_dir.iterdir()):
+            if script.is_symlink() or not script.is_file():
+                continue
+            try:
+                with open(script, 'rb') as f:
+                    first_line = f.readline(4096)
+            except OSError:
+                continue
+            match = re.match(rb'#!(/\S+)/bin/python[\d.]*\s*$', first_line)
+            if match:
+                return match.group(1).decode('utf-8', errors='replace')
+    return None
+
+
+def _rewrite_candidates(venv_path: Path) -> List[Path]:
+    """可能包含绝对路径的文件"""
+    candidates = []
+    cfg = venv_path / 'pyvenv.cfg'
+    if cfg.exists():
+        candidates.append(cfg)
+
+    bin_dir = venv_path / 'bin'
+    if bin_dir.is_dir():
+        for path in bin_dir.iterdir():
+            if not path.is_symlink() and path.is_file():
+                candidates.append(path)
+
+    for site_packages in venv_path.glob('lib/python*/site-packages'):
+        candidates.extend(site_packages.glob('*.pth'))
+        candidates.extend(site_packages.glob('*.egg-link'))
+    return candidates
+
+
+def _read_text_file(path: Path) -> Optional[bytes]:
+    """读取可能需要改写的文本文件（过大或二进制文件返回 None）"""
+    try:
+        if path.stat().st_size > MAX_REWRITE_SIZE:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if b'\0' in data[:8192]:
+        return None
+    return data
+
+
+def _replace_file(path: Path, data: bytes):
+    """写临时文件再 rename，不会影响硬链接的源文件"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _rewrite_file(path: Path, old: bytes, new: bytes) -> bool:
+    """改写单个文件中的旧路径"""
+    data = _read_text_file(path)
+    if data is None or old not in data:
+        return False
+    _replace_file(path, data.replace(old, new))
+    return True
+
+
+def rewrite_venv_prefix(
+    venv_path: Path,
+    old_prefix: str,
+    new_prefix: str,
+    workers: Optional[int] = None
+) -> int:
+    """
+    把 venv 中的旧绝对路径并行替换为新路径
+
+    Args:
+        venv_path: venv 目录（文件实际所在位置）
+        old_prefix: 旧的 venv 绝对路径
+        new_prefix: 新的 venv 绝对路径
+
+    Returns:
+        改写的文件数
+    """
+    old = old_prefix.rstrip('/').encode('utf-8')
+    new = new_prefix.rstrip('/').encode('utf-8')
+    if old == new:
+        return 0
+
+    candidates = _rewrite_candidates(Path(venv_path))
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+        return sum(pool.map(lambda p: _rewrite_file(p, old, new), candidates))
+
+
+# 与 uv --relocatable 生成的入口脚本相同：经 sh 跳板执行脚本所在目录下的解释器
+RELOCATABLE_SHEBANG = (
+    '#!/bin/sh\n'
+    '\'\'\'exec\' "$(dirname -- "$(realpath -- "$0")")"/\'{python}\' "$0" "$@"\n'
+    '\' \'\'\'\n'
+)
+
+# activate 脚本按自身位置计算 VIRTUAL_ENV（csh/nu/ps1 版本不处理）
+_RELOCATABLE_ACTIVATE = {
+    'activate': (
+        rb'^VIRTUAL_ENV=.*$',
+        b'VIRTUAL_ENV="$(cd "$(dirname -- "${BASH_SOURCE[0]:-$0}")/.." && pwd)"',
+    ),
+    'activate.fish': (
+        rb'^set -gx VIRTUAL_ENV .*$',
+        b'set -gx VIRTUAL_ENV (builtin realpath (dirname (status -f))/..)',
+    ),
+}
+
+
+def _make_file_relocatable(path: Path, prefix: str, site_packages: str) -> bool:
+    """
+    把单个文件改成不依赖 venv 绝对路径的形式
+
+    Args:
+        path: 文件路径
+        prefix: venv 创建时的绝对路径
+        site_packages: 创建时 site-packages 的绝对路径（.pth 相对路径的基准）
+    """
+    data = _read_text_file(path)
+    if data is None or prefix.encode('utf-8') not in data:
+        return False
+
+    new_data = data
+    if path.parent.name == 'bin' and path.name in _RELOCATABLE_ACTIVATE:
+        pattern, replacement = _RELOCATABLE_ACTIVATE[path.name]
+        new_data = re.sub(pattern, lambda _: replacement, data, count=1, flags=re.M)
+    elif path.parent.name == 'bin':
+        first_line, _, rest = data.partition(b'\n')
+        match = re.match(rb'#!' + re.escape(prefix.encode('utf-8')) + rb'/bin/(python[\d.]*)\s*$', first_line)
+        if match:
+            new_data = RELOCATABLE_SHEBANG.format(python=match.group(1).decode()).encode('utf-8') + rest
+    elif path.suffix == '.pth':
+        # .pth 中的相对路径按所在 site-packages 目录解析
+        lines = data.decode('utf-8', errors='surrogateescape').split('\n')
+        for i, line in enumerate(lines):
+            if line.startswith(prefix + '/'):
+                lines[i] = os.path.relpath(line, site_packages)
+        new_data = '\n'.join(lines).encode('utf-8', errors='surrogateescape')
+
+    if new_data == data:
+        return False
+    _replace_file(path, new_data)
+    return True
+
+
+def make_relocatable(venv_path: Path, prefix: Optional[str] = None, workers: Optional[int] = None) -> int:
+    """
+    把 venv 改成与挂载点无关的形式（与 uv venv --relocatable 的结果一致）
+
+    - bin/ 下 shebang 指向 venv 解释器的脚本改为 sh 跳板，按脚本自身位置找解释器
+    - activate / activate.fish 按脚本自身位置计算 VIRTUAL_ENV
+    - .pth 中指向 venv 内部的绝对路径改为相对 site-packages 的路径
+    - pyvenv.cfg 写入 relocatable = true，之后 uv 安装的入口脚本同样可重定位
+
+    Args:
+        venv_path: venv 目录
+        prefix: venv 创建时的绝对路径（默认自动检测）
+
+    Returns:
+        改写的文件数
+    """
+    venv_path = Path(venv_path)
+    count = 0
+
+    cfg = venv_path / 'pyvenv.cfg'
+    if cfg.exists():
+        content = cfg.read_text(encoding='utf-8')
+        if not re.search(r'^relocatable\s*=\s*true\s*$', content, re.M):
+            content = re.sub(r'^relocatable\s*=.*\n?', '', content, flags=re.M)
+            _replace_file(cfg, (content.rstrip('\n') + '\nrelocatable = true\n').encode('utf-8'))
+            count += 1
+
+    prefix = (prefix or detect_venv_prefix(venv_path) or '').rstrip('/')
+    if not prefix:
+        return count
+
+    def task(path: Path) -> bool:
+        site_packages = os.path.join(prefix, os.path.relpath(path.parent, venv_path))
+        return _make_file_relocatable(path, prefix, site_packages)
+
+    candidates = [p for p in _rewrite_candidates(venv_path) if p != cfg]
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+        count += sum(pool.map(task, candidates))
+    return count
+
+
+def _volume_interpreter_path(path: str, pythons_dir: Path) -> Optional[str]:
+    """把 pythons/ 中的解释器路径换成 pythons_dir 下的同一路径（不在 pythons/ 下或目标不存在时返回 None）"""
+    _, sep, tail = path.rpartition('/pythons/')
+    if not sep:
+        return None
+    new_path = str(pythons_dir / tail)
+    if new_path == path or not os.path.lexists(new_path):
+        return None
+    return new_path
+
+
+def retarget_interpreter(venv_path: Path, pythons_dir: Path) -> int:
+    """
+    把 venv 引用的托管解释器改为 pythons_dir 下的同一解释器
+
+    pyvenv.cfg 的 home 必须是绝对路径，uv venv 写入的是构建时挂载点下的路径
+    （如 /workspace/pythons/...）；改为与挂载点无关的 /runpod-volume/pythons/...
+    （python_manager.CANONICAL_VOLUME_PATH）后，同一个 venv 在任何挂载点和本地副本中都可直接使用
+
+    Args:
+        venv_path: venv 目录（文件实际所在位置）
+        pythons_dir: 解释器所在的 pythons/ 目录
+
+    Returns:
+        改写的文件数
+    """
+    venv_path = Path(venv_path)
+    pythons_dir = Path(pythons_dir)
+    count = 0
+
+    cfg = venv_path / 'pyvenv.cfg'
+    if cfg.exists():
+        content = cfg.read_text(encoding='utf-8')
+
+        def replace(match):
+            new_path = _volume_interpreter_path(match.group(2), pythons_dir)
+            return f'{match.group(1)}{new_path}' if new_path else match.group(0)
+
+        new_content = re.sub(r'^((?:home|executable|base-executable)\s*=\s*)(/.*?)\s*$',
+                             replace, content, flags=re.M)
+        if new_content != content:
+            _replace_file(cfg, new_content.encode('utf-8'))
+            count += 1
+
+    bin_dir = venv_path / 'bin'
+    for link in sorted(bin_dir.glob('python*')) if bin_dir.is_dir() else []:
+        if not link.is_symlink():
+            continue
+        new_target = _volume_interpreter_path(os.readlink(link), pythons_dir)
+        if new_target is None:
+            continue
+        tmp = link.with_name(f'.{link.name}.{os.getpid()}.tmp')
+        os.symlink(new_target, tmp)
+        os.replace(tmp, link)
+        count += 1
+    return count
+
+
+def set_venv_prompt(venv_path: Path, prompt: str):
+    """更新 pyvenv.cfg 中的 prompt（克隆后保持与目录名一致）"""
+    cfg = Path(venv_path) / 'pyvenv.cfg'
+    if not cfg.exists():
+        return
+    content = cfg.read_text(encoding='utf-8')
+    new_content, count = re.subn(r'^prompt\s*=.*$', f'prompt = {prompt}', content, flags=re.M)
+    if count and new_content != content:
+        tmp = cfg.with_name('.pyvenv.cfg.tmp')
+        tmp.write_text(new_content, encoding='utf-8')
+        os.replace(tmp, cfg)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 瘦身 - 按 dependencies.yaml 中的 prune 配置删除推理时用不到的文件
+
+配置示例（默认不启用）:
+
+    prune:
+      enabled: true
+      presets: [tests, docs, static_libs, dedupe_libs]
+      patterns:                       # 额外的 glob（相对 site-packages，支持 **）
+        - "**/benchmarks/**"
+      keep:                           # 命中后仍保留
+        - "torch/include/**"
+
+删除记录写入 venv 根目录的 .prune-manifest.json，
+随代际克隆一起传递，deps verify 据此忽略被删除的文件
+"""
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from src.fs_utils import walk_parallel
+
+MANIFEST_NAME = '.prune-manifest.json'
+
+PRESETS = {
+    # 包内测试套件
+    'tests': ['**/tests/**', '**/test/**'],
+    # 文档和示例
+    'docs': ['**/docs/**', '**/doc/**', '**/examples/**', '**/example/**'],
+    # C/C++/CUDA 头文件（运行时需要 JIT 编译扩展的项目不要启用）
+    'headers': ['*/include/**', '**/*.h', '**/*.hpp', '**/*.cuh'],
+    # 静态库，运行时只加载 .so
+    'static_libs': ['**/*.a'],
+}
+
+# 特殊预设：内容完全相同的共享库（常见于多个包各自打包同一份 CUDA 库）改为硬链接
+DEDUPE_PRESET = 'dedupe_libs'
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    """glob → 正则：* 不跨目录，** 跨任意层目录"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(f'^{regex}$')
+
+
+def load_prune_profile(config: Dict) -> Optional[Dict]:
+    """
+    从 dependencies.yaml 配置中读取 prune 配置
+
+    Returns:
+        {'patterns': [...], 'keep': [...], 'dedupe': bool}；未启用返回 None
+    """
+    prune = config.get('prune') or {}
+    if not prune.get('enabled'):
+        return None
+
+    patterns = list(prune.get('patterns') or [])
+    for preset in prune.get('presets') or []:
+        if preset == DEDUPE_PRESET:
+            continue
+        if preset not in PRESETS:
+            raise ValueError(f"未知的 prune 预设: {preset}（可选: {', '.join(list(PRESETS) + [DEDUPE_PRESET])}）")
+        patterns.extend(PRESETS[preset])
+
+    return {
+        'patterns': patterns,
+        'keep': list(prune.get('keep') or []),
+        'dedupe': DEDUPE_PRESET in (prune.get('presets') or []),
+    }
+
+
+def _site_packages(venv_path: Path) -> Path:
+    candidates = sorted(Path(venv_path).glob('lib/python*/site-packages'))
+    if not candidates:
+        raise RuntimeError(f"无效的 venv: {venv_path}")
+    return candidates[0]
+
+
+def load_prune_manifest(venv_path: Path) -> Dict:
+    """读取裁剪记录（不存在时返回空记录）"""
+    manifest_file = Path(venv_path) / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {'files': [], 'bytes': 0, 'inodes': 0}
+    with open(manifest_file, 'r') as f:
+        return json.load(f)
+
+
+def pruned_paths(venv_path: Path) -> Set[str]:
+    """被裁剪文件的真实绝对路径集合（供 deps verify 忽略）"""
+    manifest = load_prune_manifest(venv_path)
+    if not manifest['files']:
+        return set()
+    site_packages = os.path.realpath(_site_packages(venv_path))
+    return {os.path.normpath(os.path.join(site_packages, rel)) for rel in manifest['files']}
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dedupe_libraries(site_packages: Path, entries, dry_run: bool) -> Dict:
+    """把内容相同的 .so 文件替换为硬链接（同名同大小再比较哈希）"""
+    candidates = {}
+    for rel, kind, st in entries:
+        name = rel.rsplit('/', 1)[-1]
+        if kind == 'file' and ('.so' in name) and st.st_size > 1024 * 1024:
+            candidates.setdefault((name, st.st_size), []).append((rel, st))
+
+    saved = 0
+    linked = 0
+    for (_, size), files in candidates.items():
+        if len(files) < 2:
+            continue
+        by_digest = {}
+        for rel, st in files:
+            by_digest.setdefault(_file_digest(str(site_packages / rel)), []).append((rel, st))
+        for group in by_digest.values():
+            primary_rel, primary_st = group[0]
+            for rel, st in group[1:]:
+                if (st.st_dev, st.st_ino) == (primary_st.st_dev, primary_st.st_ino):
+                    continue
+                if not dry_run:
+                    target = site_packages / rel
+                    tmp = target.with_name(f'.{target.name}.dedupe')
+                    os.link(site_packages / primary_rel, tmp)
+                    os.replace(tmp, target)
+                saved += size
+                linked += 1
+    return {'bytes': saved, 'files': linked}
+
+
+def prune_venv(venv_path: Path, profile: Dict, dry_run: bool = False) -> Dict:
+    """
+    按配置裁剪 venv 的 site-packages
+
+    Args:
+        venv_path: venv 路径
+        profile: load_prune_profile() 的结果
+        dry_run: 只统计不删除
+
+    Returns:
+        {'files': 删除文件数, 'dirs': 删除空目录数, 'bytes': 释放字节, 'inodes': 释放 inode 数,
+         'dedupe': {'files': n, 'bytes': n}}
+    """
+    site_packages = _site_packages(venv_path)
+    remove_res = [_glob_to_regex(p) for p in profile['patterns']]
+    keep_res = [_glob_to_regex(p) for p in profile['keep']]
+
+    entries = walk_parallel(site_packages, with_stat=True)
+    removed = []
+    freed = 0
+    for rel, kind, st in entries:
+        if kind == 'dir' or rel.split('/', 1)[0].endswith('.dist-info'):
+            continue
+        if any(r.match(rel) for r in remove_res) and not any(r.match(rel) for r in keep_res):
+            removed.append(rel)
+            if kind == 'file':
+                freed += st.st_blocks * 512
+            if not dry_run:
+                os.unlink(site_packages / rel)
+
+    # 清理删除后留下的空目录（深层优先）
+    removed_dirs = 0
+    if removed:
+        touched = sorted({os.path.dirname(rel) for rel in removed}, key=lambda p: p.count('/'), reverse=True)
+        for rel_dir in touched:
+            while rel_dir:
+                path = site_packages / rel_dir
+                try:
+                    if dry_run or any(os.scandir(path)):
+                        break
+                    os.rmdir(path)
+                    removed_dirs += 1
+                except OSError:
+                    break
+                rel_dir = os.path.dirname(rel_dir)
+
+    dedupe = {'files': 0, 'bytes': 0}
+    if profile.get('dedupe'):
+        removed_set = set(removed)
+        dedupe = _dedupe_libraries(site_packages, [e for e in entries if e[0] not in removed_set], dry_run)
+
+    stats = {
+        'files': len(removed),
+        'dirs': removed_dirs,
+        'bytes': freed,
+        'inodes': len(removed) + removed_dirs,
+        'dedupe': dedupe,
+    }
+
+    if not dry_run and (removed or dedupe['files']):
+        manifest = load_prune_manifest(venv_path)
+        manifest['files'] = sorted(set(manifest['files']) | set(removed))
+        manifest['bytes'] = manifest.get('bytes', 0) + freed + dedupe['bytes']
+        manifest['inodes'] = manifest.get('inodes', 0) + stats['inodes']
+        manifest['pruned_at'] = datetime.now().isoformat()
+        manifest_file = Path(venv_path) / MANIFEST_NAME
+        tmp = manifest_file.with_name(f'{MANIFEST_NAME}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, manifest_file)
+
+    return stats
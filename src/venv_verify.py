@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Venv 完整性校验 - 按各分发包 RECORD 中记录的 sha256 和大小逐文件校验
+
+- 哈希计算在线程池中并行，并发数即 I/O 并发上限
+- 上次校验通过的文件在元数据库 files 表中记录 (size, mtime_ns, inode) 签名，签名不变则跳过哈希
+"""
+import os
+import csv
+import base64
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.metadata_store import MetadataStore
+
+
+def _record_hash(path: str) -> str:
+    """RECORD 格式的 sha256（urlsafe base64，无填充）"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return base64.urlsafe_b64encode(h.digest()).rstrip(b'=').decode('ascii')
+
+
+def iter_record_entries(site_packages: Path):
+    """
+    遍历所有分发包的 RECORD 条目
+
+    Yields:
+        (分发包名, 版本, 文件绝对路径, 算法, 哈希, 大小)
+    """
+    for dist_info in sorted(site_packages.glob('*.dist-info')):
+        record = dist_info / 'RECORD'
+        if not record.exists():
+            continue
+        name, _, version = dist_info.name[:-len('.dist-info')].rpartition('-')
+        with open(record, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or not row[1]:
+                    continue  # RECORD 自身、安装时生成的 .pyc 等没有哈希
+                algorithm, _, digest = row[1].partition('=')
+                size = int(row[2]) if row[2] else None
+                path = os.path.normpath(os.path.join(site_packages, row[0]))
+                yield name, version, path, algorithm, digest, size
+
+
+class VenvVerifier:
+    """基于 RECORD 的 venv 完整性校验器"""
+
+    def __init__(self, volume_path: str, jobs: int = 16, use_cache: bool = True):
+        """
+        初始化
+
+        Args:
+            volume_path: Volume 根目录
+            jobs: 并发校验数（I/O 并发上限）
+            use_cache: 是否复用上次校验的 stat 签名
+        """
+        self.volume_path = volume_path
+        self.jobs = max(1, jobs)
+        self.use_cache = use_cache
+
+    def _load_cache(self, venv_path: Path) -> Dict[str, List[int]]:
+        if not self.use_cache:
+            return {}
+        return MetadataStore(self.volume_path).load_file_signatures(Path(venv_path).name)
+
+    def _save_cache(self, venv_path: Path, cache: Dict[str, List[int]]):
+        MetadataStore(self.volume_path).save_file_signatures(Path(venv_path).name, cache)
+
+    @staticmethod
+    def _check_file(path: str, algorithm: str, digest: str, size: Optional[int],
+                    cached: Optional[List[int]]) -> Tuple[str, Optional[List[int]], bool]:
+        """
+        校验单个文件
+
+        Returns:
+            (状态, stat 签名, 是否命中缓存)，状态为 ok / missing / size / hash
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 'missing', None, False
+        signature = [st.st_size, st.st_mtime_ns, st.st_ino]
+        if size is not None and st.st_size != size:
+            return 'size', None, False
+        if cached == signature:
+            return 'ok', signature, True
+        if algorithm != 'sha256':
+            return 'ok', signature, False
+        try:
+            actual = _record_hash(path)
+        except OSError:
+            return 'missing', None, False
+        return ('ok' if actual == digest else 'hash'), signature, False
+
+    def verify(self, venv_path: Path, ignore: Optional[set] = None) -> Dict:
+        """
+        校验 venv
+
+        Args:
+            venv_path: venv 路径
+            ignore: 缺失时忽略的文件绝对路径集合（被裁剪掉的文件）
+
+        Returns:
+            {'distributions': n, 'files': n, 'hashed': n, 'cached': n,
+             'broken': {(name, version): [(path, reason), ...]}}
+        """
+        venv_path = Path(venv_path)
+        site_packages_list = sorted(venv_path.glob('lib/python*/site-packages'))
+        if not site_packages_list:
+            raise RuntimeError(f"无效的 venv: {venv_path}")
+        site_packages = site_packages_list[0]
+
+        # 以真实路径作为缓存键的基准，venv 是 symlink（代际管理）时也能命中
+        real_root = os.path.realpath(venv_path)
+        site_packages_real = Path(os.path.realpath(site_packages))
+
+        # 被裁剪的文件若已被重新安装回来，仍正常校验
+        ignore = ignore or set()
+        entries = [e for e in iter_record_entries(site_packages_real)
+                   if e[2] not in ignore or os.path.lexists(e[2])]
+        cache = self._load_cache(venv_path)
+
+        # bin/ 下的入口脚本在克隆/重定位时会改写 shebang，只校验存在性
+        bin_prefix = os.path.join(real_root, 'bin') + os.sep
+
+        def task(entry):
+            name, version, path, algorithm, digest, size = entry
+            key = os.path.relpath(path, real_root)
+            if path.startswith(bin_prefix):
+                return entry, key, (('ok', None, False) if os.path.lexists(path) else ('missing', None, False))
+            return entry, key, self._check_file(path, algorithm, digest, size, cache.get(key))
+
+        broken = {}
+        new_cache = {}
+        hashed = cached_hits = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for entry, key, (status, signature, hit) in pool.map(task, entries):
+                name, version, path = entry[:3]
+                if status == 'ok':
+                    if signature:
+                        new_cache[key] = signature
+                    cached_hits += hit
+                    hashed += not hit
+                else:
+                    broken.setdefault((name, version), []).append((path, status))
+
+        self._save_cache(venv_path, new_cache)
+        return {
+            'distributions': len({(e[0], e[1]) for e in entries}),
+            'files': len(entries),
+            'hashed': hashed,
+            'cached': cached_hits,
+            'broken': broken,
+        }
@@ -5,14 +5,14 @@ RunPod Volume 增量管理器
 支持依赖和模型的增量安装/更新
 """
 import os
-import json
 import hashlib
 import subprocess
 import shutil
 import glob
 from pathlib import Path
 from typing import Dict, List, Optional, Set
-from datetime import datetime
+
+from src.metadata_store import MetadataStore
 
 
 class VolumeManager:
@@ -28,76 +28,10 @@ class VolumeManager:
         self.volume_path = Path(volume_path)
         self.metadata_dir = self.volume_path / '.metadata'
         self.metadata_dir.mkdir(exist_ok=True)
+        # 项目、模型和依赖组记录（SQLite，首次打开时迁移旧的 <项目>.json）
+        self.store = MetadataStore(str(self.volume_path))
     
-    def _get_project_metadata_file(self, project_name: str, python_version: Optional[str] = None) -> Path:
-        """
-        获取项目元数据文件路径
-        
-        Args:
-            project_name: 项目名称
-            python_version: Python 版本（如 '3.10'），不指定则返回旧格式兼容
-        """
-        if python_version:
-            return self.metadata_dir / f'{project_name}-py{python_version}.json'
-        return self.metadata_dir / f'{project_name}.json'
-    
-    def _load_metadata(self, project_name: str, python_version: Optional[str] = None) -> Dict:
-        """
-        加载项目元数据（兼容旧格式）
-        
-        Args:
-            project_name: 项目名称
-            python_version: Python 版本（如 '3.10'）
-        """
-        # 先尝试读取新格式（带 Python 版本）
-        metadata_file = self._get_project_metadata_file(project_name, python_version)
-        if metadata_file.exists():
-            with open(metadata_file, 'r') as f:
-                return json.load(f)
-        
-        # 如果新格式不存在，尝试读取旧格式并迁移
-        if python_version:
-            old_metadata_file = self._get_project_metadata_file(project_name, None)
-            if old_metadata_file.exists():
-                print(f"   📋 检测到旧格式元数据，正在迁移...")
-                with open(old_metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                
-                # 添加 Python 版本信息
-                metadata['python_version'] = python_version
-                
-                # 保存为新格式
-                self._save_metadata(project_name, metadata, python_version)
-                print(f"   ✅ 元数据已迁移到新格式: {metadata_file.name}")
-                
-                return metadata
-        
-        # 都不存在，返回空元数据
-        return {
-            'project': project_name,
-            'python_version': python_version,
-            'dependencies': {},
-            'models': {},
-            'last_updated': None
-        }
-    
-    def _save_metadata(self, project_name: str, metadata: Dict, python_version: Optional[str] = None):
-        """
-        保存项目元数据
-        
-        Args:
-            project_name: 项目名称
-            metadata: 元数据字典
-            python_version: Python 版本（如 '3.10'）
-        """
-        metadata_file = self._get_project_metadata_file(project_name, python_version)
-        metadata['last_updated'] = datetime.now().isoformat()
-        if python_version:
-            metadata['python_version'] = python_version
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
-    
-    def _fix_modelscope_release_date(self, deps_dir: Path):
+    def fix_modelscope_release_date(self, deps_dir: Path) -> bool:
         """
         修复 ModelScope 版本日期（标准方法）
         
@@ -108,12 +42,15 @@ class VolumeManager:
         - 避免 Python 3.10/3.11 环境下的 type_params AttributeError
         
         Args:
-            deps_dir: 依赖安装目录
+            deps_dir: 依赖安装目录（或 venv 的 site-packages）
+        
+        Returns:
+            modelscope 是否已处于修复状态（未安装 modelscope 时为 False）
         """
         version_file = deps_dir / 'modelscope' / 'version.py'
         
         if not version_file.exists():
-            return
+            return False
         
         try:
             import re
@@ -123,6 +60,7 @@ class VolumeManager:
             # 检查是否已修改
             if '# PATCHED' in content:
                 print(f"   ℹ️  ModelScope 版本已修复")
+                self._update_record(deps_dir, 'modelscope', 'modelscope/version.py')
                 # 即使已修复，也检查并删除 AST 缓存
                 ast_cache = self.volume_path / 'models' / 'ast_indexer'
                 if ast_cache.exists():
@@ -135,7 +73,7 @@ class VolumeManager:
                         print(f"   ✅ AST 缓存已删除")
                     except Exception as e:
                         print(f"   ⚠️  删除缓存失败: {e}")
-                return
+                return True
             
             # 修改发布日期为过去的日期
             pattern = r"__release_datetime__\s*=\s*['\"].*?['\"]"
@@ -143,7 +81,13 @@ class VolumeManager:
             new_content = re.sub(pattern, replacement, content)
             
             if new_content != content:
-                version_file.write_text(new_content, encoding='utf-8')
+                # 写临时文件后原子替换：中途被打断也不会留下半截的 version.py，
+                # 也不会改到与其他 venv 代硬链接共享的同一个文件
+                tmp_file = version_file.with_name(version_file.name + '.tmp')
+                tmp_file.write_text(new_content, encoding='utf-8')
+                shutil.copymode(version_file, tmp_file)
+                os.replace(tmp_file, version_file)
+                self._update_record(deps_dir, 'modelscope', 'modelscope/version.py')
                 print(f"   ✅ ModelScope 已标记为正式版本（跳过 AST 扫描）")
                 print(f"   ℹ️  原理：发布日期在过去 → 正式版本 → 跳过 AST 扫描")
                 
@@ -159,11 +103,42 @@ class VolumeManager:
                         print(f"   ✅ AST 缓存已删除")
                     except Exception as e:
                         print(f"   ⚠️  删除缓存失败: {e}")
+                return True
             else:
                 print(f"   ⚠️  未找到 __release_datetime__ 或格式变化")
         
         except Exception as e:
             print(f"   ⚠️  修复 ModelScope 版本时出错: {e}")
+        return False
+    
+    @staticmethod
+    def _update_record(deps_dir: Path, dist_name: str, rel_path: str):
+        """
+        改写已安装的文件后同步更新分发包 RECORD 中的 sha256 和大小（deps verify 按 RECORD 校验）
+        
+        同样写临时文件后原子替换，不影响与其他 venv 代硬链接共享的 RECORD
+        """
+        import io
+        import csv
+        import base64
+        
+        data = (deps_dir / rel_path).read_bytes()
+        digest = 'sha256=' + base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode('ascii')
+        for record in deps_dir.glob(f'{dist_name}-*.dist-info/RECORD'):
+            with open(record, 'r', encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+            changed = False
+            for row in rows:
+                if len(row) >= 3 and row[0] == rel_path and row[1:3] != [digest, str(len(data))]:
+                    row[1:3] = [digest, str(len(data))]
+                    changed = True
+            if not changed:
+                continue
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator='\n').writerows(rows)
+            tmp_file = record.with_name(record.name + '.tmp')
+            tmp_file.write_text(buffer.getvalue(), encoding='utf-8')
+            os.replace(tmp_file, record)
     
     def install_dependencies(
         self,
@@ -307,51 +282,28 @@ class VolumeManager:
             result['installed'] = len(to_install)
             result['skipped'] = result['total'] - result['installed']
             
-            # 替换原目录（跳过删除，直接重命名覆盖）
+            # 替换原目录：rename 切换，旧版本交给后台低优先级进程删除
             print(f"\n🔄 替换依赖目录...")
             
             if deps_path.exists():
-                import time
+                from src.fs_utils import reclaim_in_background
                 
-                # 处理旧备份（如果存在） - 前台执行
-                deps_path_backup = deps_path.parent / f'{project_name}_old'
-                if deps_path_backup.exists():
-                    print(f"   - 删除旧备份: {deps_path_backup.name}")
-                    sys.stdout.flush()
-                    start = time.time()
-                    
-                    try:
-                        shutil.rmtree(deps_path_backup)
-                        print(f"     ✓ 完成 ({time.time() - start:.2f}s)")
-                    except Exception as e:
-                        print(f"     ⚠️  删除失败: {e}")
-                    sys.stdout.flush()
+                deps_path_backup = deps_path.parent / f'{project_name}_old-{int(time.time())}'
                 
                 # 重命名当前目录为备份
                 print(f"   - 重命名当前目录: {deps_path.name} -> {deps_path_backup.name}")
-                sys.stdout.flush()
                 deps_path.rename(deps_path_backup)
                 print(f"     ✓ 完成")
-                sys.stdout.flush()
                 
                 # 激活新目录
                 print(f"   - 激活新目录: {deps_path_temp.name} -> {deps_path.name}")
-                sys.stdout.flush()
                 deps_path_temp.rename(deps_path)
                 print(f"     ✓ 完成")
-                sys.stdout.flush()
-                
-                # 前台删除旧备份
-                print(f"   - 删除旧版本: {deps_path_backup.name} (可能需要一段时间...)")
-                sys.stdout.flush()
-                start = time.time()
                 
-                try:
-                    shutil.rmtree(deps_path_backup)
-                    elapsed = time.time() - start
-                    print(f"     ✓ 完成 ({elapsed:.2f}s)")
-                except Exception as e:
-                    print(f"     ⚠️  删除失败: {e}")
+                # 后台删除旧版本（包括以前残留的备份），不阻塞安装流程
+                stale = list(deps_path.parent.glob(f'{project_name}_old*'))
+                pid = reclaim_in_background(stale)
+                print(f"   - 旧版本后台删除中: {len(stale)} 个目录 (PID {pid})")
                 sys.stdout.flush()
             else:
                 # 直接重命名
@@ -363,7 +315,7 @@ class VolumeManager:
             # 安装完成后自动修复 ModelScope
             if (deps_path / 'modelscope').exists():
                 print(f"\n🛠️  后处理: 修复 ModelScope 版本检测...")
-                self._fix_modelscope_release_date(deps_path)
+                self.fix_modelscope_release_date(deps_path)
             
         except Exception as e:
             # 安装失败，清理临时目录
@@ -384,10 +336,10 @@ class VolumeManager:
             model_dir = models_path / 'hub' / model_id
             return model_dir.exists()
         elif source == 'huggingface':
-            # HuggingFace 模型路径格式
+            # HuggingFace 缓存格式：models--org--name（与下载器一致）
             model_parts = model_id.split('/')
             if len(model_parts) == 2:
-                model_dir = models_path / 'models--' / f'{model_parts[0]}--{model_parts[1]}'
+                model_dir = models_path / f'models--{model_parts[0]}--{model_parts[1]}'
             else:
                 model_dir = models_path / model_id
             return model_dir.exists()
@@ -402,18 +354,12 @@ class VolumeManager:
         size: Optional[int] = None
     ):
         """注册已下载的模型"""
-        metadata = self._load_metadata(project_name)
-        
-        if 'models' not in metadata:
-            metadata['models'] = {}
-        
-        metadata['models'][model_id] = {
-            'source': source,
-            'installed_at': datetime.now().isoformat(),
-            'size': size
-        }
-        
-        self._save_metadata(project_name, metadata)
+        self.store.register_models(project_name, [(model_id, source, size)])
+    
+    def register_models(self, project_name: str, models: List[tuple]):
+        """批量注册模型（一个事务）: [(model_id, source, size), ...]"""
+        if models:
+            self.store.register_models(project_name, models)
     
     def check_models_changed(
         self,
@@ -429,8 +375,7 @@ class VolumeManager:
             - added: 新增的模型 [(model_id, source), ...]
             - removed: 移除的模型 [model_id, ...]
         """
-        metadata = self._load_metadata(project_name)
-        old_models = set(metadata.get('models', {}).keys())
+        old_models = set(self.store.get_models(project_name))
         
         # 展开新模型列表
         new_models_flat = []
@@ -447,29 +392,20 @@ class VolumeManager:
         return changed, added, removed
     
     def get_project_stats(self, project_name: str) -> Dict:
-        """获取项目统计信息"""
-        metadata = self._load_metadata(project_name)
-        deps_path = self.volume_path / 'python-deps' / project_name
-        
-        stats = {
-            'project': project_name,
-            'dependencies_count': len(metadata.get('dependencies', {})),
-            'models_count': len(metadata.get('models', {})),
-            'last_updated': metadata.get('last_updated'),
-        }
-        
-        # 跳过目录大小计算（太慢）
-        # 如果需要查看大小，手动运行 du -sh 命令
-        
+        """获取项目统计信息（大小来自磁盘占用缓存，不遍历目录）"""
+        from src.disk_usage import UsageCache
+        from src.fs_utils import format_size
+        
+        stats = self.store.project_stats(project_name)
+        usage = UsageCache(str(self.volume_path), self.store).project_usage(project_name)
+        stats.update(usage)
+        if usage['venvs']:
+            stats['dependencies_size'] = format_size(usage['venvs_bytes'])
         return stats
     
     def list_projects(self) -> List[Dict]:
         """列出所有项目"""
-        projects = []
-        for metadata_file in self.metadata_dir.glob('*.json'):
-            project_name = metadata_file.stem
-            projects.append(self.get_project_stats(project_name))
-        return projects
+        return [self.get_project_stats(name) for name in self.store.project_names()]
     
     def install_dependencies_from_config(
         self,
@@ -493,26 +429,13 @@ class VolumeManager:
         Returns:
             安装结果统计
         """
-        # 委托给 VenvManager
+        # 委托给 VenvManager（蓝绿构建，成功后原子激活）
         from src.venv_manager import VenvManager
         
         venv_mgr = VenvManager(self.volume_path)
-        venv_path = venv_mgr.ensure_venv(project_name, python_version)
-        
-        return venv_mgr.install_from_yaml(
-            venv_path,
-            config_file,
-            mirror=mirror,
-            force=force
-        )
-        # 委托给 VenvManager
-        from src.venv_manager import VenvManager
-        
-        venv_mgr = VenvManager(self.volume_path)
-        venv_path = venv_mgr.ensure_venv(project_name, python_version)
-        
-        return venv_mgr.install_from_yaml(
-            venv_path,
+        return venv_mgr.build_venv(
+            project_name,
+            python_version,
             config_file,
             mirror=mirror,
             force=force
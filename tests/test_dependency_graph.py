@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试依赖组 DAG 的构建与排序
+"""
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dependency_graph import build_group_graph
+
+
+def _config(groups, install_order=None):
+    return {
+        'groups': {name: dict(packages=['pkg'], **extra) for name, extra in groups.items()},
+        'install_order': install_order or list(groups),
+    }
+
+
+def test_without_after_is_serial_in_install_order():
+    order, after = build_group_graph(_config({'a': {}, 'b': {}, 'c': {}}, ['c', 'a', 'b']))
+    assert order == ['c', 'a', 'b']
+    assert after == {'c': [], 'a': ['c'], 'b': ['a']}
+
+
+def test_after_dependencies_come_first():
+    order, after = build_group_graph(_config(
+        {'late': {'after': ['base']}, 'base': {}, 'free': {}},
+        ['late', 'base', 'free'],
+    ))
+    assert order == ['base', 'late', 'free']
+    assert after == {'late': ['base'], 'base': [], 'free': []}
+
+
+def test_after_accepts_single_name():
+    _, after = build_group_graph(_config({'a': {}, 'b': {'after': 'a'}}))
+    assert after['b'] == ['a']
+
+
+def test_groups_without_packages_are_skipped():
+    config = _config({'a': {}, 'b': {}})
+    config['groups']['empty'] = {'packages': []}
+    config['install_order'].append('empty')
+    order, _ = build_group_graph(config)
+    assert order == ['a', 'b']
+
+
+def test_after_unknown_group_raises():
+    with pytest.raises(ValueError):
+        build_group_graph(_config({'a': {'after': ['missing']}}))
+
+
+def test_cycle_raises():
+    with pytest.raises(ValueError):
+        build_group_graph(_config({'a': {'after': ['b']}, 'b': {'after': ['a']}}))
+
+
+def test_tts_platform_specific_installs_last():
+    config_file = Path(__file__).parent.parent / 'src' / 'projects' / 'tts' / 'dependencies.yaml'
+    order, after = build_group_graph(yaml.safe_load(config_file.read_text(encoding='utf-8')))
+    assert order == ['pytorch', 'standard', 'platform_specific']
+    assert after['platform_specific'] == ['standard']
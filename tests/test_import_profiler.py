@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 -X importtime 输出的解析、按包汇总和回归对比
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.import_profiler import ImportProfiler, aggregate_by_package, parse_importtime
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:        10 |         10 |     pkg.sub.leaf
+import time:        20 |         30 |   pkg.sub
+import time:         5 |          5 |   other
+import time:        40 |         75 | pkg
+import time:         7 |          7 | json
+Traceback (most recent call last):
+"""
+
+
+def test_parse_builds_tree_from_postorder_output():
+    tree = parse_importtime(SAMPLE)
+    assert [node['name'] for node in tree] == ['pkg', 'json']
+    pkg = tree[0]
+    assert (pkg['self_us'], pkg['cumulative_us']) == (40, 75)
+    assert [child['name'] for child in pkg['children']] == ['pkg.sub', 'other']
+    assert [leaf['name'] for leaf in pkg['children'][0]['children']] == ['pkg.sub.leaf']
+    assert tree[1]['children'] == []
+
+
+def test_aggregate_by_package():
+    packages = aggregate_by_package(parse_importtime(SAMPLE))
+    assert packages['pkg'] == {'self_us': 70, 'cumulative_us': 75, 'modules': 3}
+    # 由其他包拉入的包也计入自己的累计耗时
+    assert packages['other'] == {'self_us': 5, 'cumulative_us': 5, 'modules': 1}
+    assert packages['json'] == {'self_us': 7, 'cumulative_us': 7, 'modules': 1}
+
+
+def test_parse_real_interpreter_output():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import json'],
+                            capture_output=True, text=True, check=True)
+    packages = aggregate_by_package(parse_importtime(result.stderr))
+    assert 'json' in packages or 'encodings' in packages
+
+
+def test_compare_flags_regressions_over_both_thresholds():
+    previous = {'total_us': 300_000, 'distributions': ['a-1.0', 'b-1.0'],
+                'packages': {'a': {'cumulative_us': 100_000}, 'b': {'cumulative_us': 100_000}}}
+    current = {'total_us': 400_000, 'distributions': ['a-1.0', 'c-1.0'],
+               'packages': {'a': {'cumulative_us': 200_000}, 'b': {'cumulative_us': 130_000},
+                            'c': {'cumulative_us': 500_000}}}
+    diff = ImportProfiler.compare(previous, current)
+    assert [r['package'] for r in diff['regressions']] == ['a']
+    assert diff['regressions'][0]['delta_us'] == 100_000
+    assert diff['added'] == ['c-1.0']
+    assert diff['removed'] == ['b-1.0']
+    assert diff['total_delta_us'] == 100_000
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务队列的冲突键推断、取任务顺序与冲突判断、失联任务回收
+"""
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.job_queue import JobQueue, START_GRACE_SECONDS, default_conflict_keys
+
+
+@pytest.mark.parametrize('argv, expected', [
+    (['deps', 'install', '--project', 'tts'], ['venv:tts']),
+    (['deps', 'install', '--project=tts', '--mirror', 'x'], ['venv:tts']),
+    (['deps', 'clone', '--from', 'tts', '--to', 'asr'], ['venv:asr']),
+    (['models', 'download', '--project', 'tts'], ['models:tts']),
+    (['setup', '--project', 'tts'], ['venv:tts', 'models:tts']),
+    (['clean', '--project', 'tts', '--all', '--yes'], ['venv:tts', 'models:tts']),
+    (['deps', 'install'], []),
+    (['deps', 'list', '--project', 'tts'], []),
+    (['scripts/upload_models.py', '--project', 'tts'], []),
+])
+def test_default_conflict_keys(argv, expected):
+    assert default_conflict_keys(argv) == expected
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path))
+
+
+def test_claim_by_priority_then_submission(queue):
+    first = queue.submit(['deps', 'install', '--project', 'a'])
+    urgent = queue.submit(['deps', 'install', '--project', 'b'], priority=5)
+    second = queue.submit(['deps', 'install', '--project', 'c'])
+
+    claimed = [queue.claim('worker-1')['job_id'] for _ in range(3)]
+    assert claimed == [urgent['job_id'], first['job_id'], second['job_id']]
+    assert queue.claim('worker-1') is None
+
+    job = queue.get(first['job_id'])
+    assert job['status'] == 'running'
+    assert job['worker'] == 'worker-1'
+    assert job['host'] == socket.gethostname()
+
+
+def test_claim_skips_conflicting_jobs(queue):
+    setup = queue.submit(['setup', '--project', 'tts'])
+    models = queue.submit(['models', 'download', '--project', 'tts'], priority=1)
+    other = queue.submit(['deps', 'install', '--project', 'asr'])
+
+    assert queue.claim('w')['job_id'] == models['job_id']
+    # setup 占用的 models:tts 正在运行，跳过它取下一个
+    assert queue.claim('w')['job_id'] == other['job_id']
+    assert queue.claim('w') is None
+
+    queue.update(models['job_id'], status='completed')
+    assert queue.claim('w')['job_id'] == setup['job_id']
+
+
+def test_explicit_conflict_keys(queue):
+    queue.submit(['scripts/upload_models.py'], conflict_keys=['s3'])
+    blocked = queue.submit(['scripts/upload_models.py', '--force'], conflict_keys=['s3'])
+    assert queue.claim('w') is not None
+    assert queue.claim('w') is None
+    assert queue.get(blocked['job_id'])['status'] == 'queued'
+
+
+def test_cancel_queued_job(queue):
+    job = queue.submit(['deps', 'install', '--project', 'tts'])
+    assert queue.cancel(job['job_id']) == 'cancelled'
+    assert queue.claim('w') is None
+
+
+def test_cancel_running_job_requests_stop(queue):
+    job = queue.submit(['deps', 'install', '--project', 'tts'])
+    queue.claim('w')
+    assert queue.cancel(job['job_id']) == 'running'
+    assert queue.get(job['job_id'])['cancel_requested'] is True
+
+
+def test_orphaned_job_is_recovered_from_lease_result(queue):
+    job = queue.submit(['deps', 'install', '--project', 'tts'])
+    queue.claim('other-pod:1')
+    started = time.time() - START_GRACE_SECONDS - 10
+    queue.update(job['job_id'], started_ts=started, host='other-pod')
+
+    # 运行器已结束并通过任务租约发布了退出码
+    lease = queue._job_lease(job['job_id'])
+    lease.acquire()
+    lease.release({'exit_code': 0})
+    result = lease.last_result()
+    result['finished_at'] = started + 1
+    lease.result_path.write_text(json.dumps(result))
+
+    blocked = queue.submit(['deps', 'install', '--project', 'tts'])
+    claimed = queue.claim('w')
+    assert claimed['job_id'] == blocked['job_id']
+    recovered = queue.get(job['job_id'])
+    assert recovered['status'] == 'completed'
+    assert recovered['orphaned'] is True
+    assert not lease.result_path.exists()
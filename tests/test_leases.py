@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试跨 Pod 租约：互斥、失效回收和结果发布
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import leases
+from src.leases import Lease
+
+
+def _write_lease(lease: Lease, **fields):
+    record = {'key': lease.key, 'holder': 'other-pod:1234', 'token': 'stale-token',
+              'acquired_at': time.time(), 'heartbeat': time.time(), 'ttl': lease.ttl}
+    record.update(fields)
+    lease.path.write_text(json.dumps(record))
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_acquire_and_release(tmp_path):
+    lease = Lease(str(tmp_path), 'venv:py3.10-tts', ttl=5, poll_interval=0.05)
+    assert lease.acquire() is False
+    assert lease.current()['token'] == lease.token
+
+    other = Lease(str(tmp_path), 'venv:py3.10-tts', ttl=5, poll_interval=0.05)
+    with pytest.raises(TimeoutError):
+        other.acquire(timeout=0.2)
+
+    lease.release()
+    assert not lease.path.exists()
+    assert other.current() is None
+    with other:
+        assert other.current()['holder'] == other.holder
+
+
+def test_recovers_lease_with_expired_heartbeat(tmp_path):
+    lease = Lease(str(tmp_path), 'model:modelscope:org/name', ttl=5, poll_interval=0.05)
+    _write_lease(lease, heartbeat=time.time() - 60)
+    assert lease.current() is None
+
+    lease.acquire(timeout=1)
+    try:
+        assert [r['token'] for r in lease.recovered] == ['stale-token']
+        assert lease.current()['token'] == lease.token
+    finally:
+        lease.release()
+
+
+def test_recovers_lease_of_exited_local_process(tmp_path):
+    lease = Lease(str(tmp_path), 'job:1', ttl=60, poll_interval=0.05)
+    _write_lease(lease, holder=f'{socket.gethostname()}:{_dead_pid()}')
+
+    lease.acquire(timeout=1)
+    try:
+        assert len(lease.recovered) == 1
+    finally:
+        lease.release()
+
+
+def test_live_remote_holder_is_not_recovered(tmp_path):
+    lease = Lease(str(tmp_path), 'job:2', ttl=60, poll_interval=0.05)
+    _write_lease(lease)
+    with pytest.raises(TimeoutError):
+        lease.acquire(timeout=0.2)
+    assert json.loads(lease.path.read_text())['token'] == 'stale-token'
+
+
+def test_break_keeps_lease_replaced_by_new_holder(tmp_path):
+    lease = Lease(str(tmp_path), 'job:3', ttl=5)
+    stale = {'token': 'old-token', 'heartbeat': time.time() - 60}
+    _write_lease(lease, token='new-token')
+    assert lease._break(stale) is False
+    assert lease.path.exists()
+    assert not lease.path.with_suffix('.break').exists()
+
+
+def test_abandoned_break_marker_is_cleared(tmp_path, monkeypatch):
+    monkeypatch.setattr(leases, 'BREAK_TTL', 0.1)
+    lease = Lease(str(tmp_path), 'job:4', ttl=5, poll_interval=0.05)
+    _write_lease(lease, heartbeat=time.time() - 60)
+    marker = lease.path.with_suffix('.break')
+    marker.touch()
+    old = time.time() - 10
+    os.utime(marker, (old, old))
+
+    lease.acquire(timeout=2)
+    try:
+        assert len(lease.recovered) == 1
+    finally:
+        lease.release()
+
+
+def test_unreadable_lease_counts_as_held(tmp_path):
+    lease = Lease(str(tmp_path), 'job:5', ttl=5, poll_interval=0.05)
+    lease.path.mkdir()  # open() 抛出 IsADirectoryError，模拟网络卷上的暂时性错误
+    record = lease.current()
+    assert record is not None and record.get('unreadable')
+    with pytest.raises(TimeoutError):
+        lease.acquire(timeout=0.2)
+
+
+def test_release_publishes_result(tmp_path):
+    lease = Lease(str(tmp_path), 'venv:py3.11-asr', ttl=5)
+    started = time.time()
+    lease.acquire()
+    lease.release({'activated': True, 'fingerprint': 'abc'})
+
+    waiter = Lease(str(tmp_path), 'venv:py3.11-asr', ttl=5)
+    result = waiter.last_result(since=started)
+    assert result['fingerprint'] == 'abc' and result['holder'] == lease.holder
+    assert waiter.last_result(since=time.time() + 1) is None
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试本地盘缓存的增量同步（文件、目录与符号链接之间的替换）和模型路径
+"""
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.local_cache import LocalCache, model_dir
+
+
+def test_model_dir_layout(tmp_path):
+    assert model_dir(tmp_path, 'iic/speech', 'modelscope') == tmp_path / 'hub' / 'iic' / 'speech'
+    assert model_dir(tmp_path, 'org/name', 'huggingface') == tmp_path / 'models--org--name'
+    assert model_dir(tmp_path, 'name', 'huggingface') == tmp_path / 'name'
+
+
+def test_incremental_sync(tmp_path):
+    source = tmp_path / 'source'
+    (source / 'pkg').mkdir(parents=True)
+    (source / 'pkg' / 'a.py').write_text('a')
+    (source / 'pkg' / 'b.py').write_text('b')
+    cache = LocalCache(str(tmp_path / 'cache'))
+
+    stats = cache.sync('venvs/v', source)
+    assert (stats['copied'], stats['skipped']) == (2, 0)
+    dest = Path(stats['path'])
+    assert (dest / 'pkg' / 'a.py').read_text() == 'a'
+
+    (source / 'pkg' / 'b.py').unlink()
+    (source / 'pkg' / 'c.py').write_text('c')
+    stats = cache.sync('venvs/v', source)
+    assert (stats['copied'], stats['skipped'], stats['removed']) == (1, 1, 1)
+    assert sorted(p.name for p in (dest / 'pkg').iterdir()) == ['a.py', 'c.py']
+
+
+def test_directory_replaced_by_symlink(tmp_path):
+    source = tmp_path / 'source'
+    (source / 'lib').mkdir(parents=True)
+    (source / 'lib' / 'libx.so').write_text('x')
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    (shared / 'libx.so').write_text('shared')
+    cache = LocalCache(str(tmp_path / 'cache'))
+    dest = Path(cache.sync('venvs/v', source)['path'])
+
+    # 目录换成指向其他位置的符号链接：本地目录整个替换，链接目标中的同名文件不受影响
+    (source / 'lib' / 'libx.so').unlink()
+    (source / 'lib').rmdir()
+    os.symlink(shared, source / 'lib')
+    cache.sync('venvs/v', source)
+    assert (dest / 'lib').is_symlink()
+    assert (shared / 'libx.so').read_text() == 'shared'
+
+    # 再换回目录：先去掉链接，不经由链接写入
+    (source / 'lib').unlink()
+    (source / 'lib').mkdir()
+    (source / 'lib' / 'liby.so').write_text('y')
+    cache.sync('venvs/v', source)
+    assert not (dest / 'lib').is_symlink()
+    assert (dest / 'lib' / 'liby.so').read_text() == 'y'
+    assert not (shared / 'liby.so').exists()
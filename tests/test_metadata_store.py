@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试元数据库首次打开时从旧 JSON 元数据迁移
+"""
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.metadata_store import SCHEMA_VERSION, MetadataStore
+
+
+def _write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+@pytest.fixture
+def legacy_volume(tmp_path):
+    metadata_dir = tmp_path / '.metadata'
+    _write_json(metadata_dir / 'tts.json', {
+        'last_updated': '2025-01-02T00:00:00',
+        'models': {'iic/speech': {'source': 'modelscope', 'size': 100, 'installed_at': '2025-01-01T00:00:00'}},
+        'dependencies': {'torch': {'version': '2.1.0'}},
+    })
+    # 带 Python 版本后缀的旧文件，同一模型以较新的记录为准
+    _write_json(metadata_dir / 'tts-py3.10.json', {
+        'project': 'tts-py3.10',
+        'python_version': '3.10',
+        'last_updated': '2025-01-03T00:00:00',
+        'models': {'iic/speech': {'source': 'modelscope', 'size': None, 'installed_at': '2025-01-03T00:00:00'}},
+    })
+    _write_json(metadata_dir / 'throughput.json', {
+        'pip': [{'bytes': 1000, 'seconds': 2.0, 'at': '2025-01-01T00:00:00'}, 'broken'],
+    })
+    _write_json(metadata_dir / 'not-a-project.json', ['x'])
+    _write_json(metadata_dir / 'tasks' / 'deps_install_1.json', {
+        'task_id': 'deps_install_1', 'command': 'deps install --project tts', 'status': 'completed',
+        'pid': 123, 'log_file': '/tmp/log', 'started_at': '2025-01-01T00:00:00',
+    })
+    _write_json(metadata_dir / 'tasks' / '.index.json', {})
+    _write_json(metadata_dir / 'verify_cache' / 'py3.10-tts.json', {'lib/a.py': [1, 2, 3], 'bad': [1]})
+    return tmp_path
+
+
+def test_migrates_legacy_json(legacy_volume):
+    store = MetadataStore(str(legacy_volume))
+    metadata_dir = legacy_volume / '.metadata'
+
+    assert store.project_names() == ['tts']
+    assert store.get_models('tts') == {
+        'iic/speech': {'source': 'modelscope', 'size': 100, 'installed_at': '2025-01-03T00:00:00'}}
+    assert store.project_stats('tts') == {
+        'project': 'tts', 'dependencies_count': 1, 'models_count': 1, 'last_updated': '2025-01-03T00:00:00'}
+    assert [t['task_id'] for t in store.list_tasks()] == ['deps_install_1']
+    assert store.load_file_signatures('py3.10-tts') == {'lib/a.py': [1, 2, 3]}
+    assert store.throughput_samples('pip') == [{'bytes': 1000, 'seconds': 2.0, 'recorded_at': '2025-01-01T00:00:00'}]
+
+    # 项目元数据保留备份，可重建的索引和缓存删除，无关文件不动
+    assert sorted(p.name for p in metadata_dir.glob('*.migrated')) == [
+        'throughput.json.migrated', 'tts-py3.10.json.migrated', 'tts.json.migrated']
+    assert (metadata_dir / 'not-a-project.json').exists()
+    assert not (metadata_dir / 'tasks' / '.index.json').exists()
+    assert not (metadata_dir / 'verify_cache').exists()
+    assert (metadata_dir / 'tasks' / 'deps_install_1.json').exists()
+    store.close()
+
+    # 再次打开不会重复导入
+    _write_json(metadata_dir / 'tts.json', {'last_updated': '2030-01-01T00:00:00', 'models': {'new/model': {}}})
+    store = MetadataStore(str(legacy_volume))
+    assert list(store.get_models('tts')) == ['iic/speech']
+    store.close()
+
+
+def test_upgrade_from_version_2_imports_throughput_only(tmp_path):
+    MetadataStore(str(tmp_path)).close()
+    db_path = tmp_path / '.metadata' / 'metadata.db'
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE meta SET value = '2' WHERE key = 'schema_version'")
+    conn.commit()
+    conn.close()
+
+    metadata_dir = tmp_path / '.metadata'
+    _write_json(metadata_dir / 'throughput.json', {'hf': [{'bytes': 5, 'seconds': 1.0, 'at': 't'}]})
+    _write_json(metadata_dir / 'tts.json', {'last_updated': 't', 'models': {'org/model': {}}})
+
+    store = MetadataStore(str(tmp_path))
+    assert store.throughput_samples('hf') == [{'bytes': 5, 'seconds': 1.0, 'recorded_at': 't'}]
+    assert store.get_models('tts') == {}
+    assert (metadata_dir / 'tts.json').exists()
+    version = store.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()[0]
+    assert int(version) == SCHEMA_VERSION
+    store.close()
+
+
+def test_record_throughput_keeps_latest(tmp_path):
+    store = MetadataStore(str(tmp_path))
+    for i in range(5):
+        store.record_throughput('pip', i, 1.0, keep=3)
+    assert [s['bytes'] for s in store.throughput_samples('pip')] == [2, 3, 4]
+    store.close()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 setup 断点续传日志：按配置指纹续传、重新开始和截断行的处理
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.setup_journal import SetupJournal, config_fingerprint
+
+
+def _interrupted_run(path: Path, fingerprint: str) -> SetupJournal:
+    journal = SetupJournal(str(path))
+    assert journal.begin(fingerprint) is False
+    journal.record('venv:create', 'done', generation='/v/g1')
+    journal.record('deps:pytorch', 'done', generation='/v/g1')
+    journal.record('deps:standard', 'failed', generation='/v/g1')
+    return journal
+
+
+def test_fingerprint_is_stable_and_order_sensitive():
+    assert config_fingerprint('yaml', '3.10') == config_fingerprint('yaml', '3.10')
+    assert config_fingerprint('yaml', '3.10') != config_fingerprint('3.10', 'yaml')
+    assert config_fingerprint({'a': 1, 'b': 2}) == config_fingerprint({'b': 2, 'a': 1})
+
+
+def test_resume_with_same_fingerprint(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    _interrupted_run(path, 'fp1')
+
+    journal = SetupJournal(str(path))
+    assert journal.begin('fp1') is True
+    assert journal.is_done('venv:create')
+    assert journal.is_done('deps:pytorch')
+    assert not journal.is_done('deps:standard')
+    assert journal.get('venv:create')['generation'] == '/v/g1'
+
+
+def test_changed_fingerprint_starts_new_run(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    _interrupted_run(path, 'fp1')
+
+    journal = SetupJournal(str(path))
+    assert journal.begin('fp2') is False
+    assert journal.steps == {}
+    # 新 run 只保留本次记录
+    assert SetupJournal(str(path)).fingerprint == 'fp2'
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+
+def test_restart_ignores_unfinished_run(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    _interrupted_run(path, 'fp1')
+
+    journal = SetupJournal(str(path))
+    assert journal.begin('fp1', restart=True) is False
+    assert not journal.is_done('venv:create')
+
+
+def test_successful_run_is_not_resumed(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    journal = _interrupted_run(path, 'fp1')
+    journal.finish(ok=True)
+
+    assert SetupJournal(str(path)).begin('fp1') is False
+
+
+def test_failed_run_is_resumed(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    journal = _interrupted_run(path, 'fp1')
+    journal.finish(ok=False)
+
+    journal = SetupJournal(str(path))
+    assert journal.begin('fp1') is True
+    assert journal.is_done('deps:pytorch')
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / 'tts.jsonl'
+    _interrupted_run(path, 'fp1')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"ts": 1, "run": "x", "step": "deps:sta')
+
+    journal = SetupJournal(str(path))
+    assert journal.begin('fp1') is True
+    assert journal.is_done('deps:pytorch')
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试后台任务事件流的写入和按偏移增量读取
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.task_events import EVENTS_ENV, emit, read_events
+
+
+def test_emit_without_env_is_noop(tmp_path, monkeypatch):
+    monkeypatch.delenv(EVENTS_ENV, raising=False)
+    emit('group_started', group='a')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_read_events_incrementally(tmp_path, monkeypatch):
+    path = tmp_path / 'task.events.jsonl'
+    monkeypatch.setenv(EVENTS_ENV, str(path))
+
+    emit('install_started', total=2)
+    emit('group_started', group='pytorch')
+    events, offset = read_events(str(path))
+    assert [e['event'] for e in events] == ['install_started', 'group_started']
+    assert events[1]['group'] == 'pytorch'
+    assert offset == path.stat().st_size
+
+    # 没有新内容时偏移不变
+    assert read_events(str(path), offset) == ([], offset)
+
+    emit('group_finished', group='pytorch', ok=True)
+    events, offset = read_events(str(path), offset)
+    assert [e['event'] for e in events] == ['group_finished']
+    assert offset == path.stat().st_size
+
+
+def test_partial_line_is_left_for_next_read(tmp_path):
+    path = tmp_path / 'task.events.jsonl'
+    path.write_bytes(b'{"event": "a"}\n{"event": "b", "gro')
+
+    events, offset = read_events(str(path))
+    assert [e['event'] for e in events] == ['a']
+    assert offset == len(b'{"event": "a"}\n')
+
+    with open(path, 'ab') as f:
+        f.write(b'up": "x"}\n')
+    events, offset = read_events(str(path), offset)
+    assert events == [{'event': 'b', 'group': 'x'}]
+    assert offset == path.stat().st_size
+
+
+def test_invalid_lines_are_skipped(tmp_path):
+    path = tmp_path / 'task.events.jsonl'
+    path.write_bytes(b'not json\n{"event": "a"}\n')
+    events, offset = read_events(str(path))
+    assert events == [{'event': 'a'}]
+    assert offset == path.stat().st_size
+
+
+def test_missing_file_keeps_offset(tmp_path):
+    assert read_events(str(tmp_path / 'missing.jsonl'), 42) == ([], 42)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试后台任务调度参数的解析，以及只在控制器已委派时使用 cgroup 权重
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import task_priority
+from src.task_priority import (POLITE, apply_scheduling, build_scheduling, describe_scheduling,
+                               parse_cpu_list, release_cgroup)
+
+
+def _args(**kwargs):
+    defaults = {'polite': False, 'nice': None, 'ionice': None, 'cpus': None, 'cpu_weight': None, 'io_weight': None}
+    defaults.update(kwargs)
+    return argparse.Namespace(**defaults)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('0', [0]),
+    ('0-3', [0, 1, 2, 3]),
+    ('0-2,6', [0, 1, 2, 6]),
+    (' 4 , 1-2 ,', [1, 2, 4]),
+    ('3,3,2-3', [2, 3]),
+])
+def test_parse_cpu_list(text, expected):
+    assert parse_cpu_list(text) == expected
+
+
+@pytest.mark.parametrize('text', ['', ',', 'a', '1-', '-2', '1-b', '0x1', '3-1', '0,3-1'])
+def test_parse_cpu_list_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_cpu_list(text)
+
+
+def test_build_scheduling():
+    assert build_scheduling(_args()) is None
+    assert build_scheduling(_args(polite=True)) == POLITE
+    assert build_scheduling(_args(polite=True, nice=5, cpus='0-1')) == dict(POLITE, nice=5, cpus=[0, 1])
+    assert build_scheduling(_args(ionice='best-effort:7', io_weight=10000)) == {
+        'ionice': 'best-effort:7', 'io_weight': 10000}
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'nice': 20},
+    {'nice': -1},
+    {'ionice': 'fast'},
+    {'ionice': 'best-effort:8'},
+    {'ionice': 'realtime:x'},
+    {'cpu_weight': 0},
+    {'io_weight': 10001},
+])
+def test_build_scheduling_rejects_invalid(kwargs):
+    with pytest.raises(ValueError):
+        build_scheduling(_args(**kwargs))
+
+
+def test_describe_scheduling():
+    assert describe_scheduling({'nice': 10, 'cpus': [0, 2], 'cpu_weight': 20}) == 'nice=10 CPU=0,2 cpu.weight=20'
+
+
+def _fake_cgroup(tmp_path, monkeypatch, subtree_control: str) -> Path:
+    parent = tmp_path / 'cgroup'
+    parent.mkdir()
+    (parent / 'cgroup.subtree_control').write_text(subtree_control)
+    (parent / 'cgroup.procs').write_text('')
+    monkeypatch.setattr(task_priority, '_cgroup2_dir', lambda: parent)
+    return parent
+
+
+def test_weights_skipped_when_controllers_not_delegated(tmp_path, monkeypatch):
+    parent = _fake_cgroup(tmp_path, monkeypatch, 'memory\n')
+    result = apply_scheduling({'cpu_weight': 20, 'io_weight': 20}, 'task1')
+
+    assert result['applied'] == {}
+    assert 'cpu' in result['errors']['cpu_weight'] and 'io' in result['errors']['io_weight']
+    # 不创建子 cgroup，也不改动父 cgroup
+    assert sorted(p.name for p in parent.iterdir()) == ['cgroup.procs', 'cgroup.subtree_control']
+    assert (parent / 'cgroup.subtree_control').read_text() == 'memory\n'
+
+
+def test_weights_applied_in_delegated_cgroup(tmp_path, monkeypatch):
+    parent = _fake_cgroup(tmp_path, monkeypatch, 'cpu memory\n')
+    (parent / 'runpod-task-old').mkdir()
+
+    result = apply_scheduling({'cpu_weight': 20, 'io_weight': 30}, 'task2')
+    group = parent / 'runpod-task-task2'
+    assert result['applied'] == {'cgroup': str(group), 'cgroup_parent': str(parent), 'cpu_weight': 20}
+    assert 'io' in result['errors']['io_weight']
+    assert (group / 'cgroup.procs').read_text() == str(os.getpid())
+    assert (group / 'cpu.weight').read_text() == '20'
+    assert not (parent / 'runpod-task-old').exists()
+
+    release_cgroup(result)
+    assert (parent / 'cgroup.procs').read_text() == str(os.getpid())
+
+
+def test_no_cgroup_v2(monkeypatch):
+    monkeypatch.setattr(task_priority, '_cgroup2_dir', lambda: None)
+    result = apply_scheduling({'io_weight': 20}, 'task3')
+    assert result == {'applied': {}, 'errors': {'io_weight': '未挂载 cgroup v2'}}
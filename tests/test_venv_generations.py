@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 venv 代际回收：只有激活过的旧代占用保留名额
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import venv_generations
+from src.venv_generations import VenvGenerations
+
+VENV = 'py3.10-tts'
+
+
+@pytest.fixture
+def generations(tmp_path, monkeypatch):
+    monkeypatch.setattr(venv_generations, 'reclaim_in_background', lambda paths: None)
+    return VenvGenerations(tmp_path / 'venvs')
+
+
+def _new(generations: VenvGenerations) -> Path:
+    path = generations.new_generation_path(VENV)
+    path.mkdir()
+    return path
+
+
+def _names(generations: VenvGenerations):
+    return [g.name for g in generations.list_generations(VENV)]
+
+
+def test_keeps_previous_generation(generations):
+    first = _new(generations)
+    generations.activate(VENV, first)
+    second = _new(generations)
+    generations.activate(VENV, second)
+    third = _new(generations)
+    generations.activate(VENV, third)
+    generations.reclaim(VENV)
+
+    assert generations.current(VENV) == third
+    assert _names(generations) == [second.name, third.name]
+
+
+def test_failed_generation_does_not_take_keep_slot(generations):
+    previous = _new(generations)
+    generations.activate(VENV, previous)
+    failed = _new(generations)  # setup 失败后保留待续传，从未激活
+    current = _new(generations)
+    generations.activate(VENV, current)
+    generations.reclaim(VENV)
+
+    # 仍在运行的旧进程使用的上一代保留；被取代的失败代回收
+    assert _names(generations) == [previous.name, current.name]
+
+
+def test_pending_newer_generation_is_kept(generations):
+    previous = _new(generations)
+    generations.activate(VENV, previous)
+    current = _new(generations)
+    generations.activate(VENV, current)
+    pending = _new(generations)
+    generations.reclaim(VENV)
+
+    assert _names(generations) == [previous.name, current.name, pending.name]
+
+
+def test_generations_from_before_activation_record(generations):
+    legacy = [_new(generations) for _ in range(2)]
+    current = _new(generations)
+    generations.activate(VENV, current)
+    generations.reclaim(VENV)
+
+    assert _names(generations) == [legacy[1].name, current.name]
+    history = generations._generations_dir(VENV) / VenvGenerations.ACTIVATED_FILE
+    assert history.read_text().split() == [current.name]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 venv 裁剪的 glob 匹配、预设展开和裁剪记录
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.venv_prune import _glob_to_regex, load_prune_profile, prune_venv, pruned_paths
+
+
+@pytest.mark.parametrize('pattern, path, expected', [
+    ('**/tests/**', 'torch/tests/test_a.py', True),
+    ('**/tests/**', 'tests/conftest.py', True),
+    ('**/tests/**', 'torch/testsuite/a.py', False),
+    ('**/*.a', 'nvidia/lib/libcudart_static.a', True),
+    ('**/*.a', 'libfoo.a', True),
+    ('**/*.a', 'pkg/data.ab', False),
+    ('*/include/**', 'torch/include/ATen/core.h', True),
+    ('*/include/**', 'torch/sub/include/x.h', False),
+    ('*.py', 'pkg/mod.py', False),
+    ('pkg/?.py', 'pkg/a.py', True),
+    ('pkg/?.py', 'pkg/ab.py', False),
+    ('pkg/**', 'pkg/a/b/c.txt', True),
+    ('pkg+x/*.txt', 'pkg+x/a.txt', True),
+])
+def test_glob_to_regex(pattern, path, expected):
+    assert bool(_glob_to_regex(pattern).match(path)) is expected
+
+
+def test_load_prune_profile():
+    assert load_prune_profile({}) is None
+    assert load_prune_profile({'prune': {'enabled': False, 'presets': ['tests']}}) is None
+
+    profile = load_prune_profile({'prune': {
+        'enabled': True,
+        'presets': ['static_libs', 'dedupe_libs'],
+        'patterns': ['**/benchmarks/**'],
+        'keep': ['torch/include/**'],
+    }})
+    assert profile == {'patterns': ['**/benchmarks/**', '**/*.a'], 'keep': ['torch/include/**'], 'dedupe': True}
+
+    with pytest.raises(ValueError):
+        load_prune_profile({'prune': {'enabled': True, 'presets': ['unknown']}})
+
+
+def _make_venv(root: Path) -> Path:
+    site_packages = root / 'lib' / 'python3.10' / 'site-packages'
+    files = [
+        'pkg/__init__.py',
+        'pkg/tests/test_a.py',
+        'pkg/tests/data/sample.txt',
+        'pkg/include/keep.h',
+        'pkg/libstatic.a',
+        'pkg-1.0.dist-info/tests/RECORD',
+    ]
+    for rel in files:
+        path = site_packages / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    return site_packages
+
+
+def test_prune_venv_respects_keep_and_dist_info(tmp_path):
+    site_packages = _make_venv(tmp_path)
+    profile = {'patterns': ['**/tests/**', '**/*.a', '**/include/**'], 'keep': ['pkg/include/**'], 'dedupe': False}
+
+    preview = prune_venv(tmp_path, profile, dry_run=True)
+    assert preview['files'] == 3
+    assert (site_packages / 'pkg/tests/test_a.py').exists()
+
+    stats = prune_venv(tmp_path, profile)
+    assert stats['files'] == 3
+    assert not (site_packages / 'pkg/tests').exists()
+    assert not (site_packages / 'pkg/libstatic.a').exists()
+    assert (site_packages / 'pkg/include/keep.h').exists()
+    assert (site_packages / 'pkg-1.0.dist-info/tests/RECORD').exists()
+
+    real = os.path.realpath(site_packages)
+    assert pruned_paths(tmp_path) == {
+        os.path.join(real, 'pkg/tests/test_a.py'),
+        os.path.join(real, 'pkg/tests/data/sample.txt'),
+        os.path.join(real, 'pkg/libstatic.a'),
+    }
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 venv 与挂载点无关：在一个根目录下构建，整体移动到另一个根目录后不经改写直接运行
+"""
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import python_manager
+from src.python_manager import PythonManager
+from src.venv_paths import make_relocatable, retarget_interpreter
+
+
+def _build_volume(root: Path) -> Path:
+    """在 root 下模拟 Volume：pythons/ 中放一个托管解释器，venvs/ 中用它创建 venv"""
+    bin_dir = root / 'pythons' / 'cpython-test' / 'bin'
+    bin_dir.mkdir(parents=True)
+    interpreter = bin_dir / f'python{sys.version_info.major}.{sys.version_info.minor}'
+    os.symlink(os.path.realpath(sys.executable), interpreter)
+
+    venv_path = root / 'venvs' / 'py-test'
+    subprocess.run([str(interpreter), '-m', 'venv', '--without-pip', str(venv_path)], check=True)
+    return venv_path
+
+
+def test_venv_runs_after_moving_volume(tmp_path, monkeypatch):
+    canonical = tmp_path / 'runpod-volume'
+    monkeypatch.setattr(python_manager, 'CANONICAL_VOLUME_PATH', canonical)
+
+    # 在 /workspace 挂载点下构建
+    root_a = tmp_path / 'workspace'
+    venv_path = _build_volume(root_a)
+    pythons_dir = PythonManager(str(root_a)).canonical_pythons_dir()
+    assert pythons_dir == canonical / 'pythons'
+    make_relocatable(venv_path)
+    retarget_interpreter(venv_path, pythons_dir)
+
+    home = [line for line in (venv_path / 'pyvenv.cfg').read_text().splitlines() if line.startswith('home')]
+    assert home == [f'home = {pythons_dir}/cpython-test/bin']
+    for link in (venv_path / 'bin').glob('python*'):
+        assert not os.readlink(link).startswith(str(root_a))
+
+    # 整个 Volume 出现在另一个挂载点下；原挂载点消失，链接失效后按新挂载点重建
+    root_b = tmp_path / 'mnt' / 'volume'
+    root_b.parent.mkdir()
+    shutil.move(str(root_a), str(root_b))
+    assert PythonManager(str(root_b)).canonical_pythons_dir() == canonical / 'pythons'
+
+    moved = root_b / 'venvs' / 'py-test'
+    result = subprocess.run([str(moved / 'bin' / 'python'), '-c', 'import sys; print(sys.prefix)'],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(moved)
+
+
+def test_canonical_path_occupied_by_other_volume(tmp_path, monkeypatch):
+    canonical = tmp_path / 'runpod-volume'
+    other = tmp_path / 'other'
+    other.mkdir()
+    canonical.symlink_to(other)
+    monkeypatch.setattr(python_manager, 'CANONICAL_VOLUME_PATH', canonical)
+
+    volume = tmp_path / 'workspace'
+    volume.mkdir()
+    assert PythonManager(str(volume)).canonical_pythons_dir() is None
+    assert os.readlink(canonical) == str(other)
@@ -4,6 +4,7 @@
 RunPod Volume 统一管理 CLI
 提供模型和依赖的统一管理入口
 """
+import os
 import sys
 import argparse
 from pathlib import Path
@@ -73,8 +74,17 @@ def main():
   # 下载项目模型
   python3 volume_cli.py models download --project speaker-diarization
   
+  # 预估下载量和耗时（不安装）
+  python3 volume_cli.py plan --project speaker-diarization
+  
+  # 排队执行（多个 Pod 共享队列，由 queue worker 运行）
+  python3 volume_cli.py queue submit --priority 10 -- setup --project speaker-diarization
+  
   # 一键设置（依赖+模型）
   python3 volume_cli.py setup --project speaker-diarization
+  
+  # Serverless 启动时复制到本地盘
+  eval "$(python3 volume_cli.py warm --project speaker-diarization --budget 40G)"
 """
     )
     
@@ -83,6 +93,39 @@ def main():
         help='可用命令'
     )
     
+    # 后台任务的调度参数（deps install --async 和 queue submit 共用）
+    scheduling_parser = argparse.ArgumentParser(add_help=False)
+    scheduling_group = scheduling_parser.add_argument_group('后台任务调度（仅 --async / 队列任务）')
+    scheduling_group.add_argument(
+        '--nice',
+        type=int,
+        help='nice 值 0-19，越大越让出 CPU'
+    )
+    scheduling_group.add_argument(
+        '--ionice',
+        metavar='CLASS[:LEVEL]',
+        help='I/O 调度类: idle、best-effort[:0-7]、realtime[:0-7]'
+    )
+    scheduling_group.add_argument(
+        '--cpus',
+        help='CPU 亲和性，如 0-3,6'
+    )
+    scheduling_group.add_argument(
+        '--cpu-weight',
+        type=int,
+        help='cgroup v2 cpu.weight 1-10000（默认 100，cgroup 可写时生效）'
+    )
+    scheduling_group.add_argument(
+        '--io-weight',
+        type=int,
+        help='cgroup v2 io.weight 1-10000（默认 100，cgroup 可写时生效）'
+    )
+    scheduling_group.add_argument(
+        '--polite',
+        action='store_true',
+        help='低优先级预设: nice 10、ionice idle、cpu/io weight 20（可被单项参数覆盖）'
+    )
+    
     # ==================== status 命令 ====================
     status_parser = subparsers.add_parser(
         'status',
@@ -92,6 +135,11 @@ def main():
         '--project',
         help='查看指定项目（不指定则显示所有）'
     )
+    status_parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='并行遍历重新统计 venv 和模型的磁盘占用（默认读取缓存）'
+    )
     
     # ==================== deps 命令组 ====================
     deps_parser = subparsers.add_parser(
@@ -106,7 +154,8 @@ def main():
     # deps install
     deps_install_parser = deps_subparsers.add_parser(
         'install',
-        help='安装项目依赖'
+        help='安装项目依赖',
+        parents=[scheduling_parser]
     )
     deps_install_parser.add_argument(
         '--project',
@@ -123,6 +172,19 @@ def main():
         action='store_true',
         help='强制重新安装'
     )
+    deps_install_parser.add_argument(
+        '--no-compile',
+        action='store_true',
+        help='跳过安装后的字节码预编译'
+    )
+    deps_install_parser.add_argument(
+        '--python',
+        help='Python 版本（默认使用项目配置）；逗号分隔多个版本时并发构建，如 3.10,3.11'
+    )
+    deps_install_parser.add_argument(
+        '--result-file',
+        help=argparse.SUPPRESS
+    )
     deps_install_parser.add_argument(
         '--async',
         dest='async_mode',
@@ -151,6 +213,28 @@ def main():
         required=True,
         help='项目名称'
     )
+    deps_check_parser.add_argument(
+        '--imports',
+        action='store_true',
+        help='在隔离子进程中导入所需包的顶层模块'
+    )
+    deps_check_parser.add_argument(
+        '--all',
+        action='store_true',
+        help='导入 venv 中所有已安装包的顶层模块（隐含 --imports）'
+    )
+    deps_check_parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 4,
+        help='导入测试并发进程数（默认 CPU 核心数）'
+    )
+    deps_check_parser.add_argument(
+        '--timeout',
+        type=int,
+        default=60,
+        help='单个模块导入超时秒数（默认 60）'
+    )
     
     # deps status
     deps_status_parser = deps_subparsers.add_parser(
@@ -162,6 +246,17 @@ def main():
         nargs='?',
         help='任务ID（不提供则列出所有任务）'
     )
+    deps_status_parser.add_argument(
+        '--follow', '-f',
+        action='store_true',
+        help='持续输出新日志和进度，任务结束时以其退出码退出'
+    )
+    deps_status_parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.5,
+        help='跟踪模式的轮询间隔秒数（默认: 0.5）'
+    )
     
     # deps stop
     deps_stop_parser = deps_subparsers.add_parser(
@@ -178,6 +273,260 @@ def main():
         help='强制终止（SIGKILL）'
     )
     
+    # deps clean-tasks
+    deps_clean_tasks_parser = deps_subparsers.add_parser(
+        'clean-tasks',
+        help='归档旧的后台任务日志'
+    )
+    deps_clean_tasks_parser.add_argument(
+        '--days',
+        type=float,
+        default=30,
+        help='保留天数（默认: 30）'
+    )
+    deps_clean_tasks_parser.add_argument(
+        '--keep',
+        type=int,
+        default=100,
+        help='最多保留的已结束任务数（默认: 100）'
+    )
+    deps_clean_tasks_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='只列出将被归档的任务'
+    )
+    
+    # deps clone
+    deps_clone_parser = deps_subparsers.add_parser(
+        'clone',
+        help='从已有项目克隆 venv（硬链接/reflink）后增量安装'
+    )
+    deps_clone_parser.add_argument(
+        '--from',
+        dest='from_project',
+        required=True,
+        help='源项目名称'
+    )
+    deps_clone_parser.add_argument(
+        '--to',
+        dest='to_project',
+        required=True,
+        help='目标项目名称'
+    )
+    deps_clone_parser.add_argument(
+        '--python',
+        help='Python 版本（默认使用目标项目配置）'
+    )
+    deps_clone_parser.add_argument(
+        '--mode',
+        default='auto',
+        choices=['auto', 'reflink', 'hardlink', 'copy'],
+        help='克隆方式（默认 auto: reflink → hardlink → copy）'
+    )
+    deps_clone_parser.add_argument(
+        '--mirror',
+        default='https://pypi.tuna.tsinghua.edu.cn/simple',
+        help='PyPI 镜像源'
+    )
+    deps_clone_parser.add_argument(
+        '--force',
+        action='store_true',
+        help='目标 venv 已存在时覆盖'
+    )
+    deps_clone_parser.add_argument(
+        '--no-install',
+        action='store_true',
+        help='只克隆，不执行增量安装'
+    )
+    
+    # deps compile
+    deps_compile_parser = deps_subparsers.add_parser(
+        'compile',
+        help='为已有 venv 并行预编译字节码（.pyc）'
+    )
+    deps_compile_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_compile_parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='并发进程数（默认 0 = 全部 CPU 核心）'
+    )
+    deps_compile_parser.add_argument(
+        '--invalidation-mode',
+        default='timestamp',
+        choices=['timestamp', 'checked-hash', 'unchecked-hash'],
+        help='.pyc 失效检查方式（默认 timestamp）'
+    )
+    
+    # deps profile-imports
+    deps_profile_parser = deps_subparsers.add_parser(
+        'profile-imports',
+        help='分析模块在项目 venv 中的 import 耗时'
+    )
+    deps_profile_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_profile_parser.add_argument(
+        '--module',
+        required=True,
+        help='要导入的模块（如 handler）'
+    )
+    deps_profile_parser.add_argument(
+        '--path',
+        action='append',
+        help='额外加入 PYTHONPATH 的目录（业务代码所在目录，可多次指定）'
+    )
+    deps_profile_parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='重复次数，取最快一次（默认 3）'
+    )
+    deps_profile_parser.add_argument(
+        '--top',
+        type=int,
+        default=20,
+        help='显示前 N 个顶层包（默认 20）'
+    )
+    deps_profile_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='回归判定的相对增幅（默认 0.2 = 20%%，且至少 50ms）'
+    )
+    deps_profile_parser.add_argument(
+        '--fail-on-regression',
+        action='store_true',
+        help='发现回归时以非零退出码结束'
+    )
+    
+    # deps verify
+    deps_verify_parser = deps_subparsers.add_parser(
+        'verify',
+        help='按 RECORD 校验 venv 文件完整性'
+    )
+    deps_verify_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_verify_parser.add_argument(
+        '--jobs',
+        type=int,
+        default=16,
+        help='并发校验数（I/O 并发上限，默认 16）'
+    )
+    deps_verify_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='忽略 stat 签名缓存，全部重新计算哈希'
+    )
+    
+    # deps prune
+    deps_prune_parser = deps_subparsers.add_parser(
+        'prune',
+        help='按 dependencies.yaml 的 prune 配置裁剪 venv'
+    )
+    deps_prune_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_prune_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='只统计可节省的空间，不删除'
+    )
+    
+    # deps pack
+    deps_pack_parser = deps_subparsers.add_parser(
+        'pack',
+        help='把 venv 打包成单个镜像文件（加速网络 Volume 冷启动）'
+    )
+    deps_pack_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_pack_parser.add_argument(
+        '--compression',
+        choices=['auto', 'none', 'zstd', 'lz4'],
+        default='auto',
+        help='压缩方式（默认: auto，优先 zstd，其次 lz4）'
+    )
+    deps_pack_parser.add_argument(
+        '--bench',
+        action='store_true',
+        help='对比直接从 Volume 运行与解压到本地盘的耗时'
+    )
+    deps_pack_parser.add_argument(
+        '--module',
+        help='--bench 时额外对比 import 该模块的耗时'
+    )
+    deps_pack_parser.add_argument(
+        '--bench-dir',
+        help='--bench 时解压的本地目录（默认: 系统临时目录）'
+    )
+    
+    # deps unpack
+    deps_unpack_parser = deps_subparsers.add_parser(
+        'unpack',
+        help='把 venv 镜像解压到本地盘'
+    )
+    deps_unpack_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_unpack_parser.add_argument(
+        '--dest',
+        default='/tmp/venvs',
+        help='本地目录（默认: /tmp/venvs）'
+    )
+    deps_unpack_parser.add_argument(
+        '--force',
+        action='store_true',
+        help='镜像未变化时也重新解压'
+    )
+    
+    # deps relocate
+    deps_relocate_parser = deps_subparsers.add_parser(
+        'relocate',
+        help='把 venv 转换为与挂载点无关的形式（Pod/Serverless 共用）'
+    )
+    deps_relocate_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    deps_relocate_parser.add_argument(
+        '--prefix',
+        help='改为直接把绝对路径改写为该路径（不转换为可重定位形式）'
+    )
+    deps_relocate_parser.add_argument(
+        '--workers',
+        type=int,
+        help='并行改写数'
+    )
+    
+    # deps pythons
+    deps_pythons_parser = deps_subparsers.add_parser(
+        'pythons',
+        help='查看/下载 Volume 上的托管 Python 解释器'
+    )
+    deps_pythons_parser.add_argument(
+        '--install',
+        nargs='+',
+        metavar='VERSION',
+        help='预先下载指定版本（如 3.10 3.11）'
+    )
+    
     # ==================== models 命令组 ====================
     models_parser = subparsers.add_parser(
         'models',
@@ -314,6 +663,172 @@ def main():
         action='store_true',
         help='跳过模型下载'
     )
+    setup_parser.add_argument(
+        '--sequential',
+        action='store_true',
+        help='依次执行依赖安装和模型下载（默认两者并发）'
+    )
+    setup_parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='忽略上次未完成的 setup，从头开始（默认从中断处继续）'
+    )
+    
+    # ==================== warm 命令 ====================
+    warm_parser = subparsers.add_parser(
+        'warm',
+        help='把项目的 venv 和模型复制到本地盘（Serverless 启动时使用）'
+    )
+    warm_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    warm_parser.add_argument(
+        '--dest',
+        default='/tmp/runpod-cache',
+        help='本地缓存目录（默认: /tmp/runpod-cache）'
+    )
+    warm_parser.add_argument(
+        '--budget',
+        help='本地缓存大小上限（如 40G），超出时按最近使用时间淘汰'
+    )
+    warm_parser.add_argument(
+        '--workers',
+        type=int,
+        help='并行复制数'
+    )
+    warm_parser.add_argument(
+        '--skip-venv',
+        action='store_true',
+        help='不复制 venv'
+    )
+    warm_parser.add_argument(
+        '--skip-models',
+        action='store_true',
+        help='不复制模型'
+    )
+    warm_parser.add_argument(
+        '--env-file',
+        help='同时把 export 语句写入该文件'
+    )
+    
+    # ==================== plan 命令 ====================
+    plan_parser = subparsers.add_parser(
+        'plan',
+        help='预估 setup 的下载量、磁盘增量和耗时（不安装）'
+    )
+    plan_parser.add_argument(
+        '--project',
+        required=True,
+        help='项目名称'
+    )
+    plan_parser.add_argument(
+        '--python',
+        help='Python 版本（默认使用项目配置）'
+    )
+    plan_parser.add_argument(
+        '--mirror',
+        help='PyPI 镜像源（与 deps install 相同）'
+    )
+    plan_parser.add_argument(
+        '--skip-deps',
+        action='store_true',
+        help='不计算依赖'
+    )
+    plan_parser.add_argument(
+        '--skip-models',
+        action='store_true',
+        help='不计算模型'
+    )
+    plan_parser.add_argument(
+        '--jobs',
+        type=int,
+        default=16,
+        help='并发查询数（默认: 16）'
+    )
+    plan_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='列出每个需要下载的包'
+    )
+    
+    # ==================== queue 命令组 ====================
+    queue_parser = subparsers.add_parser(
+        'queue',
+        help='Volume 上的任务队列（多 Pod 共享）'
+    )
+    queue_subparsers = queue_parser.add_subparsers(
+        dest='queue_command',
+        help='队列操作'
+    )
+    
+    # queue submit
+    queue_submit_parser = queue_subparsers.add_parser(
+        'submit',
+        help='提交任务（-- 之后为 CLI 子命令或 scripts/ 下的脚本）',
+        parents=[scheduling_parser]
+    )
+    queue_submit_parser.add_argument(
+        '--priority',
+        type=int,
+        default=0,
+        help='优先级，越大越先运行（默认: 0）'
+    )
+    queue_submit_parser.add_argument(
+        '--key',
+        action='append',
+        help='冲突键，相同键的任务不会同时运行（可多次指定，默认按命令推断）'
+    )
+    queue_submit_parser.add_argument(
+        'job',
+        nargs=argparse.REMAINDER,
+        help='要运行的命令，如: -- deps install --project tts'
+    )
+    
+    # queue list
+    queue_list_parser = queue_subparsers.add_parser(
+        'list',
+        help='列出排队中和运行中的任务'
+    )
+    queue_list_parser.add_argument(
+        '--all',
+        action='store_true',
+        help='包括已结束的任务'
+    )
+    
+    # queue worker
+    queue_worker_parser = queue_subparsers.add_parser(
+        'worker',
+        help='运行 worker，按槽位数并发执行队列中的任务'
+    )
+    queue_worker_parser.add_argument(
+        '--slots',
+        type=int,
+        default=1,
+        help='并发槽位数（默认: 1）'
+    )
+    queue_worker_parser.add_argument(
+        '--poll',
+        type=float,
+        default=2.0,
+        help='轮询间隔秒数（默认: 2）'
+    )
+    queue_worker_parser.add_argument(
+        '--exit-when-idle',
+        action='store_true',
+        help='队列中没有可运行任务且本 worker 的任务都结束后退出'
+    )
+    
+    # queue cancel
+    queue_cancel_parser = queue_subparsers.add_parser(
+        'cancel',
+        help='取消任务'
+    )
+    queue_cancel_parser.add_argument(
+        'job_id',
+        help='任务ID'
+    )
     
     # ==================== clean 命令 ====================
     clean_parser = subparsers.add_parser(
@@ -340,6 +855,11 @@ def main():
         action='store_true',
         help='清理所有（依赖+模型+元数据）'
     )
+    clean_parser.add_argument(
+        '--yes',
+        action='store_true',
+        help='跳过确认（后台任务/队列中运行时使用）'
+    )
     
     # 解析参数
     args = parser.parse_args()
@@ -366,6 +886,18 @@ def main():
             from src.commands.setup import handle_setup
             handle_setup(args)
         
+        elif args.command == 'warm':
+            from src.commands.warm import handle_warm
+            handle_warm(args)
+        
+        elif args.command == 'plan':
+            from src.commands.plan import handle_plan
+            handle_plan(args)
+        
+        elif args.command == 'queue':
+            from src.commands.queue import handle_queue
+            handle_queue(args)
+        
         elif args.command == 'clean':
             from src.commands.clean import handle_clean
             handle_clean(args)